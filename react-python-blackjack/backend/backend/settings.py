@@ -137,6 +137,32 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Game state store, so a player's game survives reconnects to any worker.
+# In-process by default (OPTIONS: ttl, max_entries); use 'game.store.SQLiteGameStore'
+# (OPTIONS: path, ttl) to share games between the workers of one host, or
+# 'game.store.RedisGameStore' (OPTIONS: url, prefix, ttl) between hosts. LOCAL_CACHE keeps that many games cached in front of a shared store.
+GAME_STORE = {
+    'BACKEND': 'game.store.MemoryGameStore',
+    'OPTIONS': {'ttl': 24 * 60 * 60, 'max_entries': 10000},
+    'LOCAL_CACHE': 0,
+}
+
+# Live games held by each worker: at most CAPACITY, and none unused for IDLE_TTL seconds.
+# An evicted game's connection is closed; with SNAPSHOT_ON_EVICT its game is saved to the
+# game store first, so the client can resume it.
+GAME_REGISTRY = {
+    'CAPACITY': 10000,
+    'IDLE_TTL': 60 * 60,
+    'SNAPSHOT_ON_EVICT': True,
+}
+
+# Per-action latency histograms of the game consumers, served at api/blackjack/metrics/
+# to ALLOWED_IPS in the Prometheus text format
+GAME_METRICS = {
+    'ENABLED': False,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
 if 'test' in sys.argv:
     DATABASES = {
         'default': {
@@ -151,6 +177,8 @@ if 'test' in sys.argv:
         }
     }
 
+# Multi-seat tables are hosted by the worker their first player joined (claimed in the
+# game store): use a shared GAME_STORE when several workers serve them
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
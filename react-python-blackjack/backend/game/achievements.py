@@ -0,0 +1,124 @@
+from channels.db import database_sync_to_async
+from typing import Dict, List, Optional, Set
+from .game_engine import BlackJackGame
+from .models import Achievement
+from .statistics import StatisticsAggregator
+
+
+class AchievementRule:
+    """
+        Achievement unlocked once a progress value reaches a threshold
+    """
+    __slots__ = ('name', 'description', 'category', 'icon', 'progress', 'threshold')
+
+    def __init__(self, name: str, description: str, category: str, icon: str, progress: str, threshold: int):
+        self.name = name
+        self.description = description
+        self.category = category
+        self.icon = icon
+        self.progress = progress
+        self.threshold = threshold
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'description': self.description,
+            'category': self.category,
+            'icon': self.icon,
+        }
+
+
+# Rules listed on the Achievement model
+ACHIEVEMENTS = (
+    AchievementRule('First Win', 'Win your first hand', 'winning', 'trophy', 'hands_won', 1),
+    AchievementRule('Blackjack Master', 'Get 10 blackjacks', 'winning', 'crown', 'blackjacks', 10),
+    AchievementRule('Lucky Streak', 'Win 5 hands in a row', 'winning', 'clover', 'win_streak', 5),
+    AchievementRule('High Roller', 'Bet $500 in a single hand', 'special', 'diamond', 'biggest_bet', 500),
+    AchievementRule('Card Counter', 'Win 100 hands with AI', 'special', 'robot', 'ai_hands_won', 100),
+    AchievementRule('Risk Taker', 'Win after doubling down 20 times', 'playing', 'dice', 'double_wins', 20),
+    AchievementRule('Survivor', 'Play 100 hands without going broke', 'playing', 'shield', 'hands_since_broke', 100),
+)
+
+# Progress values tracked per user
+PROGRESS_FIELDS = ('hands_won', 'blackjacks', 'ai_hands_won', 'double_wins', 'win_streak', 'biggest_bet', 'hands_since_broke')
+
+
+class AchievementTracker:
+    """
+        Evaluates achievement rules against the stream of resolved rounds.
+        - Each round updates a few in-memory progress values (O(1) per hand)
+        - A rule fires once per session, when its value crosses the threshold;
+          lifetime totals add the stored PlayerStatistics counters once they are known,
+          and the session's opening run of wins continues the stored streak
+        - Unlocks are written in one bulk insert per flush with ignore_conflicts, so the
+          (user, name) unique constraint makes repeats harmless without reading first
+    """
+    def __init__(self,
+                 user_id: int,
+                 statistics: Optional[StatisticsAggregator] = None,
+                 rules=ACHIEVEMENTS):
+        self.user_id = user_id
+        self.statistics = statistics
+        self.rules = rules
+        self.progress: Dict[str, int] = dict.fromkeys(PROGRESS_FIELDS, 0)
+        self.opening_run = 0    # wins before the session's first loss
+        self.streak_from_start = True
+        self.fired: Set[str] = set()
+        self.pending: List[AchievementRule] = []
+
+    def value(self, field: str) -> int:
+        """
+            Progress value, including the stored lifetime total when available
+        """
+        baseline = self.statistics.baseline if self.statistics is not None else None
+        if not baseline:
+            return self.progress[field]
+        if field == 'win_streak':
+            return max(self.progress[field], self.opening_run + max(baseline.get('current_streak', 0), 0))
+        return self.progress[field] + baseline.get(field, 0)
+
+    def record_round(self, game: BlackJackGame, ai_mode: bool = False):
+        """
+            Update progress from a resolved round and queue newly crossed thresholds
+        """
+        progress = self.progress
+        for result in game.hand_results:
+            won = result['result'] in ('win', 'blackjack')
+            progress['hands_won'] += won
+            progress['blackjacks'] += result['player_blackjack']
+            progress['ai_hands_won'] += won and ai_mode
+            progress['double_wins'] += won and result['was_doubled']
+            progress['biggest_bet'] = max(progress['biggest_bet'], result['player_bet'])
+            progress['hands_since_broke'] += 1
+            if won:
+                progress['win_streak'] += 1
+                if self.streak_from_start:
+                    self.opening_run = progress['win_streak']
+            elif result['result'] != 'push':
+                progress['win_streak'] = 0
+                self.streak_from_start = False
+        if game.player_chips <= 0:
+            progress['hands_since_broke'] = 0
+        self.check()
+
+    def check(self):
+        for rule in self.rules:
+            if rule.name not in self.fired and self.value(rule.progress) >= rule.threshold:
+                self.fired.add(rule.name)
+                self.pending.append(rule)
+
+    def write(self, rules: List[AchievementRule]):
+        Achievement.objects.bulk_create(
+            [Achievement(user_id=self.user_id, **rule.to_dict()) for rule in rules],
+            ignore_conflicts=True,
+        )
+
+    async def flush(self):
+        """
+            Insert the achievements unlocked since the last flush
+        """
+        self.check()    # the stored totals may have become known since the last round
+        if not self.pending:
+            return
+        rules, self.pending = self.pending, []
+        await database_sync_to_async(self.write)(rules)
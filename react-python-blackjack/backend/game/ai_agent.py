@@ -1,7 +1,11 @@
-from .game_engine import Hand, Card, Rank
-from typing import Literal, Optional
+from .game_engine import Hand, Card
+from .strategy import StrategyTable, strategy_table_for, load_equivalent_win_rates
+from .counting import CountingSystem, get_counting_system
+from .expected_value import solver_for, full_shoe
+from .rules import RuleSet, get_rules
+from typing import Literal, Optional, Tuple, Union
 
-Strategy = Literal['simple', 'basic', 'conservative']
+Strategy = Literal['simple', 'basic', 'conservative', 'optimal']
 
 class BlackJackAI:
     """
@@ -9,12 +13,30 @@ class BlackJackAI:
         - Simple: Very basic decisions (hit on < 17, stand on >= 17)
         - Basic: Classic basic strategy from probability theory
         - Conservative: Risk-averse play focusing on not busting
+        - Optimal: Composition-dependent play maximizing expected value for the cards left in the shoe
+        Basic and optimal play follow the table rules (a RuleSet or profile name, default rules otherwise).
     """
-    def __init__(self, strategy: Strategy = 'basic'):
+    def __init__(self,
+                 strategy: Strategy = 'basic',
+                 strategy_table: Optional[StrategyTable] = None,
+                 counting_system: str = 'hi-lo',
+                 num_decks: Optional[int] = None,
+                 bet_sizer=None,
+                 rules: Union[str, RuleSet, None] = None):
         self.strategy = strategy
-        self.running_count = 0      # for card counting
+        self.rules = get_rules(rules)
+        if num_decks is not None:
+            self.rules = self.rules.with_decks(num_decks)
+        num_decks = self.rules.num_decks
+        self.strategy_table = strategy_table or strategy_table_for(self.rules)  # chart used by basic strategy
+        self.solver = solver_for(self.rules)
+        self.counting: CountingSystem = get_counting_system(counting_system)
+        self.num_decks = num_decks
+        self.running_count = self.counting.initial_count(num_decks)    # for card counting
         self.true_count = 0
-        self.decks_remaining = 6
+        self.decks_remaining = num_decks
+        self.shoe_composition: Optional[Tuple[int, ...]] = None     # unseen cards, for optimal strategy
+        self.bet_sizer = bet_sizer      # e.g. a KellyBetSizer, replaces the count based bet spread
 
     def get_action(self,
                    player_hand: Hand,
@@ -31,17 +53,21 @@ class BlackJackAI:
         elif self.strategy == 'basic':
             return self.basic_strategy(player_hand, dealer_up_card, can_double, can_split, can_surrender)
         elif self.strategy == 'conservative':
-            return self.conservative_strategy(player_hand, dealer_up_card)
+            return self.conservative_strategy(player_hand, dealer_up_card, can_double, can_split, can_surrender)
+        elif self.strategy == 'optimal':
+            return self.optimal_strategy(player_hand, dealer_up_card, can_double, can_split, can_surrender)
         else:
             return 'stand'
 
     def get_bet_size(self, base_bet: int, player_chips: int) -> int:
         """
-            Determine bet size (with card counting for advanced strategies
+            Determine bet size (with card counting for advanced strategies)
         """
+        if self.bet_sizer is not None:
+            return self.bet_sizer.bet_size(self.true_count, base_bet, player_chips)
         if self.strategy == 'basic' and self.true_count > 2:
             # Increase bet when count is favorable
-            multiplier = min(self.true_count - 1, 4)
+            multiplier = min(int(self.true_count) - 1, 4)
             return min(base_bet * multiplier, player_chips, base_bet * 4)
         elif self.strategy == 'conservative':
             # Always bet minimum
@@ -81,107 +107,9 @@ class BlackJackAI:
                        can_double: bool, can_split: bool, can_surrender: bool) -> str:
         """
             Basic strategy: - mathematically optimal play based on probability theory and computer simulations
+            Decisions are constant-time lookups in the compiled strategy chart
         """
-        player_value = player_hand.value()
-        dealer_value = dealer_up_card.value()
-        is_soft = player_hand.is_soft()
-        is_pair = len(player_hand.cards) == 2 and player_hand.cards[0].value() == player_hand.cards[1].value()
-
-        # Handle splits first
-        if can_split and is_pair:
-            pair_rank = player_hand.cards[0].rank
-            # Always split Aces and 8s
-            if pair_rank == Rank.ACE or pair_rank == Rank.EIGHT:
-                return 'split'
-            # Never split 5s and 10s
-            if pair_rank == Rank.FIVE or pair_rank == Rank.TEN:
-                pass    # fall through to regular strategy
-            # Split 2s, 3s, 6s, 7s against dealer 2-7
-            elif pair_rank in [Rank.TWO, Rank.THREE, Rank.SIX, Rank.SEVEN]:
-                if 2 <= dealer_value <= 7:
-                    return 'split'
-            # Split 4s against dealer 5-6
-            elif pair_rank == Rank.FOUR:
-                if 5 <= dealer_value <= 6:
-                    return 'split'
-            # Split 9s against dealer 2-9 except 7
-            elif pair_rank == Rank.NINE:
-                if (2 <= dealer_value <= 6) or (8 <= dealer_value <= 9):
-                    return 'split'
-        # Handler surrender
-        if can_surrender:
-            # Surrender 16 against dealer 9, 10, Ace
-            if player_value == 16 and dealer_value >= 9:
-                return 'surrender'
-            # surrender 15 against dealer 10
-            if player_value == 15 and dealer_value == 10:
-                return 'surrender'
-        # Handle soft hands (with Ace counted as 11)
-        if is_soft:
-            # Soft 19+ always stand
-            if player_value >= 19:
-                return 'stand'
-            # Soft 18
-            elif player_value == 18:
-                if dealer_value >= 9:
-                    return 'hit'
-                elif can_double and 3 <= dealer_value <= 6:
-                    return 'double'
-                else:
-                    return 'stand'
-            # Soft 17
-            elif player_value == 17:
-                if can_double and 3 <= dealer_value <= 6:
-                    return 'double'
-                else:
-                    return 'hit'
-            # Soft 13-16
-            elif 13 <= player_value <= 16:
-                if can_double and 5 <= dealer_value <= 6:
-                    return 'double'
-                else:
-                    return 'hit'
-            # Soft 12 or less
-            else:
-                return 'hit'
-        # Handle hard hands
-        else:
-            # 17+ always stand
-            if player_value >= 17:
-                return 'stand'
-            # 13-16: Stand against dealer 2-6, hit against 7+
-            elif 13 <= player_value <= 16:
-                if 2 <= dealer_value <= 6:
-                    return 'stand'
-                else:
-                    return 'hit'
-            # 12: Stand against dealer 4-6, hit otherwise
-            elif player_value == 12:
-                if 4 <= dealer_value <= 6:
-                    return 'stand'
-                else:
-                    return 'hit'
-            # 11: Always double if possible, otherwise hit
-            elif player_value == 11:
-                if can_double:
-                    return 'double'
-                else:
-                    return 'hit'
-            # 10: Double against dealer 2-9, hit against 10/Ace
-            elif player_value == 10:
-                if can_double and 2 <= dealer_value <= 9:
-                    return 'double'
-                else:
-                    return 'hit'
-            # 9: Double against dealer 3-6, hit otherwise
-            elif player_value == 9:
-                if can_double and 3 <= dealer_value <= 6:
-                    return 'double'
-                else:
-                    return 'hit'
-            # 8 or less: always hit
-            else:
-                return 'hit'
+        return self.strategy_table.action(player_hand, dealer_up_card, can_double, can_split, can_surrender)
 
     def conservative_strategy(self,
                               player_hand: Hand,
@@ -222,34 +150,56 @@ class BlackJackAI:
             else:
                 return 'hit'
 
+    def optimal_strategy(self,
+                         player_hand: Hand,
+                         dealer_up_card: Card,
+                         can_double: bool, can_split: bool, can_surrender: bool) -> str:
+        """
+            Optimal strategy: pick the action with the highest expected value for the unseen cards
+        """
+        composition = self.shoe_composition
+        if composition is None:
+            composition = full_shoe(self.num_decks, exclude=tuple(player_hand.cards) + (dealer_up_card,))
+        return self.solver.best_action(player_hand, dealer_up_card, composition,
+                                       can_double, can_split, can_surrender)
+
     # -----------------------------
     #   CARD COUNTING FUNCTIONS
     # -----------------------------
     def update_count(self, card: Card):
         """
-            Update running count for card counting (High-Low system)
+            Update running count for card counting (Hi-Lo system by default)
         """
-        if card.rank in [Rank.TWO, Rank.THREE, Rank.FOUR, Rank.FIVE, Rank.SIX]:
-            self.running_count += 1
-        elif card.rank in [Rank.TEN, Rank.JACK, Rank.QUEEN, Rank.KING, Rank.ACE]:
-            self.running_count -= 1
-        # 7,8 9s are neutral (0)
+        self.running_count += self.counting.code_tags[card.code]
 
     def calculate_true_count(self, decks_remaining: float):
         """
             Calculate true count for betting decisions
         """
-        if decks_remaining > 0:
-            self.true_count = self.running_count / decks_remaining
-        else:
-            self.true_count = 0
+        self.decks_remaining = decks_remaining
+        self.true_count = self.counting.true_count(self.running_count, decks_remaining)
+
+    def observe_card(self, card: Card, decks_remaining: float):
+        """
+            Count a card as it becomes visible at the table
+        """
+        self.running_count += self.counting.code_tags[card.code]
+        self.decks_remaining = decks_remaining
+        self.true_count = self.counting.true_count(self.running_count, decks_remaining)
+
+    def observe_shoe(self, composition: Tuple[int, ...]):
+        """
+            Update the unseen card composition used by the optimal strategy
+        """
+        self.shoe_composition = composition
 
     def reset_count(self):
         """
             Reset count when deck is reshuffled
         """
-        self.running_count = 0
-        self.true_count = 0
+        self.running_count = self.counting.initial_count(self.num_decks)
+        self.decks_remaining = self.num_decks
+        self.true_count = self.counting.true_count(self.running_count, self.num_decks)
 
 
     # -----------------------------
@@ -263,9 +213,20 @@ class BlackJackAI:
             'simple': 'Simple strategy: Hit on <17, stand on 17+. Good for learning.',
             'basic': 'Basic strategy: Mathematically optimal play based on probability. Best for winning.',
             'conservative': 'Conservative strategy: Risk-averse, focuses on not busting. Safest play.',
+            'optimal': 'Optimal strategy: Picks the highest expected value play for the cards left in the shoe.',
         }
         return descriptions.get(self.strategy, 'Unknown strategy')
 
+    def get_strategy_equivalent_win_rate(self) -> float:
+        """
+            Win probability of an even-money bet with the strategy's EV per hand, (1 + EV) / 2,
+            measured by the strategy tournament (the approximate win rate without a report)
+        """
+        measured = load_equivalent_win_rates()
+        if self.strategy in measured:
+            return measured[self.strategy]
+        return self.get_strategy_win_rate()
+
     def get_strategy_win_rate(self) -> float:
         """
             Approximate win rate for each strategy
@@ -274,6 +235,7 @@ class BlackJackAI:
             'simple': 0.42,  # ~42% win rate
             'basic': 0.495,  # ~49.5% win rate (best)
             'conservative': 0.45,  # ~45% win rate
+            'optimal': 0.5,  # ~50% win rate
         }
         return win_rates.get(self.strategy, 0.40)
 
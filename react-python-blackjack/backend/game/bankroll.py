@@ -0,0 +1,158 @@
+from .ai_agent import BlackJackAI
+from .kelly import KellyBetSizer, load_edge_table
+from .simulator import BatchSimulator
+from typing import Dict, Iterator, Optional, Sequence
+import argparse
+import json
+import numpy as np
+import secrets
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# True counts at which an AI bet spread is compiled (the end values hold the tails)
+SPREAD_COUNTS = (-20, 20)
+# Bankroll large enough that a compiled bet spread is never capped by the chips
+UNCAPPED_CHIPS = 10 ** 12
+
+
+def compile_bet_spread(ai: BlackJackAI, base_bet: int) -> np.ndarray:
+    """
+        Table of BlackJackAI.get_bet_size by integer true count, for an uncapped bankroll
+    """
+    true_count = ai.true_count
+    spread = np.empty(SPREAD_COUNTS[1] - SPREAD_COUNTS[0] + 1, dtype=np.int64)
+    for i, count in enumerate(range(SPREAD_COUNTS[0], SPREAD_COUNTS[1] + 1)):
+        ai.true_count = count
+        spread[i] = ai.get_bet_size(base_bet, UNCAPPED_CHIPS)
+    ai.true_count = true_count
+    return spread
+
+
+class BankrollSimulator:
+    """
+        Advances num_trajectories independent bankrolls in parallel, one BatchSimulator
+        shoe each, with the AI's bets, decisions and table rules and the engine's whole-chip payouts.
+        - Bets follow the AI: its bet_sizer (e.g. Kelly) if set, otherwise its count
+          based bet spread compiled by true count; flat_bet always bets base_bet
+        - A trajectory is ruined once it has fewer chips than it can bet (zero), and stops playing
+        - Only the current bankroll and ruin round of each trajectory are kept; the
+          distribution is summarized every checkpoint_every rounds and streamed
+    """
+    def __init__(self,
+                 ai: BlackJackAI,
+                 starting_chips: int = 1000,
+                 base_bet: int = 25,
+                 num_trajectories: int = 10000,
+                 penetration: float = 0.75,
+                 flat_bet: bool = False,
+                 seed: Optional[int] = None):
+        self.ai = ai
+        self.starting_chips = starting_chips
+        self.base_bet = base_bet
+        self.num_trajectories = num_trajectories
+        self.flat_bet = flat_bet
+        self.seed = seed if seed is not None else secrets.randbits(64)
+        shoe_size = 52 * ai.rules.num_decks
+        self.simulator = BatchSimulator(ai,
+                                        num_shoes=num_trajectories,
+                                        reshuffle_at=shoe_size - int(shoe_size * penetration) + 1,
+                                        seed=self.seed,
+                                        counting=ai.counting)
+        self.spread = compile_bet_spread(ai, base_bet)
+        self.chips = np.full(num_trajectories, starting_chips, dtype=np.int64)
+        self.ruined_at = np.full(num_trajectories, -1, dtype=np.int64)    # round of ruin, -1 while alive
+        self.rounds = 0
+
+    def bet_sizes(self) -> np.ndarray:
+        """
+            Bet of every trajectory for the next round (zero once ruined)
+        """
+        if self.flat_bet:
+            return np.minimum(self.base_bet, self.chips)
+        true_counts = self.simulator.true_counts()
+        if self.ai.bet_sizer is not None:
+            return self.ai.bet_sizer.bet_sizes(true_counts, self.base_bet, self.chips)
+        bins = np.clip(np.trunc(true_counts), *SPREAD_COUNTS).astype(np.intp) - SPREAD_COUNTS[0]
+        return np.minimum(self.spread[bins], self.chips)
+
+    def play_round(self):
+        bets = self.bet_sizes()
+        self.chips += self.simulator.play_round(bets, self.chips)
+        self.rounds += 1
+        self.ruined_at[(self.chips <= 0) & (self.ruined_at < 0)] = self.rounds
+
+    def checkpoint(self) -> Dict:
+        """
+            Summary of the bankroll distribution after the rounds played so far
+        """
+        ruined = self.ruined_at >= 0
+        # Session length until ruin; trajectories still alive are censored at the current round
+        lengths = np.where(ruined, self.ruined_at, self.rounds)
+        return {
+            'round': self.rounds,
+            'risk_of_ruin': float(ruined.mean()),
+            'median_session_length': float(np.median(lengths)),
+            'mean_chips': float(self.chips.mean()),
+            'percentiles': {str(p): float(v) for p, v in zip(PERCENTILES, np.percentile(self.chips, PERCENTILES))},
+        }
+
+    def progress(self, num_rounds: int, checkpoint_every: int = 100) -> Iterator[Dict]:
+        """
+            Play up to num_rounds rounds, yielding a checkpoint every checkpoint_every rounds
+            (and a last one when every trajectory is ruined)
+        """
+        while self.rounds < num_rounds:
+            self.play_round()
+            all_ruined = bool((self.ruined_at >= 0).all())
+            if self.rounds % checkpoint_every == 0 or self.rounds == num_rounds or all_ruined:
+                yield self.checkpoint()
+            if all_ruined:
+                break
+
+    def run(self, num_rounds: int, checkpoint_every: int = 100) -> Dict:
+        """
+            Play to completion
+            Returns: the final checkpoint, with the risk of ruin curve over all checkpoints
+        """
+        curve = []
+        report = self.checkpoint()
+        for report in self.progress(num_rounds, checkpoint_every):
+            curve.append([report['round'], report['risk_of_ruin']])
+        return {**report, 'ruin_curve': curve}
+
+    def to_dict(self):
+        return {
+            'strategy': self.ai.strategy,
+            'rules': self.ai.rules.name,
+            'bet_sizing': 'flat' if self.flat_bet else self.ai.bet_sizer.to_dict() if self.ai.bet_sizer else 'spread',
+            'starting_chips': self.starting_chips,
+            'base_bet': self.base_bet,
+            'num_trajectories': self.num_trajectories,
+            'seed': self.seed,
+        }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description='Simulate bankroll trajectories and risk of ruin')
+    parser.add_argument('strategy', nargs='?', default='basic')
+    parser.add_argument('--rules', default='classic')
+    parser.add_argument('--betting', choices=['spread', 'flat', 'kelly'], default='spread')
+    parser.add_argument('--kelly-fraction', type=float, default=0.5)
+    parser.add_argument('--chips', type=int, default=1000)
+    parser.add_argument('--base-bet', type=int, default=25)
+    parser.add_argument('--trajectories', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=10000)
+    parser.add_argument('--checkpoint-every', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    ai = BlackJackAI(strategy=args.strategy, rules=args.rules)
+    if args.betting == 'kelly':
+        ai.bet_sizer = KellyBetSizer(load_edge_table(args.strategy, rules=ai.rules), args.kelly_fraction)
+    simulator = BankrollSimulator(ai, args.chips, args.base_bet, args.trajectories,
+                                  flat_bet=args.betting == 'flat', seed=args.seed)
+    print(json.dumps(simulator.to_dict()))
+    for report in simulator.progress(args.rounds, args.checkpoint_every):
+        print(json.dumps(report))
+
+
+if __name__ == '__main__':
+    main()
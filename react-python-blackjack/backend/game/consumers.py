@@ -1,12 +1,54 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 from .game_engine import BlackJackGame
 from .ai_agent import BlackJackAI
+from .achievements import AchievementTracker
+from .expected_value import solver_for
+from .history import DatabaseHandSink, HandHistoryRecorder
+from .kelly import KellyBetSizer, load_edge_table
+from .metrics import metrics
+from .statistics import StatisticsAggregator
+from .probability import unseen_composition
+from .protocol import DELTA_PROTOCOL, PROTOCOL_VERSIONS, GameStateEncoder
+from .registry import GameRegistry, registry_from_settings
+from .rules import get_rules
+from .snapshot import dump_game, load_game
+from .store import VersionConflict, get_game_store
+from .table import BlackJackTable, TableSeat
+from .turbo import TurboSession
+from typing import Optional
+from urllib.parse import parse_qs
 import asyncio
 import json
+import re
+import uuid
+
+# Close code sent when the session's game was saved by another connection
+SESSION_CONFLICT_CLOSE_CODE = 4009
+# Close code sent when the connection's game was evicted from the game registry
+GAME_EVICTED_CLOSE_CODE = 4008
+# Close code sent when the table is hosted by another worker process
+TABLE_ELSEWHERE_CLOSE_CODE = 4010
+# This worker process, in the table claims kept in the game store
+WORKER_ID = uuid.uuid4().hex
+SESSION_ID_PATTERN = re.compile(r'\w{1,64}')
+# Action labels of the latency metrics (any other action is labelled 'unknown')
+METRIC_ACTIONS = frozenset({
+    'bet', 'deal', 'hit', 'stand', 'double', 'split', 'surrender', 'insurance', 'reset',
+    'toggle_ai', 'set_ai_strategy', 'hint', 'resync', 'turbo', 'stop_turbo',
+})
 
 class BlackJackConsumer(AsyncWebsocketConsumer):
-    games = {}      # store game instances per connection here
-    ai_agents = {}  # store AI agents per connection
+    games = registry_from_settings(snapshot=dump_game)  # game instances per connection
+    ai_agents = GameRegistry(capacity=games.capacity)   # AI agents per connection, removed with their games
+    # Playing actions: game method and error message
+    play_actions = {
+        'hit': ('hit', "Cannot hit now!"),
+        'stand': ('stand', "Cannot stand now!"),
+        'double': ('double_down', "Cannot double down - Insufficient chips or invalid hand!"),
+        'split': ('split', "Cannot split - Insufficient chips or invalid hand!"),
+        'surrender': ('surrender', "Cannot surrender now!"),
+        'insurance': ('buy_insurance', "Cannot buy insurance - Insufficient chips or dealer doesn't show Ace!"),
+    }
 
     def __init__(self, *args, **kwargs):
         super().__init__(args, kwargs)
@@ -14,44 +56,125 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
         self.ai_strategy = None
         self.ai_mode = None
         self.game_id = None
+        self.recorder = None
+        self.statistics = None
+        self.achievements = None
+        self.encoder = None
+        self.turbo = None
+        self.turbo_task = None
+        self.session_id = None
+        self.store = None
+        self.store_version = 0
+        self.checkpoint_due = False
+        self.eviction_task = None
 
     async def connect(self):
         await self.accept()
         # Create new game instance for this connection
         self.game_id = self.scope['url_route']['kwargs'].get('game_id', 'default')
-        self.games[self.channel_name] = BlackJackGame(num_decks=6)
-        self.ai_agents[self.channel_name] = BlackJackAI(strategy='basic')
+        # Table rules from the query string, e.g. ?rules=vegas-strip
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        try:
+            rules = get_rules(query.get('rules', [None])[0])
+        except ValueError as error:
+            rules = get_rules()
+            await self.send_error(str(error))
+        # Resume the session's game from the game store (?session=<id>), or start a new one
+        resumed = await self.load_session(query.get('session', [None])[0])
+        game = resumed or BlackJackGame(rules=rules)
+        rules = game.rules
+        self.games.add(self.channel_name, game, on_evict=self.game_evicted, restored=resumed is not None)
+        # Protocol version from the query string: ?protocol=2 sends a snapshot and then deltas
+        protocol = query.get('protocol', ['1'])[0]
+        if protocol not in map(str, PROTOCOL_VERSIONS):
+            await self.send_error(f"Unknown protocol version: {protocol}")
+        elif int(protocol) == DELTA_PROTOCOL:
+            self.encoder = GameStateEncoder(game)
+        self.ai_agents[self.channel_name] = BlackJackAI(strategy='basic', rules=rules)
+        game.deck.add_shuffle_listener(self.reset_ai_count)
+        game.add_card_listener(self.count_card)
+        # Record finished rounds in the background
+        self.recorder = HandHistoryRecorder(self.create_history_sink(game))
+        game.add_round_listener(self.recorder.record_round)
+        game.add_round_listener(self.round_finished)
+        # Keep signed-in players' statistics and achievements up to date on the same schedule
+        user = self.scope.get('user')
+        if user is not None and user.is_authenticated:
+            self.statistics = StatisticsAggregator(user.id)
+            self.achievements = AchievementTracker(user.id, statistics=self.statistics)
+            game.add_round_listener(self.record_statistics)
+            self.recorder.add_flush_listener(self.statistics.flush)
+            self.recorder.add_flush_listener(self.achievements.flush)
+        self.recorder.start()
         self.ai_mode = False
         self.ai_strategy = 'basic'
         self.ai_task = None
         # Send initial game state
         await self.send_game_state()
+        if resumed is not None:
+            await self.send_info("Resumed your game")
 
     async def disconnect(self, close_code):
         # Stop AI task if running
         if self.ai_task:
             self.ai_task.cancel()
+        if self.turbo_task:
+            self.turbo_task.cancel()
+        # Save changes not followed by a state update (e.g. an interrupted turbo session)
+        await self.save_session()
+        # Flush the remaining hand history
+        if self.recorder:
+            await self.recorder.close()
         # Clean up game instance and AI agents
-        if self.channel_name in self.games:
-            del self.games[self.channel_name]
-        if self.channel_name in self.ai_agents:
-            del self.ai_agents[self.channel_name]
+        self.games.pop(self.channel_name, None)
+        self.ai_agents.pop(self.channel_name, None)
+
+    def game_evicted(self, game: BlackJackGame, data: Optional[bytes]):
+        """
+            Game registry callback: the game was evicted (idle, or the registry was full).
+            Save its snapshot and close the connection; the client can resume the session.
+        """
+        self.ai_agents.pop(self.channel_name, None)
+        self.eviction_task = asyncio.ensure_future(self.close_evicted(data))
+
+    async def close_evicted(self, data: Optional[bytes]):
+        if data is not None:
+            await self.save_session(data)
+        try:
+            await self.send_error("Game closed to free server resources - reconnect to resume it")
+            await self.close(code=GAME_EVICTED_CLOSE_CODE)
+        except Exception:
+            pass    # the connection was already gone (it never disconnected cleanly)
 
     async def receive(self, text_data):
         """
             Receive game data from the client
         """
         try:
-            data = json.loads(text_data)
-            action = data.get('action')
+            with metrics.span('decode'):
+                data = json.loads(text_data)
+                action = data.get('action')
+                metrics.set_action(action if action in METRIC_ACTIONS else 'unknown')
             game = self.games.get(self.channel_name)
             ai = self.ai_agents.get(self.channel_name)
             if not game:
                 await self.send_error("Game not found!")
                 return
+            # Turbo AI session: the game is busy until it ends or is stopped
+            if action == 'turbo':
+                await self.start_turbo(data)
+                return
+            elif action == 'stop_turbo':
+                if self.turbo:
+                    self.turbo.stop()
+                return
+            elif self.turbo:
+                await self.send_error("Turbo session running - stop it first!")
+                return
             # Handle AI toggle
             if action == 'toggle_ai':
                 self.ai_mode = not self.ai_mode
+                self.update_history_ai()
                 await self.send_ai_status()
                 # If AI just enabled and in betting phase, make AI bet
                 if self.ai_mode and game.game_phase == 'betting':
@@ -61,11 +184,31 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
             # Handle AI strategy change
             elif action == 'set_ai_strategy':
                 strategy = data.get('strategy', 'basic')
-                if strategy in ['simple', 'basic', 'conservative']:
+                if strategy in ['simple', 'basic', 'conservative', 'optimal']:
                     self.ai_strategy = strategy
-                    self.ai_agents[self.channel_name] = BlackJackAI(strategy=strategy)
+                    new_ai = BlackJackAI(strategy=strategy, rules=game.rules)
+                    if ai:
+                        # Keep the count of the current shoe
+                        new_ai.running_count, new_ai.true_count = ai.running_count, ai.true_count
+                    # Optional Kelly bet sizing, e.g. 0.5 for half Kelly
+                    kelly_fraction = data.get('kelly_fraction')
+                    if kelly_fraction:
+                        try:
+                            new_ai.bet_sizer = await self.create_bet_sizer(strategy, float(kelly_fraction))
+                        except ValueError as error:
+                            await self.send_error(str(error))
+                    self.ai_agents[self.channel_name] = new_ai
+                    self.update_history_ai()
                     await self.send_ai_status()
                 return
+            # Handle hint request
+            elif action == 'hint':
+                await self.send_hint()
+                return
+            # Handle resync request (a client that missed a delta)
+            elif action == 'resync':
+                await self.send_game_state(snapshot=True)
+                return
             # If AI mode is on, ignore manual actions during play
             if self.ai_mode and action not in ['reset', 'toggle_ai', 'set_ai_strategy']:
                 if game.game_phase == 'playing':
@@ -74,50 +217,26 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
             # Handle different actions
             if action == "bet":
                 amount = data.get('amount', 0)
-                if game.place_bet(amount):
+                if self.play(game, 'place_bet', amount):
                     await self.send_game_state()
                 else:
                     await self.send_error("Invalid bet amount!")
             elif action == "deal":
-                if game.start_round():
+                if self.play(game, 'start_round'):
                     await self.send_game_state()
                     # If AI mode is on, start AI play
                     if self.ai_mode:
                         self.ai_task = asyncio.create_task(self.ai_play_hand())
                 else:
                     await self.send_error("Cannot deal - place bet first!")
-            elif action == "hit":
-                if game.hit():
+            elif action in self.play_actions:
+                method, error = self.play_actions[action]
+                if self.play(game, method):
                     await self.send_game_state()
                 else:
-                    await self.send_error("Cannot hit now!")
-            elif action == "stand":
-                if game.stand():
-                    await self.send_game_state()
-                else:
-                    await self.send_error("Cannot stand now!")
-            elif action == "double":
-                if game.double_down():
-                    await self.send_game_state()
-                else:
-                    await self.send_error("Cannot double down - Insufficient chips or invalid hand!")
-            elif action == "split":
-                if game.split():
-                    await self.send_game_state()
-                else:
-                    await self.send_error("Cannot split - Insufficient chips or invalid hand!")
-            elif action == "surrender":
-                if game.surrender():
-                    await self.send_game_state()
-                else:
-                    await self.send_error("Cannot surrender now!")
-            elif action == "insurance":
-                if game.buy_insurance():
-                    await self.send_game_state()
-                else:
-                    await self.send_error("Cannot buy insurance - Insufficient chips or dealer doesn't show Ace!")
+                    await self.send_error(error)
             elif action == "reset":
-                game.reset_round()
+                self.play(game, 'reset_round')
                 if self.ai_task:
                     self.ai_task.cancel()
                 await self.send_game_state()
@@ -130,6 +249,14 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             await self.send_error(f"Error processing action: {str(e)}")
 
+    @staticmethod
+    def play(game: BlackJackGame, method: str, *args) -> bool:
+        """
+            Run a game action, timed as the engine stage of the current action
+        """
+        with metrics.span('engine'):
+            return getattr(game, method)(*args)
+
     async def ai_make_bet(self):
         """
             AI makes a bet decision
@@ -142,13 +269,15 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
 
         # Determine bet size based on employed strategy
         base_bet = 25   # Base bet amount
-        bet_amount = ai.get_bet_size(base_bet, game.player_chips)
-        if game.place_bet(bet_amount):
+        with metrics.span('ai'):
+            metrics.set_action('ai_bet')
+            bet_amount = ai.get_bet_size(base_bet, game.player_chips)
+        if self.play(game, 'place_bet', bet_amount):
             await self.send_game_state()
             await self.send_info(f"AI bet ${bet_amount}")
             # Auto-deal after betting
             await asyncio.sleep(1)
-            if game.start_round():
+            if self.play(game, 'start_round'):
                 await self.send_game_state()
                 await asyncio.sleep(0.5)
                 # Start AI play
@@ -166,68 +295,74 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
         try:
             while game.game_phase == 'playing':
                 current_hand = game.player_hands[game.current_hand_index]
-                dealer_up_card = game.dealer_hand.cards[0]
+                dealer_up_card = game.dealer_hand.cards[1]     # cards[0] is the hidden hole card
                 # Check if AI should buy insurance
                 if (game.current_hand_index == 0 and
                         dealer_up_card.rank.value == 'A' and not current_hand.is_insured and
                         game.player_chips >= game.current_bet // 2):
-                    if ai.should_buy_insurance(dealer_up_card, current_hand):
+                    with metrics.span('ai'):
+                        metrics.set_action('ai_insurance')
+                        insure = ai.should_buy_insurance(dealer_up_card, current_hand)
+                    if insure:
                         await asyncio.sleep(1)
-                        if game.buy_insurance():
+                        if self.play(game, 'buy_insurance'):
                             await self.send_game_state()
                             await self.send_info("AI bought insurance")
                 # Get AI's decision
-                action = ai.get_action(
-                    current_hand,
-                    dealer_up_card,
-                    can_double=current_hand.can_double(),
-                    can_split=current_hand.can_split(),
-                    can_surrender=(game.current_hand_index == 0 and len(current_hand.cards) == 2)
-                )
+                with metrics.span('ai'):
+                    ai.observe_shoe(unseen_composition(game))
+                    action = ai.get_action(
+                        current_hand,
+                        dealer_up_card,
+                        can_double=game.can_double(),
+                        can_split=game.can_split(),
+                        can_surrender=(game.current_hand_index == 0 and game.can_surrender())
+                    )
+                    metrics.set_action(f'ai_{action}')
                 # Delay for visualization
                 await asyncio.sleep(1)
                 # Execute action
                 if action == 'hit':
-                    if game.hit():
+                    if self.play(game, 'hit'):
                         await self.send_game_state()
                         await self.send_info("AI hits")
                     else:
                         break
                 elif action == 'stand':
-                    if game.stand():
+                    if self.play(game, 'stand'):
                         await self.send_game_state()
                         await self.send_info("AI stands")
                     else:
                         break
                 elif action == 'double':
-                    if game.double_down():
+                    if self.play(game, 'double_down'):
                         await self.send_game_state()
                         await self.send_info("AI doubles down")
                     else:
                         # Fallback to hit
-                        if game.hit():
+                        if self.play(game, 'hit'):
                             await self.send_game_state()
                             await self.send_info("AI hits (couldn't double down)")
                         else:
                             break
                 elif action == 'split':
-                    if game.split():
+                    if self.play(game, 'split'):
                         await self.send_game_state()
                         await self.send_info("AI splits")
                     else:
                         # Fallback to hit
-                        if game.hit():
+                        if self.play(game, 'hit'):
                             await self.send_game_state()
                             await self.send_info("AI hits (couldn't split)")
                         else:
                             break
                 elif action == 'surrender':
-                    if game.surrender():
+                    if self.play(game, 'surrender'):
                         await self.send_game_state()
                         await self.send_info("AI surrenders")
                     else:
                         # Fallback to stand
-                        if game.stand():
+                        if self.play(game, 'stand'):
                             await self.send_game_state()
                             await self.send_info("AI stands (couldn't surrender)")
                         else:
@@ -241,7 +376,8 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
             # After game finishes, auto-reset for next round if AI mode is on
             if game.game_phase == 'finished':
                 await asyncio.sleep(3)
-                game.reset_round()
+                metrics.set_action('ai_reset')
+                self.play(game, 'reset_round')
                 await self.send_game_state()
                 await asyncio.sleep(1)
                 # Make bet for next round
@@ -251,21 +387,212 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
         except asyncio.CancelledError:
             pass
 
-    async def send_game_state(self):
+    async def start_turbo(self, data):
+        """
+            Play N hands with the AI at full speed, sending aggregate summaries
+        """
+        game = self.games.get(self.channel_name)
+        ai = self.ai_agents.get(self.channel_name)
+        if self.turbo:
+            await self.send_error("Turbo session already running!")
+            return
+        if game.game_phase not in ['betting', 'finished']:
+            await self.send_error("Cannot start turbo - finish the hand first!")
+            return
+        try:
+            turbo = TurboSession(game, ai,
+                                 num_rounds=int(data.get('hands', 1000)),
+                                 base_bet=int(data.get('base_bet', 25)),
+                                 summary_every=int(data.get('summary_every', 100)))
+        except ValueError as error:
+            await self.send_error(str(error))
+            return
+        # Turbo replaces the step-by-step AI play
+        if self.ai_task:
+            self.ai_task.cancel()
+        if game.game_phase == 'finished':
+            game.reset_round()
+        if game.current_bet:
+            # Return a bet placed by hand; the AI bets every round itself
+            game.player_chips += game.current_bet
+            game.current_bet = 0
+        self.turbo = turbo
+        self.update_history_ai()
+        self.turbo_task = asyncio.create_task(self.run_turbo())
+
+    async def run_turbo(self):
+        try:
+            await self.turbo.run(self.send_turbo_summary)
+        finally:
+            self.turbo = None
+            self.turbo_task = None
+        await self.send_game_state()
+
+    async def send_turbo_summary(self, summary):
+        await self.send(text_data=json.dumps({'type': 'turbo_summary', **summary}))
+
+    def create_history_sink(self, game: BlackJackGame):
+        """
+            Sink for this connection's hand history
+        """
+        user = self.scope.get('user')
+        return DatabaseHandSink(
+            user=user if user is not None and user.is_authenticated else None,
+            starting_chips=game.player_chips,
+        )
+
+    def update_history_ai(self):
+        """
+            Mark the hand history session as AI played once the AI plays a hand, with its strategy
+        """
+        sink = self.recorder.sink
+        if self.ai_mode or self.turbo is not None:
+            sink.ai_mode = True
+        if sink.ai_mode:
+            sink.ai_strategy = self.ai_strategy
+
+    def record_statistics(self, game: BlackJackGame):
+        """
+            Fold a finished round into the player's pending statistics and achievement progress
+        """
+        ai_mode = self.ai_mode or self.turbo is not None
+        self.statistics.record_round(game, ai_mode=ai_mode)
+        self.achievements.record_round(game, ai_mode=ai_mode)
+
+    def count_card(self, card):
+        """
+            Update the AI card count with a card shown at the table
+        """
+        ai = self.ai_agents.get(self.channel_name)
+        game = self.games.get(self.channel_name)
+        if ai and game:
+            ai.observe_card(card, game.deck.remaining() / 52)
+
+    def reset_ai_count(self):
+        """
+            Reset the AI card count when the shoe is reshuffled
+        """
+        ai = self.ai_agents.get(self.channel_name)
+        if ai:
+            ai.reset_count()
+
+    async def load_session(self, session_id: Optional[str]) -> Optional[BlackJackGame]:
+        """
+            Load a session's game from the game store (None for a new or unknown session)
+        """
+        self.store = get_game_store()
+        self.store_version = 0
+        if session_id is not None and not SESSION_ID_PATTERN.fullmatch(session_id):
+            await self.send_error("Invalid session id - starting a new session")
+            session_id = None
+        self.session_id = session_id or uuid.uuid4().hex
+        stored = await self.store.load(self.store_key())
+        if stored is None:
+            return None
+        try:
+            game = load_game(stored.data)
+        except ValueError:
+            await self.send_error("Saved game could not be restored - starting a new game")
+            await self.store.delete(self.store_key())
+            return None
+        self.store_version = stored.version
+        return game
+
+    def store_key(self) -> str:
+        return f"blackjack:{self.session_id}"
+
+    async def save_session(self, data: Optional[bytes] = None):
+        """
+            Checkpoint the game (or the given snapshot of it) to the game store. If another
+            connection saved the game since, its version wins and this connection is closed.
+        """
+        if not self.store:
+            return
+        if data is None:
+            game = self.games.get(self.channel_name)
+            if not game:
+                return
+            data = dump_game(game)
+        try:
+            self.store_version = await self.store.save(self.store_key(), data, self.store_version)
+        except VersionConflict:
+            self.store = None
+            await self.send_error("Session continued on another connection")
+            await self.close(code=SESSION_CONFLICT_CLOSE_CODE)
+
+    def round_finished(self, game: BlackJackGame):
         """
-            Send current game state to the client
+            Round listener: checkpoint the game with the next state update
+        """
+        self.checkpoint_due = True
+
+    async def send_game_state(self, snapshot: bool = False):
+        """
+            Send current game state to the client (only the changes under the delta protocol),
+            then checkpoint it if a round finished since the last checkpoint
         """
         game = self.games.get(self.channel_name)
         if game:
             # Hide dealer's first card during play
             hide_dealer_card = game.game_phase in ['betting', 'playing']
-            # Send game state message
-            await self.send(text_data=json.dumps({
-                'type': 'game_state',
-                'state': game.get_state(hide_dealer_card=hide_dealer_card),
-                'ai_mode': self.ai_mode,
-                'ai_strategy': self.ai_strategy
-            }))
+            with metrics.span('serialize'):
+                if self.encoder:
+                    encode = self.encoder.snapshot if snapshot else self.encoder.delta
+                    message = encode(hide_dealer_card, ai_mode=self.ai_mode, ai_strategy=self.ai_strategy,
+                                     session_id=self.session_id)
+                else:
+                    message = {
+                        'type': 'game_state',
+                        'state': game.get_state(hide_dealer_card=hide_dealer_card),
+                        'ai_mode': self.ai_mode,
+                        'ai_strategy': self.ai_strategy,
+                        'session_id': self.session_id
+                    }
+                text_data = json.dumps(message) if message else None
+            # Nothing to send when no delta changed
+            if text_data is None:
+                return
+            with metrics.span('send'):
+                await self.send(text_data=text_data)
+            if self.checkpoint_due:
+                self.checkpoint_due = False
+                await self.save_session()
+
+    async def send_hint(self):
+        """
+            Send the expected value of every action for the current hand
+        """
+        game = self.games.get(self.channel_name)
+        if not game or game.game_phase != 'playing':
+            await self.send_error("No hand to give a hint for!")
+            return
+        current_hand = game.player_hands[game.current_hand_index]
+        can_afford = game.player_chips >= current_hand.bet
+        action_values = solver_for(game.rules).action_values(
+            current_hand,
+            game.dealer_hand.cards[1],     # the up card (cards[0] is the hidden hole card)
+            unseen_composition(game),
+            can_double=game.can_double() and can_afford,
+            can_split=game.can_split() and can_afford,
+            can_surrender=(game.current_hand_index == 0 and game.can_surrender())
+        )
+        await self.send(text_data=json.dumps({
+            'type': 'hint',
+            'best_action': max(action_values, key=action_values.get),
+            'action_values': action_values
+        }))
+
+    async def create_bet_sizer(self, strategy: str, fraction: float) -> KellyBetSizer:
+        """
+            Kelly bet sizer for the current game (raises ValueError without an edge table)
+        """
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Kelly fraction must be in (0, 1], got {fraction}")
+        game = self.games.get(self.channel_name)
+        if not game:
+            raise ValueError("Game not found!")
+        table = await asyncio.to_thread(load_edge_table, strategy, 'hi-lo', game.rules, game.deck.penetration)
+        return KellyBetSizer(table, fraction)
 
     async def send_ai_status(self):
         """
@@ -276,7 +603,8 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
             'type': 'ai_status',
             'ai_mode': self.ai_mode,
             'strategy': self.ai_strategy,
-            'description': ai.get_strategy_description() if ai else ""
+            'description': ai.get_strategy_description() if ai else "",
+            'bet_sizing': ai.bet_sizer.to_dict() if ai and ai.bet_sizer else None,
         }))
 
     async def send_error(self, error_message: str):
@@ -297,4 +625,178 @@ class BlackJackConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'type': 'info',
             'message': info_message
-        }))
\ No newline at end of file
+        }))
+
+
+class BlackJackTableConsumer(AsyncWebsocketConsumer):
+    """
+        Seat at a multi-seat table addressed by game_id. Every table change is serialized
+        once and fanned out to all seats through the table's channel group.
+        A table's seats and shoe live in the memory of the worker hosting it, so a worker
+        claims the table in the game store before hosting it, and players routed to another
+        worker are turned away until the last seat leaves. The claims need a shared game
+        store (SQLite or Redis) when several workers serve tables; a claim left by a worker
+        that stopped with players seated expires with the store's ttl.
+    """
+    tables = {}     # tables hosted by this process, by game_id
+    # Playing actions: seat method and error message
+    seat_actions = {
+        'hit': ('hit', "Cannot hit now!"),
+        'stand': ('stand', "Cannot stand now!"),
+        'double': ('double_down', "Cannot double down - Insufficient chips or invalid hand!"),
+        'split': ('split', "Cannot split - Insufficient chips or invalid hand!"),
+        'surrender': ('surrender', "Cannot surrender now!"),
+        'insurance': ('buy_insurance', "Cannot buy insurance - Insufficient chips or dealer doesn't show Ace!"),
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.game_id = None
+        self.group_name = None
+        self.seat = None
+        self.recorder = None
+        self.statistics = None
+        self.achievements = None
+
+    async def connect(self):
+        await self.accept()
+        self.game_id = self.scope['url_route']['kwargs'].get('game_id', 'default')
+        self.group_name = f"blackjack_table_{self.game_id}"
+        table = self.tables.get(self.game_id)
+        if table is None:
+            if not await self.claim_table():
+                await self.send_error("Table is hosted on another server - try again later")
+                await self.close(code=TABLE_ELSEWHERE_CLOSE_CODE)
+                return
+            table = self.tables.get(self.game_id)
+        if table is None:
+            # The first player picks the table rules, e.g. ?rules=vegas-strip
+            query = parse_qs(self.scope.get('query_string', b'').decode())
+            try:
+                rules = get_rules(query.get('rules', [None])[0])
+            except ValueError as error:
+                rules = get_rules()
+                await self.send_error(str(error))
+            table = self.tables[self.game_id] = BlackJackTable(self.game_id, rules=rules)
+        user = self.scope.get('user')
+        signed_in = user is not None and user.is_authenticated
+        self.seat = table.join(user.username if signed_in else 'Guest')
+        if self.seat is None:
+            await self.send_error("Table is full!")
+            await self.close()
+            return
+        # Record this seat's rounds in the background
+        self.recorder = HandHistoryRecorder(DatabaseHandSink(
+            user=user if signed_in else None,
+            starting_chips=self.seat.player_chips,
+        ))
+        self.seat.add_round_listener(self.recorder.record_round)
+        if signed_in:
+            self.statistics = StatisticsAggregator(user.id)
+            self.achievements = AchievementTracker(user.id, statistics=self.statistics)
+            self.seat.add_round_listener(self.record_statistics)
+            self.recorder.add_flush_listener(self.statistics.flush)
+            self.recorder.add_flush_listener(self.achievements.flush)
+        self.recorder.start()
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.send(text_data=json.dumps({'type': 'seat', 'seat': self.seat.seat_index}))
+        await self.broadcast_state()
+
+    async def disconnect(self, close_code):
+        if self.seat is None:
+            return
+        table = self.seat.table
+        table.leave(self.seat)
+        self.seat = None
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if self.recorder:
+            await self.recorder.close()
+        if table.is_empty():
+            if self.tables.get(self.game_id) is table:
+                del self.tables[self.game_id]
+                await get_game_store().delete(self.claim_key())
+        else:
+            await self.broadcast_state(table)
+
+    def claim_key(self) -> str:
+        return f"blackjack-table:{self.game_id}"
+
+    async def claim_table(self) -> bool:
+        """
+            Claim the table for this worker in the game store
+            Returns: whether this worker hosts the table
+        """
+        store = get_game_store()
+        try:
+            await store.save(self.claim_key(), WORKER_ID.encode(), 0)
+            return True
+        except VersionConflict:
+            stored = await store.load(self.claim_key())
+            return stored is not None and stored.data == WORKER_ID.encode()
+
+    async def receive(self, text_data):
+        """
+            Receive a seat action from the client
+        """
+        try:
+            data = json.loads(text_data)
+            action = data.get('action')
+            seat = self.seat
+            if not seat:
+                await self.send_error("Seat not found!")
+                return
+            if action == 'bet':
+                if not seat.place_bet(data.get('amount', 0)):
+                    await self.send_error("Invalid bet amount!")
+                    return
+            elif action == 'deal':
+                if not seat.table.start_round():
+                    await self.send_error("Cannot deal - place bet first!")
+                    return
+            elif action == 'reset':
+                if not seat.table.reset_round():
+                    await self.send_error("Cannot reset - round in progress!")
+                    return
+            elif action in self.seat_actions:
+                method, error = self.seat_actions[action]
+                if not getattr(seat, method)():
+                    await self.send_error(error)
+                    return
+            else:
+                await self.send_error(f"Unknown action: {action}")
+                return
+            await self.broadcast_state()
+        except Exception as e:
+            await self.send_error(f"Error processing action: {str(e)}")
+
+    def record_statistics(self, seat: TableSeat):
+        """
+            Fold a finished round into the player's pending statistics and achievement progress
+        """
+        self.statistics.record_round(seat)
+        self.achievements.record_round(seat)
+
+    async def broadcast_state(self, table: Optional[BlackJackTable] = None):
+        """
+            Serialize the table state once and send it to every seat at the table
+        """
+        table = table or self.seat.table
+        await self.channel_layer.group_send(self.group_name, {
+            'type': 'table.state',
+            'text': json.dumps({'type': 'table_state', 'state': table.get_state()}),
+        })
+
+    async def table_state(self, event):
+        """
+            Forward a serialized table state from the group to the client
+        """
+        await self.send(text_data=event['text'])
+
+    async def send_error(self, error_message: str):
+        """
+            Sends error message to the client
+        """
+        await self.send(text_data=json.dumps({
+            'type': 'error',
+            'error': error_message
+        }))
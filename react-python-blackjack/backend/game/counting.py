@@ -0,0 +1,80 @@
+from .game_engine import Card, VALUE_INDEX
+from typing import Dict, Sequence
+import numpy as np
+
+
+class CountingSystem:
+    """
+        Card counting system defined by a tag vector over card values (Ace, 2-9, ten-valued).
+        Tags are expanded once into per card code and per card value lookup tables,
+        so counting a card is a single index, and numpy arrays of cards can be counted at once.
+        - Balanced systems convert the running count to a true count per deck remaining
+        - Unbalanced systems start from an initial running count and bet on the running count
+    """
+    def __init__(self,
+                 name: str,
+                 tags: Sequence[int],
+                 balanced: bool = True,
+                 initial_count_per_deck: int = 0,
+                 initial_count_offset: int = 0):
+        if len(tags) != 10:
+            raise ValueError(f"{name} needs one tag per card value, got {len(tags)}")
+        self.name = name
+        self.tags = tuple(tags)
+        self.balanced = balanced
+        self.initial_count_per_deck = initial_count_per_deck
+        self.initial_count_offset = initial_count_offset
+        self.code_tags = tuple(self.tags[VALUE_INDEX[code]] for code in range(52))
+        self.value_tags = np.array((0,) + self.tags, dtype=np.int8)    # indexed by value, Ace = 1
+
+    def tag(self, card: Card) -> int:
+        return self.code_tags[card.code]
+
+    def initial_count(self, num_decks: int) -> int:
+        """
+            Running count at the start of a fresh shoe
+        """
+        return self.initial_count_offset + self.initial_count_per_deck * num_decks
+
+    def true_count(self, running_count: float, decks_remaining: float) -> float:
+        """
+            Count used for betting and insurance decisions
+        """
+        if not self.balanced:
+            return running_count
+        if decks_remaining > 0:
+            return running_count / decks_remaining
+        return 0
+
+    def count_values(self, values: np.ndarray) -> np.ndarray:
+        """
+            Tags for an array of card values (Ace = 1, ten-valued = 10)
+        """
+        return self.value_tags[values]
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'tags': list(self.tags),
+            'balanced': self.balanced,
+        }
+
+
+# Tags ordered Ace, 2, 3, 4, 5, 6, 7, 8, 9, ten-valued
+COUNTING_SYSTEMS: Dict[str, CountingSystem] = {
+    'hi-lo': CountingSystem('Hi-Lo', (-1, 1, 1, 1, 1, 1, 0, 0, 0, -1)),
+    'ko': CountingSystem('KO', (-1, 1, 1, 1, 1, 1, 1, 0, 0, -1), balanced=False,
+                         initial_count_per_deck=-4, initial_count_offset=4),
+    'hi-opt-ii': CountingSystem('Hi-Opt II', (0, 1, 1, 2, 2, 1, 1, 0, 0, -2)),
+    'omega-ii': CountingSystem('Omega II', (0, 1, 1, 2, 2, 2, 1, 0, -1, -2)),
+}
+
+
+def get_counting_system(name: str) -> CountingSystem:
+    """
+        Look up a counting system by key (e.g. 'hi-lo')
+    """
+    try:
+        return COUNTING_SYSTEMS[name]
+    except KeyError:
+        raise ValueError(f"Unknown counting system: {name}") from None
@@ -0,0 +1,200 @@
+from .game_engine import Hand, Card
+from .probability import DealerProbabilities, Composition, dealer_probabilities, card_index, BLACKJACK, BUST
+from .rules import DEFAULT_RULES, RuleSet
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+ACTIONS = ('stand', 'hit', 'double', 'split', 'surrender')
+
+
+class ExpectedValueSolver:
+    """
+        Composition-dependent expected value (in units of the bet) of every player action.
+        - The dealer outcome distribution is exact for the unseen cards at the decision
+        - Player draws deplete the composition along each hit path
+        - Split is valued as two hands drawing to one card each, without resplitting
+        - Blackjack payout, doubling after a split and the surrender type follow the rules
+        Results are cached by (hand composition, up card, shoe composition bucket, allowed actions),
+        so repeated states in a long session reuse earlier work.
+    """
+    def __init__(self,
+                 dealer: DealerProbabilities = dealer_probabilities,
+                 bucket_size: int = 4,
+                 maxsize: int = 50000,
+                 rules: RuleSet = DEFAULT_RULES):
+        self.dealer = dealer
+        self.rules = rules
+        self.blackjack_ratio = rules.blackjack_ratio
+        self.bucket_size = bucket_size
+        self.maxsize = maxsize
+        self.cache: 'OrderedDict[Tuple, Dict[str, float]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # -----------------------------
+    #        PUBLIC INTERFACE
+    # -----------------------------
+    def action_values(self,
+                      player_hand: Hand,
+                      dealer_up_card: Card,
+                      composition: Composition,
+                      can_double: bool = True,
+                      can_split: bool = False,
+                      can_surrender: bool = False) -> Dict[str, float]:
+        """
+            Expected value of every allowed action for the hand against the unseen cards
+        """
+        hand_key = tuple(sorted(card_index(card) for card in player_hand.cards))
+        up_index = card_index(dealer_up_card)
+        bucket = tuple(count // self.bucket_size for count in composition)
+        key = (hand_key, up_index, bucket, bool(can_double), bool(can_split), bool(can_surrender))
+        values = self.cache.get(key)
+        if values is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return values
+        self.misses += 1
+        values = self.solve(hand_key, up_index, tuple(composition), can_double, can_split, can_surrender)
+        self.cache[key] = values
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return values
+
+    def best_action(self,
+                    player_hand: Hand,
+                    dealer_up_card: Card,
+                    composition: Composition,
+                    can_double: bool = True,
+                    can_split: bool = False,
+                    can_surrender: bool = False) -> str:
+        """
+            Action with the highest expected value
+        """
+        values = self.action_values(player_hand, dealer_up_card, composition, can_double, can_split, can_surrender)
+        return max(values, key=values.get)
+
+    # -----------------------------
+    #          EV RECURSION
+    # -----------------------------
+    def solve(self,
+              hand_key: Tuple[int, ...],
+              up_index: int,
+              composition: Composition,
+              can_double: bool, can_split: bool, can_surrender: bool) -> Dict[str, float]:
+        dealer = self.dealer.outcomes(up_index, composition)
+        hard = sum(index + 1 for index in hand_key)
+        soft = 0 in hand_key
+        memo = {}
+        values = {
+            'stand': self.stand_value(hard, soft, len(hand_key) == 2, dealer),
+            'hit': self.hit_value(hard, soft, composition, dealer, memo),
+        }
+        if can_double and len(hand_key) == 2:
+            values['double'] = self.double_value(hard, soft, composition, dealer)
+        if can_split and len(hand_key) == 2 and hand_key[0] == hand_key[1]:
+            values['split'] = self.split_value(hand_key[0], composition, dealer)
+        if can_surrender and len(hand_key) == 2 and self.rules.surrender != 'none':
+            # A late surrender loses the whole bet to a dealer blackjack
+            values['surrender'] = -0.5 - (0.5 * dealer[BLACKJACK] if self.rules.surrender == 'late' else 0.0)
+        return values
+
+    def stand_value(self, hard: int, soft: bool, two_cards: bool, dealer: Tuple[float, ...]) -> float:
+        """
+            EV of standing, following resolve_bets (a dealer blackjack pushes any player 21)
+        """
+        value = hard + 10 if soft and hard <= 11 else hard
+        if value > 21:
+            return -1.0
+        if two_cards and value == 21:
+            return self.blackjack_ratio * (1.0 - dealer[BLACKJACK])
+        ev = dealer[BUST]
+        for outcome, probability in enumerate(dealer[:BLACKJACK + 1]):
+            dealer_value = 21 if outcome == BLACKJACK else outcome + 17
+            if value > dealer_value:
+                ev += probability
+            elif value < dealer_value:
+                ev -= probability
+        return ev
+
+    def hit_value(self, hard: int, soft: bool, composition: Composition, dealer: Tuple[float, ...], memo: Dict) -> float:
+        """
+            EV of taking a card and then playing optimally (hit or stand)
+        """
+        key = (hard, soft, composition)
+        if key in memo:
+            return memo[key]
+        total = sum(composition)
+        ev = 0.0
+        for index, count in enumerate(composition):
+            if not count:
+                continue
+            new_hard = hard + index + 1
+            new_soft = soft or index == 0
+            if new_hard > 21:
+                ev -= count / total
+                continue
+            remaining = composition[:index] + (count - 1,) + composition[index + 1:]
+            stand = self.stand_value(new_hard, new_soft, False, dealer)
+            hit = self.hit_value(new_hard, new_soft, remaining, dealer, memo) if new_hard < 21 else -1.0
+            ev += count / total * max(stand, hit)
+        memo[key] = ev
+        return ev
+
+    def double_value(self, hard: int, soft: bool, composition: Composition, dealer: Tuple[float, ...]) -> float:
+        """
+            EV of doubling the bet and taking exactly one card
+        """
+        total = sum(composition)
+        ev = 0.0
+        for index, count in enumerate(composition):
+            if count:
+                ev += count / total * self.stand_value(hard + index + 1, soft or index == 0, False, dealer)
+        return 2.0 * ev
+
+    def split_value(self, pair_index: int, composition: Composition, dealer: Tuple[float, ...]) -> float:
+        """
+            EV of splitting: two hands, each starting from one pair card plus a drawn card
+        """
+        total = sum(composition)
+        memo = {}
+        ev = 0.0
+        for index, count in enumerate(composition):
+            if not count:
+                continue
+            hard = pair_index + index + 2
+            soft = pair_index == 0 or index == 0
+            remaining = composition[:index] + (count - 1,) + composition[index + 1:]
+            best = max(self.stand_value(hard, soft, True, dealer),
+                       self.hit_value(hard, soft, remaining, dealer, memo))
+            if self.rules.double_after_split:
+                best = max(best, self.double_value(hard, soft, remaining, dealer))
+            ev += count / total * best
+        return 2.0 * ev
+
+    def cache_info(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.cache), 'maxsize': self.maxsize}
+
+
+# Shared solver, so every consumer reuses the same cache
+expected_value_solver = ExpectedValueSolver()
+
+
+@lru_cache(maxsize=None)
+def solver_for(rules: RuleSet) -> ExpectedValueSolver:
+    """
+        Shared solver (and dealer probabilities) for a rule set
+    """
+    if rules == DEFAULT_RULES:
+        return expected_value_solver
+    return ExpectedValueSolver(DealerProbabilities(hit_soft_17=rules.dealer_hits_soft_17), rules=rules)
+
+
+def full_shoe(num_decks: int = 6, exclude: Optional[Tuple[Card, ...]] = None) -> Composition:
+    """
+        Composition of a fresh shoe, minus any cards already seen
+    """
+    counts = [4 * num_decks] * 9 + [16 * num_decks]
+    for card in exclude or ():
+        counts[card_index(card)] -= 1
+    return tuple(counts)
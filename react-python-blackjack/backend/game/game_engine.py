@@ -1,6 +1,11 @@
+from .rules import RuleSet, get_rules
+from array import array
+from collections import deque
+from collections.abc import Sequence
 from enum import Enum
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional, Union
 import random
+import secrets
 
 class Suit(Enum):
     HEARTS = '♥'
@@ -24,112 +29,332 @@ class Rank(Enum):
     KING = 'K'
 
 class Card:
+    __slots__ = ('suit', 'rank', 'code', '_value', '_dict')
+
     def __init__(self, suit: Suit, rank: Rank):
         self.suit = suit
         self.rank = rank
+        self.code = SUIT_INDEX[suit] * 13 + RANK_INDEX[rank]
+        self._value = RANK_VALUES[RANK_INDEX[rank]]
+        self._dict = {'suit': suit.value, 'rank': rank.value, 'value': self._value}
+
+    @classmethod
+    def from_code(cls, code: int) -> 'Card':
+        """
+            Get the shared Card instance for an integer card code
+        """
+        return CARDS[code]
 
     def value(self) -> int:
         """
             Get numeric value of a card
             (Ace - 11, Face cards - 10)
         """
-        if self.rank == Rank.ACE:
-            return 11
-        elif self.rank in [Rank.JACK, Rank.QUEEN, Rank.KING]:
-            return 10
-        else:
-            return int(self.rank.value)
+        return self._value
 
     def to_dict(self):
         """
             Get dictionary with all card related information
         """
-        return {
-            'suit': self.suit.value,
-            'rank': self.rank.value,
-            'value': self.value()
-        }
+        return dict(self._dict)     # a copy, so callers can't change the shared card
 
     def __repr__(self):
         return f"{self.rank.value}{self.suit.value}"
 
+# Integer card encoding: code = suit index * 13 + rank index
+SUITS = list(Suit)
+RANKS = list(Rank)
+SUIT_INDEX = {suit: i for i, suit in enumerate(SUITS)}
+RANK_INDEX = {rank: i for i, rank in enumerate(RANKS)}
+RANK_VALUES = [11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10]
+# Shared Card instances for every code, so dealing never allocates cards
+CARDS = tuple(Card(suit, rank) for suit in SUITS for rank in RANKS)
+# Composition index per code: Ace = 0, Two = 1, ..., Ten and face cards = 9
+VALUE_INDEX = tuple(min(code % 13, 9) for code in range(52))
+# Face-down card as sent to clients
+HIDDEN_CARD = {'suit': '?', 'rank': '?', 'value': 0, 'hidden': True}
+# One-letter codes for player actions in round records
+ACTION_CODES = {
+    'hit': 'h',
+    'stand': 's',
+    'double': 'd',
+    'split': 'p',
+    'surrender': 'r',
+    'insurance': 'i',
+}
+
+def next_shoe_seed(shoe_seed: int) -> int:
+    """
+        Seed for a shoe that runs out mid-round, derived from the current one so replays stay exact
+    """
+    return (shoe_seed * 6364136223846793005 + 1442695040888963407) % 2 ** 64
+
+class ShoeView(Sequence):
+    """
+        Read-only view of the undealt cards in a Deck
+    """
+    def __init__(self, deck: 'Deck'):
+        self.deck = deck
+
+    def __len__(self):
+        return self.deck.remaining()
+
+    def __getitem__(self, index):
+        deck = self.deck
+        if isinstance(index, slice):
+            return [CARDS[code] for code in deck.shoe[deck.cursor:][index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('shoe index out of range')
+        return CARDS[deck.shoe[deck.cursor + index]]
+
 class Deck:
-    def __init__(self, num_decks: int = 6):
+    """
+        Shoe stored as integer card codes in a preallocated buffer.
+        Cards are dealt by advancing a cursor, and reshuffling reuses the buffer.
+        - Shoe mode: a cut card is placed at the given penetration, and the shoe is
+          reshuffled between rounds once the cut card has come out
+        - Continuous mode: the round's discards go back into the shoe before every round,
+          as with a continuous shuffling machine
+        Shuffle listeners are called after every reshuffle (e.g. to reset a card count).
+        Every full shuffle starts from the ordered shoe and is driven by a shoe seed drawn
+        from the deck's generator, so (shoe_seed, cursor) identifies any dealing position.
+    """
+    def __init__(self,
+                 num_decks: int = 6,
+                 rng: Optional[random.Random] = None,
+                 penetration: float = 0.75,
+                 continuous: bool = False):
+        if not 0 < penetration <= 1:
+            raise ValueError(f"Penetration must be in (0, 1], got {penetration}")
         self.num_decks = num_decks
-        self.cards: List[Card] = []
+        self.rng = rng or random.Random()   # source of shoe seeds and continuous shuffling
+        self.ordered = array('B', range(52)) * num_decks
+        self.shoe = array('B', self.ordered)
+        self.shoe_seed = 0
+        self.penetration = penetration
+        self.cut_card = int(len(self.shoe) * penetration)
+        self.continuous = continuous
+        self.cursor = 0
+        self.counts = [0] * 10     # undealt cards per value (Ace first, tens last)
+        self.shuffle_listeners: List[Callable[[], None]] = []
         self.reset()
 
-    def reset(self):
+    @classmethod
+    def from_shoe(cls,
+                  shoe: bytes,
+                  rng: random.Random,
+                  shoe_seed: int,
+                  cursor: int,
+                  penetration: float = 0.75,
+                  continuous: bool = False) -> 'Deck':
+        """
+            Rebuild a deck from its exact shoe order and dealing position, without shuffling
+        """
+        num_decks, extra = divmod(len(shoe), 52)
+        if extra or not num_decks or not 0 <= cursor <= len(shoe) or not 0 < penetration <= 1:
+            raise ValueError(f"Invalid shoe: {len(shoe)} cards, cursor {cursor}, penetration {penetration}")
+        deck = cls.__new__(cls)
+        deck.num_decks = num_decks
+        deck.rng = rng
+        deck.ordered = array('B', range(52)) * num_decks
+        deck.shoe = array('B')
+        deck.shoe.frombytes(shoe)
+        deck.shoe_seed = shoe_seed
+        deck.penetration = penetration
+        deck.cut_card = int(len(deck.shoe) * penetration)
+        deck.continuous = continuous
+        deck.cursor = cursor
+        deck.counts = [0] * 10
+        undealt = deck.shoe[cursor:].tobytes()
+        for code in range(52):
+            deck.counts[VALUE_INDEX[code]] += undealt.count(code)
+        if sum(deck.counts) != len(undealt):
+            raise ValueError("Invalid shoe: unknown card codes")
+        deck.shuffle_listeners = []
+        return deck
+
+    @property
+    def cards(self) -> ShoeView:
+        return ShoeView(self)
+
+    def add_shuffle_listener(self, listener: Callable[[], None]):
+        """
+            Register a callback invoked after every reshuffle
+        """
+        self.shuffle_listeners.append(listener)
+
+    def reset(self, shoe_seed: Optional[int] = None):
+        """
+            Return all cards to the shoe and shuffle it with a new (or the given) shoe seed
+        """
+        self.shoe_seed = shoe_seed if shoe_seed is not None else self.rng.getrandbits(64)
+        self.cursor = 0
+        self.counts[:] = [4 * self.num_decks] * 9 + [16 * self.num_decks]
+        self.shoe[:] = self.ordered
+        random.Random(self.shoe_seed).shuffle(self.shoe)
+        self.notify_shuffle()
+
+    def restore(self, shoe_seed: int, cursor: int):
+        """
+            Rebuild the shoe for a shoe seed and move to a dealing position
+        """
+        self.reset(shoe_seed)
+        for code in self.shoe[:cursor]:
+            self.counts[VALUE_INDEX[code]] -= 1
+        self.cursor = cursor
+
+    def shuffle(self):
         """
-            Create and shuffle a fresh deck
+            Shuffle the undealt cards in place
         """
-        self.cards = []
-        for _ in range(self.num_decks):
-            for suit in Suit:
-                for rank in Rank:
-                    self.cards.append(Card(suit, rank))
-        self.shuffle()
+        if self.cursor == 0:
+            self.rng.shuffle(self.shoe)
+        else:
+            undealt = self.shoe[self.cursor:]
+            self.rng.shuffle(undealt)
+            self.shoe[self.cursor:] = undealt
 
-    def shuffle(self):
-        random.shuffle(self.cards)
+    def notify_shuffle(self):
+        for listener in self.shuffle_listeners:
+            listener()
+
+    def needs_shuffle(self) -> bool:
+        """
+            Whether the cut card has come out
+        """
+        return self.cursor >= self.cut_card
+
+    def collect_discards(self):
+        """
+            Put the dealt cards back at random positions in the shoe (continuous shuffling).
+            Only the returned cards are moved, so the cost is proportional to the discards.
+        """
+        shoe, rng, size = self.shoe, self.rng, len(self.shoe)
+        for i in range(self.cursor):
+            j = rng.randrange(i, size)
+            shoe[i], shoe[j] = shoe[j], shoe[i]
+        self.cursor = 0
+        self.counts[:] = [4 * self.num_decks] * 9 + [16 * self.num_decks]
+        self.notify_shuffle()
+
+    def prepare_round(self):
+        """
+            Reshuffle between rounds: return discards in continuous mode,
+            or reshuffle the shoe once the cut card has been reached
+        """
+        if self.continuous:
+            if self.cursor:
+                self.collect_discards()
+        elif self.needs_shuffle():
+            self.reset()
+
+    def deal_code(self) -> int:
+        """
+            Deal one card from the deck as an integer code
+        """
+        if self.cursor >= len(self.shoe):    # Shoe ran out mid-round: reshuffle it
+            self.reset(next_shoe_seed(self.shoe_seed))
+        code = self.shoe[self.cursor]
+        self.cursor += 1
+        self.counts[VALUE_INDEX[code]] -= 1
+        return code
 
     def deal(self) -> Card:
         """
             Deal one card from the deck
         """
-        if len(self.cards) < 20:    # Reshuffle if deck is running low on cards
-            self.reset()
-        return self.cards.pop()
+        return CARDS[self.deal_code()]
 
     def remaining(self) -> int:
-        return len(self.cards)
+        return len(self.shoe) - self.cursor
+
+    def composition(self) -> Tuple[int, ...]:
+        """
+            Get undealt card counts by value (Ace, 2-9, ten-valued)
+        """
+        return tuple(self.counts)
 
 class Hand:
+    """
+        Player or dealer hand. Keeps a running hard total (Aces counted as 1)
+        and Ace count, so value queries never re-sum the cards.
+    """
+    __slots__ = ('_cards', '_hard', '_aces', 'bet', 'is_split', 'is_doubled', 'is_surrendered', 'is_insured', 'actions')
+
     def __init__(self):
-        self.cards: List[Card] = []
+        self._cards: List[Card] = []
+        self._hard: int = 0
+        self._aces: int = 0
         self.bet: int = 0
         self.is_split: bool = False
         self.is_doubled: bool = False
         self.is_surrendered: bool = False
         self.is_insured: bool = False
+        self.actions: List[str] = []    # player actions taken on this hand
+
+    @property
+    def cards(self) -> List[Card]:
+        return self._cards
+
+    @cards.setter
+    def cards(self, cards: List[Card]):
+        self._cards = []
+        self._hard = 0
+        self._aces = 0
+        for card in cards:
+            self.add_card(card)
 
     def add_card(self, card: Card):
-        self.cards.append(card)
+        self._cards.append(card)
+        value = card.value()
+        if value == 11:
+            self._aces += 1
+            value = 1
+        self._hard += value
+
+    def pop_card(self) -> Card:
+        """
+            Remove and return the last card (used when splitting)
+        """
+        card = self._cards.pop()
+        value = card.value()
+        if value == 11:
+            self._aces -= 1
+            value = 1
+        self._hard -= value
+        return card
 
     def value(self) -> int:
         """
             Calculate hand value (handling Aces as 1 or 11)
         """
-        total = sum(card.value() for card in self.cards)
-        aces = sum(1 for card in self.cards if card.rank == Rank.ACE)
-        # Convert aces from 11 to 1 if busted
-        while total > 21 and aces > 0:
-            total -= 10
-            aces -= 1
-        return total
+        # At most one Ace can count as 11 without busting
+        if self._aces and self._hard <= 11:
+            return self._hard + 10
+        return self._hard
 
     def is_blackjack(self) -> bool:
         """
             Check if hand is a natural blackjack
         """
-        return len(self.cards) == 2 and self.value() == 21
+        return len(self._cards) == 2 and self._aces > 0 and self._hard == 11
 
     def is_bust(self) -> bool:
-        return self.value() > 21
+        return self._hard > 21
 
     def is_soft(self) -> bool:
         """
             Check if hand has an Ace counted as 11
         """
-        total = sum(card.value() for card in self.cards)
-        aces = sum(1 for card in self.cards if card.rank == Rank.ACE)
-        return aces > 0 and total <= 21 and (total - 10) < 12
+        return self._aces > 0 and self._hard <= 11
 
     def can_split(self) -> bool:
         """
             Check if hand can be split
         """
-        return len(self.cards) == 2 and self.cards[0].value()
+        return len(self._cards) == 2 and self._cards[0].value() == self._cards[1].value()
 
     def can_double(self) -> bool:
         """
@@ -144,12 +369,20 @@ class Hand:
         cards_dict = []
         for i, card in enumerate(self.cards):
             if i == 0 and hide_first:
-                cards_dict.append({'suit': '?', 'rank': '?', 'value': 0, 'hidden': True})
+                cards_dict.append(dict(HIDDEN_CARD))
             else:
                 cards_dict.append(card.to_dict())
 
         return {
             'cards': cards_dict,
+            **self.state_fields(hide_first),
+        }
+
+    def state_fields(self, hide_first: bool = False):
+        """
+            Everything in to_dict except the cards
+        """
+        return {
             'value': 0 if hide_first else self.value(),
             'bet': self.bet,
             'is_blackjack': self.is_blackjack() if not hide_first else False,
@@ -162,9 +395,72 @@ class Hand:
         }
 
 
+class RoundRecord:
+    """
+        Compact replay record of one round: shoe seed and dealing position when the
+        round was dealt, bankroll before the bet, the bet, and one code per player action
+    """
+    __slots__ = ('shoe_seed', 'cursor', 'chips', 'bet', 'actions')
+
+    def __init__(self, shoe_seed: int, cursor: int, chips: int, bet: int, actions: str = ''):
+        self.shoe_seed = shoe_seed
+        self.cursor = cursor
+        self.chips = chips
+        self.bet = bet
+        self.actions = actions
+
+    def __eq__(self, other):
+        return isinstance(other, RoundRecord) and self.encode() == other.encode()
+
+    def __repr__(self):
+        return f"RoundRecord({self.encode()!r})"
+
+    def encode(self) -> str:
+        """
+            Encode as a short string, e.g. '9f3a61c2d4e5b708.52.1000.10.hs'
+        """
+        return f"{self.shoe_seed:x}.{self.cursor}.{self.chips}.{self.bet}.{self.actions}"
+
+    @classmethod
+    def decode(cls, text: str) -> 'RoundRecord':
+        shoe_seed, cursor, chips, bet, actions = text.split('.')
+        return cls(int(shoe_seed, 16), int(cursor), int(chips), int(bet), actions)
+
+    def to_dict(self):
+        return {
+            'shoe_seed': self.shoe_seed,
+            'cursor': self.cursor,
+            'chips': self.chips,
+            'bet': self.bet,
+            'actions': self.actions,
+        }
+
+
 class BlackJackGame:
-    def __init__(self, num_decks: int = 6):
-        self.deck = Deck(num_decks)
+    """
+        Blackjack round logic, for the table rules of a RuleSet (a profile name, or the
+        default rules; num_decks overrides the profile's deck count). Each game owns a
+        generator seeded from its seed, and every round is logged as a RoundRecord in
+        history (the last history_limit rounds), so any round can be replayed exactly.
+        A game can instead be dealt from a shared deck (e.g. a seat at a multi-seat table).
+    """
+    def __init__(self,
+                 num_decks: Optional[int] = None,
+                 seed: Optional[Union[int, str]] = None,
+                 penetration: float = 0.75,
+                 continuous_shuffle: bool = False,
+                 history_limit: Optional[int] = 1000,
+                 rules: Union[str, RuleSet, None] = None,
+                 deck: Optional[Deck] = None):
+        self.rules = get_rules(rules)
+        if num_decks is not None:
+            self.rules = self.rules.with_decks(num_decks)
+        self.seed = seed if seed is not None else secrets.randbits(64)
+        if deck is None:
+            deck = Deck(self.rules.num_decks, rng=random.Random(self.seed), penetration=penetration,
+                        continuous=continuous_shuffle)
+        self.deck = deck
+        self.rng = deck.rng
         self.player_hands: List[Hand] = []
         self.dealer_hand = Hand()
         self.current_hand_index = 0
@@ -172,6 +468,42 @@ class BlackJackGame:
         self.player_chips = 1000
         self.current_bet = 0
         self.insurance_bet = 0
+        self.round_record: Optional[RoundRecord] = None
+        self.history: 'deque[RoundRecord]' = deque(maxlen=history_limit)
+        self.hand_results: List[Dict] = []      # per hand outcome of the last resolved round
+        self.round_listeners: List[Callable[['BlackJackGame'], None]] = []
+        self.card_listeners: List[Callable[[Card], None]] = []
+
+    def add_round_listener(self, listener: Callable[['BlackJackGame'], None]):
+        """
+            Register a callback invoked with the game after every round is resolved
+        """
+        self.round_listeners.append(listener)
+
+    def add_card_listener(self, listener: Callable[[Card], None]):
+        """
+            Register a callback invoked with every card as it becomes visible at the table
+            (the dealer hole card when it is revealed)
+        """
+        self.card_listeners.append(listener)
+
+    def deal_visible(self) -> Card:
+        """
+            Deal a face-up card, showing it to the card listeners
+        """
+        card = self.deck.deal()
+        for listener in self.card_listeners:
+            listener(card)
+        return card
+
+    def log_action(self, action: str):
+        """
+            Append a player action to the current round record
+        """
+        if self.round_record is not None:
+            self.round_record.actions += ACTION_CODES[action]
+        if self.player_hands:
+            self.player_hands[self.current_hand_index].actions.append(action)
 
     def place_bet(self, amount: int) -> bool:
         """
@@ -183,12 +515,19 @@ class BlackJackGame:
         self.player_chips -= amount
         return True
 
+    def dealer_must_hit(self) -> bool:
+        value = self.dealer_hand.value()
+        return value < 17 or (value == 17 and self.rules.dealer_hits_soft_17 and self.dealer_hand.is_soft())
+
     def play_dealer_hand(self):
         """
-            Dealer plays according to the rules (hit on 16, stand on 17)
+            Dealer plays according to the rules (hit on 16, stand on 17, or hit soft 17 under H17)
         """
-        while self.dealer_hand.value() < 17:
-            self.dealer_hand.add_card(self.deck.deal())
+        # Reveal the hole card
+        for listener in self.card_listeners:
+            listener(self.dealer_hand.cards[0])
+        while self.dealer_must_hit():
+            self.dealer_hand.add_card(self.deal_visible())
         self.game_phase = 'finished'
         self.resolve_bets()
 
@@ -211,11 +550,15 @@ class BlackJackGame:
         self.player_hands[0].bet = self.current_bet
         self.dealer_hand = Hand()
         self.current_hand_index = 0
+        self.deck.prepare_round()
+        self.round_record = RoundRecord(self.deck.shoe_seed, self.deck.cursor,
+                                        self.player_chips + self.current_bet, self.current_bet)
+        self.history.append(self.round_record)
         # Deal initial cards
-        self.player_hands[0].add_card(self.deck.deal())
-        self.dealer_hand.add_card(self.deck.deal())
-        self.player_hands[0].add_card(self.deck.deal())
-        self.dealer_hand.add_card(self.deck.deal())
+        self.player_hands[0].add_card(self.deal_visible())
+        self.dealer_hand.add_card(self.deck.deal())     # hole card, hidden until the dealer plays
+        self.player_hands[0].add_card(self.deal_visible())
+        self.dealer_hand.add_card(self.deal_visible())
         self.game_phase = 'playing'
         # Check for immediate blackjack
         if self.player_hands[0].is_blackjack():
@@ -236,34 +579,105 @@ class BlackJackGame:
 
     def resolve_bets(self):
         """
-            Calculate winnings and update player chips
+            Calculate winnings, update player chips and record the outcome of every hand
         """
         dealer_value = self.dealer_hand.value()
         dealer_blackjack = self.dealer_hand.is_blackjack()
         dealer_bust = self.dealer_hand.is_bust()
+        insurance_payout = 0
         # Resolve insurance
         if self.insurance_bet > 0:
             if dealer_blackjack:
                 self.player_chips += self.insurance_bet * 3 # Insurance pays 2:1
+                insurance_payout = self.insurance_bet * 2
+            else:
+                insurance_payout = -self.insurance_bet
             self.insurance_bet = 0
         # Resolve each hand
+        self.hand_results = []
         for hand in self.player_hands:
-            if hand.is_surrendered:
-                continue
             hand_value = hand.value()
-            if hand.is_bust():
+            if hand.is_surrendered:
+                # Half the bet is returned on surrender, unless a late surrender meets a dealer blackjack
+                if self.rules.surrender == 'late' and dealer_blackjack:
+                    result, payout = 'lose', -hand.bet
+                else:
+                    if self.rules.surrender == 'late':
+                        self.player_chips += hand.bet // 2
+                    result, payout = 'surrender', hand.bet // 2 - hand.bet
+            elif hand.is_bust():
                 # Player bust - lose bet (already taken)
-                pass
+                result, payout = 'lose', -hand.bet
             elif hand.is_blackjack() and not dealer_blackjack:
-                # Blackjack pays 3:2
-                self.player_chips += hand.bet + int(hand.bet * 1.5)
+                # Blackjack pays 3:2 (or the table's payout)
+                winnings = self.rules.blackjack_payout(hand.bet)
+                self.player_chips += hand.bet + winnings
+                result, payout = 'blackjack', winnings
             elif dealer_bust or hand_value > dealer_value:
                 # Player wins
                 self.player_chips += hand.bet * 2
+                result, payout = 'win', hand.bet
             elif hand_value == dealer_value:
                 # Push - return bet
                 self.player_chips += hand.bet
-            # else: dealer wins - lose bet (already taken)
+                result, payout = 'push', 0
+            else:
+                # Dealer wins - lose bet (already taken)
+                result, payout = 'lose', -hand.bet
+            self.hand_results.append(self.hand_result(hand, result, payout))
+        # Insurance is settled with the first hand, which it was bought on
+        if self.hand_results:
+            self.hand_results[0]['payout'] += insurance_payout
+        for listener in self.round_listeners:
+            listener(self)
+
+    def hand_result(self, hand: Hand, result: str, payout: int) -> Dict:
+        """
+            Outcome of one resolved hand (payout is the net chip change)
+        """
+        return {
+            'player_cards': [card.to_dict() for card in hand.cards],
+            'player_value': hand.value(),
+            'player_bet': hand.bet,
+            'player_blackjack': hand.is_blackjack(),
+            'player_bust': hand.is_bust(),
+            'dealer_cards': [card.to_dict() for card in self.dealer_hand.cards],
+            'dealer_value': self.dealer_hand.value(),
+            'dealer_blackjack': self.dealer_hand.is_blackjack(),
+            'dealer_bust': self.dealer_hand.is_bust(),
+            'result': result,
+            'payout': payout,
+            'actions': list(hand.actions),
+            'was_split': hand.is_split or 'split' in hand.actions,
+            'was_doubled': hand.is_doubled,
+            'was_surrendered': hand.is_surrendered,
+            'had_insurance': hand.is_insured,
+        }
+
+    # -----------------------------
+    #        ALLOWED ACTIONS
+    # -----------------------------
+    def can_double(self) -> bool:
+        """
+            Whether the table rules allow doubling the current hand
+        """
+        hand = self.player_hands[self.current_hand_index]
+        return hand.can_double() and (self.rules.double_after_split or len(self.player_hands) == 1)
+
+    def can_split(self) -> bool:
+        """
+            Whether the table rules allow splitting the current hand
+        """
+        max_hands = self.rules.max_split_hands
+        return (self.player_hands[self.current_hand_index].can_split()
+                and (max_hands is None or len(self.player_hands) < max_hands))
+
+    def can_surrender(self) -> bool:
+        """
+            Whether the table rules allow surrendering the current hand
+        """
+        return (self.rules.surrender != 'none'
+                and len(self.player_hands[self.current_hand_index].cards) == 2)
 
     def hit(self) -> bool:
         """
@@ -273,7 +687,8 @@ class BlackJackGame:
             return False
         # Take a card and add it to current hand
         current_hand = self.player_hands[self.current_hand_index]
-        current_hand.add_card(self.deck.deal())
+        self.log_action('hit')
+        current_hand.add_card(self.deal_visible())
         if current_hand.is_bust():
             self.move_to_next_hand()
         return True
@@ -284,6 +699,7 @@ class BlackJackGame:
         """
         if self.game_phase != 'playing':
             return False
+        self.log_action('stand')
         self.move_to_next_hand()
         return True
 
@@ -295,13 +711,14 @@ class BlackJackGame:
             return False
         # Check current hand and see if you can double
         current_hand = self.player_hands[self.current_hand_index]
-        if not current_hand.can_double() or self.player_chips < current_hand.bet:
+        if not self.can_double() or self.player_chips < current_hand.bet:
             return False
         # Double bet
+        self.log_action('double')
         self.player_chips -= current_hand.bet
         current_hand.bet *= 2
         current_hand.is_doubled = True
-        current_hand.add_card(self.deck.deal())
+        current_hand.add_card(self.deal_visible())
         self.move_to_next_hand()
         return True
 
@@ -313,16 +730,17 @@ class BlackJackGame:
             return False
         # Check current hand and see if you can split in two
         current_hand = self.player_hands[self.current_hand_index]
-        if not current_hand.can_split() or self.player_chips < current_hand.bet:
+        if not self.can_split() or self.player_chips < current_hand.bet:
             return False
         # Create new hand with second card
+        self.log_action('split')
         new_hand = Hand()
         new_hand.bet = current_hand.bet
         new_hand.is_split = True
-        new_hand.add_card(current_hand.cards.pop())
+        new_hand.add_card(current_hand.pop_card())
         # Deal new cards to both hands
-        current_hand.add_card(self.deck.deal())
-        new_hand.add_card(self.deck.deal())
+        current_hand.add_card(self.deal_visible())
+        new_hand.add_card(self.deal_visible())
         # Insert new hand after current
         self.player_hands.insert(self.current_hand_index + 1, new_hand)
         self.player_chips -= current_hand.bet
@@ -332,12 +750,15 @@ class BlackJackGame:
         """
             Surrender and get half of your bet back
         """
-        if self.game_phase != 'playing' or len(self.player_hands[self.current_hand_index].cards) != 2:
+        if self.game_phase != 'playing' or not self.can_surrender():
             return False
         # Check current hand
         current_hand = self.player_hands[self.current_hand_index]
+        self.log_action('surrender')
         current_hand.is_surrendered = True
-        self.player_chips += current_hand.bet // 2
+        if self.rules.surrender == 'early':
+            self.player_chips += current_hand.bet // 2
+        # A late surrender is refunded once the dealer's hand shows no blackjack
         self.move_to_next_hand()
         return True
 
@@ -345,12 +766,14 @@ class BlackJackGame:
         """
             Buy insurance when dealer shows Ace
         """
-        if self.game_phase != 'playing' or self.dealer_hand.cards[0].rank != Rank.ACE:
+        # The up card is cards[1] (cards[0] is the hidden hole card)
+        if self.game_phase != 'playing' or self.dealer_hand.cards[1].rank != Rank.ACE:
             return False
         # Fetch insurance amount
         insurance_amount = self.current_bet // 2
         if self.player_chips < insurance_amount:
             return False
+        self.log_action('insurance')
         self.insurance_bet = insurance_amount
         self.player_chips -= insurance_amount
         self.player_hands[0].is_insured = True
@@ -363,10 +786,19 @@ class BlackJackGame:
         return {
             'player_hands': [hand.to_dict() for hand in self.player_hands],
             'dealer_hand': self.dealer_hand.to_dict(hide_first=hide_dealer_card),
+            **self.state_fields(),
+        }
+
+    def state_fields(self):
+        """
+            Everything in get_state except the hands
+        """
+        return {
             'current_hand_index': self.current_hand_index,
             'game_phase': self.game_phase,
             'player_chips': self.player_chips,
             'current_bet': self.current_bet,
             'insurance_bet': self.current_bet,
             'deck_remaining': self.deck.remaining(),
+            'rules': self.rules.name,
         }
\ No newline at end of file
@@ -0,0 +1,182 @@
+from channels.db import database_sync_to_async
+from collections import deque
+from django.db.models import F
+from django.utils import timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from .game_engine import BlackJackGame
+from .models import BlackJackGameSession, BlackJackHand
+from .statistics import StatisticsDelta
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseHandSink:
+    """
+        Writes hand history rows to BlackJackHand with one bulk insert per flush.
+        The BlackJackGameSession row is created on the first write, and every write adds
+        the flushed hands to its totals with F() increments. ai_mode and ai_strategy are
+        read at each write, so the owner can update them while the session runs.
+    """
+    def __init__(self,
+                 user=None,
+                 starting_chips: int = 1000,
+                 ai_mode: bool = False,
+                 ai_strategy: Optional[str] = None,
+                 batch_size: int = 500):
+        self.user = user
+        self.starting_chips = starting_chips
+        self.ai_mode = ai_mode
+        self.ai_strategy = ai_strategy
+        self.batch_size = batch_size
+        self.session_id: Optional[int] = None
+        self.started_at = None
+
+    def write(self, rows: List[Dict]):
+        if self.session_id is None:
+            session = BlackJackGameSession.objects.create(
+                user=self.user,
+                starting_chips=self.starting_chips,
+                ending_chips=self.starting_chips,
+                ai_mode=self.ai_mode,
+                ai_strategy=self.ai_strategy,
+            )
+            self.session_id = session.id
+            self.started_at = session.created_at
+        BlackJackHand.objects.bulk_create(
+            [BlackJackHand(sessions_id=self.session_id, **row) for row in rows],
+            batch_size=self.batch_size,
+        )
+        BlackJackGameSession.objects.filter(id=self.session_id).update(**self.session_update(rows))
+
+    def session_update(self, rows: List[Dict]) -> Dict:
+        """
+            Keyword arguments adding the rows to the session totals in a single UPDATE
+        """
+        delta = StatisticsDelta()
+        for row in rows:
+            delta.add_hand(row)
+        counters = delta.counters
+        now = timezone.now()
+        return {
+            'hands_played': F('hands_played') + counters['total_hands'],
+            'hands_won': F('hands_won') + counters['hands_won'],
+            'hands_lost': F('hands_lost') + counters['hands_lost'],
+            'hands_pushed': F('hands_pushed') + counters['hands_pushed'],
+            'blackjacks': F('blackjacks') + counters['blackjacks'],
+            'busts': F('busts') + counters['busts'],
+            'total_wagered': F('total_wagered') + counters['total_wagered'],
+            'net_winnings': F('net_winnings') + counters['net_profit'],
+            'ending_chips': F('ending_chips') + counters['net_profit'],
+            'ai_mode': self.ai_mode,
+            'ai_strategy': self.ai_strategy,
+            'duration': int((now - self.started_at).total_seconds()),
+            'updated_at': now,
+        }
+
+
+class MemoryHandSink:
+    """
+        Keeps written rows in a list (for tests and database-less deployments)
+    """
+    def __init__(self):
+        self.rows: List[Dict] = []
+        self.writes = 0
+        self.ai_mode = False
+        self.ai_strategy: Optional[str] = None
+
+    def write(self, rows: List[Dict]):
+        self.rows.extend(rows)
+        self.writes += 1
+
+
+class HandHistoryRecorder:
+    """
+        Write-behind hand history recorder for one connection.
+        - record_round() is a round listener: it only copies the resolved hands into a buffer
+        - A background task flushes the buffer to the sink, off the event loop, once
+          flush_size hands are waiting or every flush_interval seconds
+        - The buffer holds at most max_buffer hands; if the sink falls behind, the oldest are dropped
+        - close() stops the task and flushes whatever is left (call it on disconnect)
+        Flush listeners run after every flush, so other write-behind work can share the schedule.
+    """
+    def __init__(self,
+                 sink,
+                 flush_size: int = 50,
+                 flush_interval: float = 5.0,
+                 max_buffer: int = 1000):
+        self.sink = sink
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.buffer: 'deque[Dict]' = deque(maxlen=max_buffer)
+        self.hands_recorded = 0
+        self.hands_dropped = 0
+        self.hands_failed = 0
+        self.flush_needed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.flush_listeners: List[Callable[[], Awaitable[None]]] = []
+
+    def add_flush_listener(self, listener: Callable[[], Awaitable[None]]):
+        """
+            Register a coroutine function awaited after every flush
+        """
+        self.flush_listeners.append(listener)
+
+    def record_round(self, game: BlackJackGame):
+        """
+            Buffer every hand of a resolved round
+        """
+        for result in game.hand_results:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.hands_dropped += 1
+            self.hands_recorded += 1
+            self.buffer.append({'hand_number': self.hands_recorded, **result})
+        if len(self.buffer) >= self.flush_size:
+            self.flush_needed.set()
+
+    def start(self):
+        """
+            Start the background flush task (needs a running event loop)
+        """
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while not self.closed:
+            try:
+                await asyncio.wait_for(self.flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_needed.clear()
+            await self.flush()
+
+    async def flush(self):
+        """
+            Write all buffered hands to the sink in one batch
+        """
+        if self.buffer:
+            rows = list(self.buffer)
+            self.buffer.clear()
+            try:
+                await database_sync_to_async(self.sink.write)(rows)
+            except Exception:
+                self.hands_failed += len(rows)
+                logger.exception("Failed to write %d blackjack hands", len(rows))
+        for listener in self.flush_listeners:
+            try:
+                await listener()
+            except Exception:
+                logger.exception("Blackjack flush listener failed")
+
+    async def close(self):
+        """
+            Stop the background task and flush the remaining hands
+        """
+        self.closed = True
+        if self.task is not None:
+            self.flush_needed.set()
+            await self.task
+            self.task = None
+        await self.flush()
@@ -0,0 +1,220 @@
+from .ai_agent import Strategy
+from .rules import get_rules
+from .runner import SimulationRunner
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+import threading
+import typing
+import uuid
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = typing.get_args(Strategy)
+MAX_JOB_HANDS = 10 ** 8
+# Rounds per shard; fixed, so a job's seed alone determines its result
+JOB_SHARD_SIZE = 10000
+# Finished jobs kept for cache hits, least recently requested dropped first
+MAX_CACHED_JOBS = 256
+# Jobs whose progress is being collected at once (the shards share one process pool)
+MAX_RUNNING_JOBS = 4
+
+
+def parse_job_params(data: Dict) -> Dict:
+    """
+        Validate job parameters: strategy, rules (profile name), hands and seed (None if missing)
+        Raises: ValueError for invalid parameters
+    """
+    strategy = data.get('strategy', 'basic')
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    rules = get_rules(data.get('rules', 'classic')).name
+    try:
+        hands = int(data.get('hands', 100000))
+        seed = int(data['seed']) if data.get('seed') is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("hands and seed must be integers") from None
+    if not 0 < hands <= MAX_JOB_HANDS:
+        raise ValueError(f"hands must be between 1 and {MAX_JOB_HANDS}, got {hands}")
+    return {'strategy': strategy, 'rules': rules, 'hands': hands, 'seed': seed}
+
+
+def job_key(params: Dict) -> str:
+    """
+        Hash of the parameters, the key results are cached by
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:32]
+
+
+class SimulationJob:
+    """
+        Batch AI session run in the background by a JobManager.
+        Every progress update is kept as a line, so any number of readers can follow the
+        job from the start, during the run or after it has finished.
+        Status: running, done, cancelled or failed
+    """
+    def __init__(self, params: Dict):
+        self.job_id = uuid.uuid4().hex
+        # Jobs without a seed are cached by their other parameters, and played with a random seed
+        self.key = job_key(params)
+        self.params = params if params['seed'] is not None else {**params, 'seed': secrets.randbits(64)}
+        self.status = 'running'
+        self.lines: List[Dict] = []
+        self.lock = threading.Lock()
+        # Event loops and events of the readers waiting for the next line
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self.cancel_requested = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status != 'running'
+
+    def publish(self, line: Dict, status: Optional[str] = None):
+        """
+            Add a line (from the job's thread) and wake the readers waiting for it
+        """
+        with self.lock:
+            self.lines.append(line)
+            if status is not None:
+                self.status = status
+            waiters, self.waiters = self.waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass    # the reader's event loop is closed
+
+    def run(self, executor):
+        """
+            Play the job's shards on the executor, publishing the merged aggregate as each finishes
+        """
+        params = self.params
+        runner = SimulationRunner(strategy=params['strategy'], num_rounds=params['hands'], seed=params['seed'],
+                                  shard_size=JOB_SHARD_SIZE, rules=params['rules'], executor=executor)
+        progress = runner.progress()
+        try:
+            for update in progress:
+                if self.cancel_requested:
+                    break
+                self.publish({'type': 'progress', 'job_id': self.job_id, **update})
+        except Exception as error:
+            logger.exception("Blackjack job %s failed", self.job_id)
+            self.publish({'type': 'error', 'job_id': self.job_id, 'error': str(error)}, status='failed')
+            return
+        finally:
+            progress.close()
+        if self.cancel_requested:
+            self.publish({'type': 'cancelled', 'job_id': self.job_id, 'rounds_done': runner.result.rounds},
+                         status='cancelled')
+        else:
+            self.publish({'type': 'result', 'job_id': self.job_id, **params, 'result': runner.result.to_dict()},
+                         status='done')
+
+    def cancel(self):
+        """
+            Stop after the shard being merged; shards not started are dropped
+        """
+        if not self.finished:
+            self.cancel_requested = True
+
+    async def follow(self, timeout: Optional[float] = None) -> AsyncIterator[Dict]:
+        """
+            Yield every line of the job, waiting for new ones until it finishes
+            (or until no line came for timeout seconds). Waits never block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        index = 0
+        while True:
+            event = asyncio.Event()
+            with self.lock:
+                lines = self.lines[index:]
+                finished = self.finished
+                if not lines and not finished:
+                    self.waiters.append((loop, event))
+            if lines:
+                for line in lines:
+                    yield line
+                index += len(lines)
+            elif finished:
+                return
+            else:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'params': self.params,
+            'latest': self.lines[-1] if self.lines else None,
+        }
+
+
+class JobManager:
+    """
+        Runs SimulationJobs in the background and caches them by parameter hash:
+        a request with the parameters of a running or finished job gets that job back.
+        Shards of all jobs share one process pool, created on first use.
+    """
+    def __init__(self, workers: Optional[int] = None, max_cached: int = MAX_CACHED_JOBS):
+        self.workers = workers
+        self.max_cached = max_cached
+        self.jobs: 'OrderedDict[str, SimulationJob]' = OrderedDict()    # by job id, least recently requested first
+        self.by_key: Dict[str, SimulationJob] = {}
+        self.lock = threading.Lock()
+        self.process_pool: Optional[ProcessPoolExecutor] = None
+        self.drivers = ThreadPoolExecutor(max_workers=MAX_RUNNING_JOBS, thread_name_prefix='blackjack-job')
+
+    def submit(self, params: Dict) -> Tuple[SimulationJob, bool]:
+        """
+            Start a job for validated parameters, or return the cached one
+            Returns: the job, and whether it was cached
+        """
+        key = job_key(params)
+        with self.lock:
+            job = self.by_key.get(key)
+            if job is not None and job.status in ('running', 'done'):
+                self.jobs.move_to_end(job.job_id)
+                return job, True
+            job = SimulationJob(params)
+            self.jobs[job.job_id] = job
+            self.by_key[key] = job
+            self.evict()
+            if self.process_pool is None:
+                self.process_pool = ProcessPoolExecutor(max_workers=self.workers)
+            process_pool = self.process_pool
+        self.drivers.submit(job.run, process_pool)
+        return job, False
+
+    def evict(self):
+        """
+            Drop the least recently requested finished jobs beyond max_cached
+        """
+        excess = len(self.jobs) - self.max_cached
+        for job in list(self.jobs.values()):
+            if excess <= 0:
+                break
+            if job.finished:
+                del self.jobs[job.job_id]
+                if self.by_key.get(job.key) is job:
+                    del self.by_key[job.key]
+                excess -= 1
+
+    def get(self, job_id: str) -> Optional[SimulationJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[SimulationJob]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+
+job_manager = JobManager()
@@ -0,0 +1,250 @@
+from .ai_agent import BlackJackAI, Strategy
+from .counting import get_counting_system
+from .rules import DEFAULT_RULES, RuleSet, get_rules
+from .simulator import BatchSimulator
+from .strategy import DATA_DIR
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+import argparse
+import json
+import numpy as np
+import secrets
+
+EDGE_TABLES_DIR = DATA_DIR / 'edge_tables'
+# Rounds simulated for a table by default
+DEFAULT_TABLE_ROUNDS = 2000000
+DEFAULT_TABLE_SEED = 20261017
+# Bins with fewer rounds are too noisy to bet on
+MIN_BIN_ROUNDS = 10000
+
+
+class EdgeTable:
+    """
+        Player edge and variance per round, by integer true count before the deal.
+        Counts are truncated towards zero (as BlackJackAI bets) and clamped to
+        [min_count, max_count], so the end bins hold the tails.
+        Returns are in units of the initial bet, including doubles, splits and insurance.
+    """
+    def __init__(self, min_count: int, rounds: Sequence[int], total_return: Sequence[float],
+                 total_squared: Sequence[float], metadata: Optional[Dict] = None):
+        self.min_count = min_count
+        self.rounds = np.asarray(rounds, dtype=np.int64)
+        self.total_return = np.asarray(total_return, dtype=float)
+        self.total_squared = np.asarray(total_squared, dtype=float)
+        self.metadata = metadata or {}
+        played = np.maximum(self.rounds, 1)
+        self.edges = self.total_return / played
+        self.variances = np.maximum(self.total_squared / played - self.edges ** 2, 0.0)
+
+    @classmethod
+    def empty(cls, min_count: int, max_count: int, metadata: Optional[Dict] = None) -> 'EdgeTable':
+        size = max_count - min_count + 1
+        return cls(min_count, np.zeros(size), np.zeros(size), np.zeros(size), metadata)
+
+    @property
+    def max_count(self) -> int:
+        return self.min_count + len(self.rounds) - 1
+
+    def bins(self, true_counts: np.ndarray) -> np.ndarray:
+        return np.clip(np.trunc(true_counts), self.min_count, self.max_count).astype(np.intp) - self.min_count
+
+    def add(self, true_counts: np.ndarray, returns: np.ndarray):
+        """
+            Accumulate per-round returns by the true count they were dealt at
+        """
+        bins = self.bins(true_counts)
+        size = len(self.rounds)
+        self.rounds += np.bincount(bins, minlength=size)
+        self.total_return += np.bincount(bins, weights=returns, minlength=size)
+        self.total_squared += np.bincount(bins, weights=np.square(returns), minlength=size)
+        played = np.maximum(self.rounds, 1)
+        self.edges = self.total_return / played
+        self.variances = np.maximum(self.total_squared / played - self.edges ** 2, 0.0)
+
+    def index(self, true_count: float) -> int:
+        return min(max(int(true_count), self.min_count), self.max_count) - self.min_count
+
+    def edge(self, true_count: float) -> float:
+        return float(self.edges[self.index(true_count)])
+
+    def variance(self, true_count: float) -> float:
+        return float(self.variances[self.index(true_count)])
+
+    def kelly_fractions(self) -> np.ndarray:
+        """
+            Full Kelly bankroll fraction for every bin (edge / variance, zero without an edge)
+        """
+        reliable = (self.rounds >= MIN_BIN_ROUNDS) & (self.edges > 0) & (self.variances > 0)
+        return np.divide(self.edges, self.variances, out=np.zeros(len(self.rounds)), where=reliable)
+
+    def growth_rate(self, fraction: float = 1.0) -> float:
+        """
+            Expected log growth of the bankroll per round when betting fraction times Kelly
+            at positive counts and nothing otherwise (second order approximation)
+        """
+        frequencies = self.rounds / max(int(self.rounds.sum()), 1)
+        bets = fraction * self.kelly_fractions()
+        return float(np.sum(frequencies * (bets * self.edges - bets ** 2 * self.variances / 2)))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'EdgeTable':
+        bins = data['bins']
+        return cls(
+            bins[0]['true_count'],
+            [row['rounds'] for row in bins],
+            [row['total_return'] for row in bins],
+            [row['total_squared'] for row in bins],
+            {key: value for key, value in data.items() if key != 'bins'},
+        )
+
+    def to_dict(self):
+        return {
+            **self.metadata,
+            'rounds': int(self.rounds.sum()),
+            'bins': [
+                {
+                    'true_count': self.min_count + i,
+                    'rounds': int(self.rounds[i]),
+                    'total_return': float(self.total_return[i]),
+                    'total_squared': float(self.total_squared[i]),
+                    'edge': float(self.edges[i]),
+                    'variance': float(self.variances[i]),
+                }
+                for i in range(len(self.rounds))
+            ],
+        }
+
+
+def measure_edge_table(strategy: Strategy = 'basic',
+                       counting_system: str = 'hi-lo',
+                       rules: RuleSet = DEFAULT_RULES,
+                       penetration: float = 0.75,
+                       num_rounds: int = DEFAULT_TABLE_ROUNDS,
+                       batch_size: int = 10000,
+                       count_range: Tuple[int, int] = (-6, 6),
+                       seed: Optional[int] = None) -> EdgeTable:
+    """
+        Simulate num_rounds rounds with the BlackJackGame cut card and tabulate the
+        return of every round by the true count before its deal
+    """
+    seed = seed if seed is not None else secrets.randbits(64)
+    shoe_size = 52 * rules.num_decks
+    cut_card = int(shoe_size * penetration)
+    simulator = BatchSimulator(BlackJackAI(strategy=strategy, rules=rules),
+                               num_shoes=batch_size,
+                               reshuffle_at=shoe_size - cut_card + 1,   # shuffle once the cut card is out
+                               seed=seed,
+                               counting=get_counting_system(counting_system))
+    table = EdgeTable.empty(*count_range, metadata={
+        'strategy': strategy,
+        'counting_system': counting_system,
+        'rules': rules.to_dict(),
+        'penetration': penetration,
+        'seed': seed,
+    })
+    remaining = num_rounds
+    while remaining > 0:
+        true_counts = simulator.true_counts()[:remaining]
+        returns = simulator.play_round()[:remaining]
+        table.add(true_counts, returns)
+        remaining -= batch_size
+    return table
+
+
+def edge_table_path(strategy: Strategy, counting_system: str, rules: RuleSet, penetration: float) -> Path:
+    return EDGE_TABLES_DIR / f"{strategy}-{counting_system}-{rules.key}-{round(penetration * 100)}.json"
+
+
+def write_edge_table(table: EdgeTable, path: Union[str, Path]):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as table_file:
+        json.dump(table.to_dict(), table_file, indent=2)
+        table_file.write('\n')
+
+
+@lru_cache(maxsize=None)
+def load_edge_table(strategy: Strategy = 'basic',
+                    counting_system: str = 'hi-lo',
+                    rules: RuleSet = DEFAULT_RULES,
+                    penetration: float = 0.75) -> EdgeTable:
+    """
+        Load (once) the edge table for a game setup and rule set. Tables are generated
+        offline with `python -m game.kelly`; a missing one raises ValueError.
+    """
+    path = edge_table_path(strategy, counting_system, rules, penetration)
+    try:
+        with open(path) as table_file:
+            return EdgeTable.from_dict(json.load(table_file))
+    except FileNotFoundError:
+        raise ValueError(f"No edge table for {strategy} with {counting_system} counting, {rules.name} rules "
+                         f"and {penetration:g} penetration") from None
+
+
+class KellyBetSizer:
+    """
+        Sizes bets by (fractional) Kelly: bankroll * fraction * edge / variance at the
+        current true count. Without an edge it bets the table minimum.
+    """
+    def __init__(self, table: EdgeTable, fraction: float = 1.0, max_bet: Optional[int] = None):
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Kelly fraction must be in (0, 1], got {fraction}")
+        self.table = table
+        self.fraction = fraction
+        self.max_bet = max_bet
+        self.bet_fractions = fraction * table.kelly_fractions()
+
+    def bet_size(self, true_count: float, base_bet: int, player_chips: int) -> int:
+        bet = max(int(self.bet_fractions[self.table.index(true_count)] * player_chips), base_bet)
+        if self.max_bet is not None:
+            bet = min(bet, self.max_bet)
+        return min(bet, player_chips)
+
+    def bet_sizes(self, true_counts: np.ndarray, base_bet: int, player_chips: np.ndarray) -> np.ndarray:
+        """
+            bet_size for arrays of true counts and bankrolls
+        """
+        bets = np.maximum((self.bet_fractions[self.table.bins(true_counts)] * player_chips).astype(np.int64), base_bet)
+        if self.max_bet is not None:
+            bets = np.minimum(bets, self.max_bet)
+        return np.minimum(bets, player_chips)
+
+    def growth_rate(self) -> float:
+        return self.table.growth_rate(self.fraction)
+
+    def to_dict(self):
+        return {
+            'fraction': self.fraction,
+            'max_bet': self.max_bet,
+            'growth_rate': self.growth_rate(),
+        }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description='Measure player edge and variance by true count')
+    parser.add_argument('strategy', nargs='?', default='basic')
+    parser.add_argument('--counting', default='hi-lo')
+    parser.add_argument('--rules', default='classic')
+    parser.add_argument('--decks', type=int, default=None)
+    parser.add_argument('--penetration', type=float, default=0.75)
+    parser.add_argument('--rounds', type=int, default=DEFAULT_TABLE_ROUNDS)
+    parser.add_argument('--seed', type=int, default=DEFAULT_TABLE_SEED)
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args(argv)
+    rules = get_rules(args.rules)
+    if args.decks is not None:
+        rules = rules.with_decks(args.decks)
+    table = measure_edge_table(args.strategy, args.counting, rules, args.penetration, args.rounds, seed=args.seed)
+    kelly = table.kelly_fractions()
+    for i, true_count in enumerate(range(table.min_count, table.max_count + 1)):
+        print(f"{true_count:+3d}  rounds={table.rounds[i]:>9d}  edge={table.edges[i]:+.4f}  "
+              f"variance={table.variances[i]:.3f}  kelly={kelly[i]:.4f}")
+    for fraction in (0.25, 0.5, 1.0):
+        print(f"growth per round at {fraction:g} Kelly: {table.growth_rate(fraction):.3e}")
+    output = args.output or edge_table_path(args.strategy, args.counting, rules, args.penetration)
+    write_edge_table(table, output)
+
+
+if __name__ == '__main__':
+    main()
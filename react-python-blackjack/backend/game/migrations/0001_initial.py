@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlackJackGameSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starting_chips', models.IntegerField(default=1000)),
+                ('ending_chips', models.IntegerField(default=0)),
+                ('hands_played', models.IntegerField(default=0)),
+                ('hands_won', models.IntegerField(default=0)),
+                ('hands_lost', models.IntegerField(default=0)),
+                ('hands_pushed', models.IntegerField(default=0)),
+                ('blackjacks', models.IntegerField(default=0)),
+                ('busts', models.IntegerField(default=0)),
+                ('total_wagered', models.IntegerField(default=0)),
+                ('net_winnings', models.IntegerField(default=0)),
+                ('ai_mode', models.BooleanField(default=False)),
+                ('ai_strategy', models.CharField(blank=True, max_length=20, null=True)),
+                ('duration', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BlackJackHand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hand_number', models.IntegerField()),
+                ('player_cards', models.JSONField()),
+                ('player_value', models.IntegerField()),
+                ('player_bet', models.IntegerField()),
+                ('player_blackjack', models.BooleanField(default=False)),
+                ('player_bust', models.BooleanField(default=False)),
+                ('dealer_cards', models.JSONField()),
+                ('dealer_value', models.IntegerField()),
+                ('dealer_blackjack', models.BooleanField(default=False)),
+                ('dealer_bust', models.BooleanField(default=False)),
+                ('result', models.CharField(max_length=20)),
+                ('payout', models.IntegerField()),
+                ('actions', models.JSONField(default=list)),
+                ('was_split', models.BooleanField(default=False)),
+                ('was_doubled', models.BooleanField(default=False)),
+                ('was_surrendered', models.BooleanField(default=False)),
+                ('had_insurance', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sessions', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hands', to='game.blackjackgamesession')),
+            ],
+            options={
+                'ordering': ['hand_number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlayerStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_sessions', models.IntegerField(default=0)),
+                ('total_hands', models.IntegerField(default=0)),
+                ('total_wagered', models.IntegerField(default=0)),
+                ('total_won', models.IntegerField(default=0)),
+                ('net_profit', models.IntegerField(default=0)),
+                ('hands_won', models.IntegerField(default=0)),
+                ('hands_lost', models.IntegerField(default=0)),
+                ('hands_pushed', models.IntegerField(default=0)),
+                ('blackjacks', models.IntegerField(default=0)),
+                ('busts', models.IntegerField(default=0)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('longest_win_streak', models.IntegerField(default=0)),
+                ('longest_lose_streak', models.IntegerField(default=0)),
+                ('biggest_win', models.IntegerField(default=0)),
+                ('biggest_loss', models.IntegerField(default=0)),
+                ('highest_chips', models.IntegerField(default=0)),
+                ('ai_hands_played', models.IntegerField(default=0)),
+                ('ai_hands_won', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Achievement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('category', models.TextField()),
+                ('icon', models.CharField(max_length=50)),
+                ('unlocked_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-unlocked_at'],
+                'unique_together': {('user', 'name')},
+            },
+        ),
+    ]
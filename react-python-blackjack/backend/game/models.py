@@ -97,6 +97,7 @@ class PlayerStatistics(models.Model):
     hands_pushed = models.IntegerField(default=0)
     blackjacks = models.IntegerField(default=0)
     busts = models.IntegerField(default=0)
+    double_wins = models.IntegerField(default=0)    # hands won after doubling down
     # Streaks
     current_streak = models.IntegerField(default=0) # Positive = winning, negative = losing
     longest_win_streak = models.IntegerField(default=0)
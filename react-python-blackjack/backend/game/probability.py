@@ -0,0 +1,87 @@
+from .game_engine import BlackJackGame, Card, VALUE_INDEX
+from functools import lru_cache
+from typing import Dict, Tuple
+
+# Dealer final outcomes, in the order used by probability vectors
+OUTCOMES = ('17', '18', '19', '20', '21', 'blackjack', 'bust')
+BLACKJACK = 5
+BUST = 6
+
+Composition = Tuple[int, ...]   # card counts by value: Ace, 2-9, ten-valued
+
+
+def card_index(card: Card) -> int:
+    """
+        Composition index of a card (Ace = 0, ten-valued = 9)
+    """
+    return VALUE_INDEX[card.code]
+
+def unseen_composition(game: BlackJackGame) -> Composition:
+    """
+        Cards the player has not seen: the undealt shoe plus the dealer hole card
+    """
+    counts = list(game.deck.composition())
+    if len(game.dealer_hand.cards) > 1:
+        counts[card_index(game.dealer_hand.cards[0])] += 1    # the hole card
+    return tuple(counts)
+
+
+class DealerProbabilities:
+    """
+        Exact probabilities of the dealer's final hand, given the up card and
+        the composition of unseen cards. Follows play_dealer_hand: the dealer
+        draws below 17 and stands on every 17 (or hits soft 17), with no peek for blackjack.
+        Results are memoized per (dealer hand, composition) in an LRU cache.
+    """
+    def __init__(self, maxsize: int = 200000, hit_soft_17: bool = False):
+        self.stand_on = 17
+        self.hit_soft_17 = hit_soft_17
+        self._outcomes = lru_cache(maxsize=maxsize)(self._dealer_outcomes)
+
+    def _dealer_outcomes(self, hard: int, soft: bool, two_cards: bool, composition: Composition) -> Tuple[float, ...]:
+        """
+            Outcome vector for a dealer hand that must draw, given the unseen cards
+            (two_cards means the next card completes a two-card hand)
+        """
+        total = sum(composition)
+        result = [0.0] * len(OUTCOMES)
+        for index, count in enumerate(composition):
+            if not count:
+                continue
+            probability = count / total
+            new_hard = hard + index + 1
+            new_soft = soft or index == 0
+            value = new_hard + 10 if new_soft and new_hard <= 11 else new_hard
+            if value > 21:
+                result[BUST] += probability
+            elif value > self.stand_on or (value == self.stand_on and not (self.hit_soft_17 and value != new_hard)):
+                outcome = BLACKJACK if two_cards and value == 21 else value - 17
+                result[outcome] += probability
+            else:
+                remaining = composition[:index] + (count - 1,) + composition[index + 1:]
+                for outcome, sub_probability in enumerate(self._outcomes(new_hard, new_soft, False, remaining)):
+                    result[outcome] += probability * sub_probability
+        return tuple(result)
+
+    def outcomes(self, up_index: int, composition: Composition) -> Tuple[float, ...]:
+        """
+            Outcome probabilities (ordered as OUTCOMES) for an up card index,
+            where composition excludes the up card
+        """
+        return self._outcomes(up_index + 1, up_index == 0, True, tuple(composition))
+
+    def for_card(self, up_card: Card, composition: Composition) -> Dict[str, float]:
+        """
+            Outcome probabilities keyed by outcome name
+        """
+        return dict(zip(OUTCOMES, self.outcomes(card_index(up_card), composition)))
+
+    def cache_info(self):
+        return self._outcomes.cache_info()
+
+    def cache_clear(self):
+        self._outcomes.cache_clear()
+
+
+# Shared calculator, so consecutive decisions reuse each other's work
+dealer_probabilities = DealerProbabilities()
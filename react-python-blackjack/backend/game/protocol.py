@@ -0,0 +1,152 @@
+from .game_engine import HIDDEN_CARD, BlackJackGame, Card, Hand
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# 1: the full state after every change, 2: a snapshot followed by deltas
+PROTOCOL_VERSIONS = (1, 2)
+DELTA_PROTOCOL = 2
+
+
+class SentHand(NamedTuple):
+    """
+        What the client last received for a hand
+    """
+    cards: Tuple[Card, ...]
+    fields: Dict
+    hidden: bool
+
+
+class GameStateEncoder:
+    """
+        Encodes a game's state for one client as a 'game_state' snapshot followed by
+        'game_delta' messages with only what changed since the last message.
+        - A delta maps dotted paths into the state to new values ('set') and to items
+          added at the end of a list ('append': cards dealt to a hand, new hands);
+          changed extra values (e.g. ai_mode) are sent beside them, as in a snapshot
+        - Hands are compared with what was sent by position, and their cards by prefix
+          (cards are shared instances), so cards already sent are never serialized again
+        - Every message has a sequence number; a client that misses one asks for a
+          resync and gets a new snapshot
+    """
+    def __init__(self, game: BlackJackGame):
+        self.game = game
+        self.seq = 0
+        self.extra: Dict = {}
+        self.fields: Dict = {}
+        self.hands: List[SentHand] = []
+        self.dealer: Optional[SentHand] = None
+
+    @staticmethod
+    def track(hand: Hand, hidden: bool = False) -> SentHand:
+        return SentHand(tuple(hand.cards), hand.state_fields(hidden), hidden)
+
+    def snapshot(self, hide_dealer_card: bool = True, **extra) -> Dict:
+        """
+            Full state message; extra values are sent beside the state (e.g. ai_mode)
+        """
+        game = self.game
+        self.seq += 1
+        self.extra = extra
+        self.fields = game.state_fields()
+        self.hands = [self.track(hand) for hand in game.player_hands]
+        self.dealer = self.track(game.dealer_hand, hide_dealer_card)
+        return {'type': 'game_state', 'seq': self.seq, 'state': game.get_state(hide_dealer_card), **extra}
+
+    def delta(self, hide_dealer_card: bool = True, **extra) -> Optional[Dict]:
+        """
+            Changes since the last message (a snapshot if none was sent yet, None if nothing changed)
+        """
+        if self.dealer is None:
+            return self.snapshot(hide_dealer_card, **extra)
+        game = self.game
+        changed = {}
+        diff_fields('', self.extra, extra, changed)
+        self.extra = extra
+        updates: Dict = {}
+        appends: Dict[str, List] = {}
+        fields = game.state_fields()
+        diff_fields('', self.fields, fields, updates)
+        self.fields = fields
+        hands = game.player_hands
+        if len(hands) < len(self.hands):
+            # Fewer hands (a new round): send them again
+            updates['player_hands'] = [hand.to_dict() for hand in hands]
+            self.hands = [self.track(hand) for hand in hands]
+        else:
+            sent_hands = self.hands
+            self.hands = [self.diff_hand(f"player_hands.{i}.", sent, hand, False, updates, appends)
+                          for i, (hand, sent) in enumerate(zip(hands, sent_hands))]
+            for hand in hands[len(sent_hands):]:
+                appends.setdefault('player_hands', []).append(hand.to_dict())
+                self.hands.append(self.track(hand))
+        self.dealer = self.diff_hand('dealer_hand.', self.dealer, game.dealer_hand, hide_dealer_card, updates, appends)
+        if not (changed or updates or appends):
+            return None
+        self.seq += 1
+        message = {'type': 'game_delta', 'seq': self.seq, **changed}
+        if updates:
+            message['set'] = updates
+        if appends:
+            message['append'] = appends
+        return message
+
+    @staticmethod
+    def diff_hand(prefix: str, sent: SentHand, hand: Hand, hidden: bool, updates: Dict, appends: Dict) -> SentHand:
+        """
+            Record the changes from what was sent for a hand position to the hand now there
+        """
+        cards = tuple(hand.cards)
+        sent_count = len(sent.cards)
+        if cards[:sent_count] != sent.cards or (hidden and not sent.hidden and sent_count):
+            updates[prefix + 'cards'] = hand.to_dict(hide_first=hidden)['cards']
+        else:
+            if sent.hidden and not hidden and sent_count:
+                # Hole card revealed
+                updates[prefix + 'cards.0'] = cards[0].to_dict()
+            if len(cards) > sent_count:
+                appends[prefix + 'cards'] = [dict(HIDDEN_CARD) if hidden and index == 0 else cards[index].to_dict()
+                                             for index in range(sent_count, len(cards))]
+        fields = hand.state_fields(hidden)
+        if fields == sent.fields and len(cards) == sent_count and hidden == sent.hidden:
+            return sent
+        diff_fields(prefix, sent.fields, fields, updates)
+        return SentHand(cards, fields, hidden)
+
+
+def diff_fields(prefix: str, old: Dict, new: Dict, updates: Dict):
+    if old == new:
+        return
+    for key, value in new.items():
+        if key not in old or old[key] != value:
+            updates[prefix + key] = value
+
+
+def resolve_path(state: Dict, path: str):
+    """
+        Container and key of a dotted path into the state
+    """
+    *parents, key = path.split('.')
+    target = state
+    for step in parents:
+        target = target[int(step)] if isinstance(target, list) else target[step]
+    return target, int(key) if isinstance(target, list) else key
+
+
+def apply_delta(message: Dict, delta: Dict) -> Dict:
+    """
+        Apply a 'game_delta' to the last message received, as a client does (in place).
+        Raises ValueError on a sequence gap, when the client should ask for a resync.
+    """
+    if delta['seq'] != message['seq'] + 1:
+        raise ValueError(f"Missed messages between {message['seq']} and {delta['seq']}")
+    state = message['state']
+    for path, value in delta.get('set', {}).items():
+        target, key = resolve_path(state, path)
+        target[key] = value
+    for path, values in delta.get('append', {}).items():
+        target, key = resolve_path(state, path)
+        target[key].extend(values)
+    for key, value in delta.items():
+        if key not in ('type', 'seq', 'set', 'append'):
+            message[key] = value
+    message['seq'] = delta['seq']
+    return message
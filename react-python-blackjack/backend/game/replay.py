@@ -0,0 +1,73 @@
+from .game_engine import BlackJackGame, RoundRecord, ACTION_CODES
+from .rules import RuleSet
+from typing import Iterable, Optional, Union
+
+# Game method for every action code
+ACTION_METHODS = {
+    ACTION_CODES['hit']: 'hit',
+    ACTION_CODES['stand']: 'stand',
+    ACTION_CODES['double']: 'double_down',
+    ACTION_CODES['split']: 'split',
+    ACTION_CODES['surrender']: 'surrender',
+    ACTION_CODES['insurance']: 'buy_insurance',
+}
+
+
+def apply_action(game: BlackJackGame, code: str) -> bool:
+    """
+        Apply one recorded action code to a game
+    """
+    method = ACTION_METHODS.get(code)
+    if method is None:
+        raise ValueError(f"Unknown action code: {code!r}")
+    return getattr(game, method)()
+
+
+def play_record(game: BlackJackGame, record: RoundRecord, steps: Optional[int] = None):
+    """
+        Place the recorded bet, deal and apply the first steps actions (all by default)
+    """
+    game.player_chips = record.chips
+    if not game.place_bet(record.bet) or not game.start_round():
+        raise ValueError(f"Cannot replay round {record.encode()}")
+    for code in record.actions[:steps]:
+        if not apply_action(game, code):
+            raise ValueError(f"Action {code!r} is not legal when replaying round {record.encode()}")
+
+
+def replay_round(record: Union[RoundRecord, str],
+                 num_decks: Optional[int] = None,
+                 steps: Optional[int] = None,
+                 rules: Union[str, RuleSet, None] = None) -> BlackJackGame:
+    """
+        Rebuild a shoe-dealt round from its record alone (and the table rules), stopping after steps actions.
+        Only the shoe seed and dealing position are needed, so the cost is one shuffle plus the round.
+    """
+    if isinstance(record, str):
+        record = RoundRecord.decode(record)
+    game = BlackJackGame(num_decks=num_decks, penetration=1.0, rules=rules)
+    game.deck.restore(record.shoe_seed, record.cursor)
+    play_record(game, record, steps)
+    return game
+
+
+def replay_session(seed: Union[int, str],
+                   records: Iterable[Union[RoundRecord, str]],
+                   num_decks: Optional[int] = None,
+                   penetration: float = 0.75,
+                   continuous_shuffle: bool = False,
+                   rules: Union[str, RuleSet, None] = None) -> BlackJackGame:
+    """
+        Replay a whole game from its seed, one record per round. Needed for continuous
+        shufflers, where the shoe order depends on every earlier round.
+        Returns: the game after the last round
+    """
+    game = BlackJackGame(num_decks=num_decks, seed=seed, penetration=penetration,
+                         continuous_shuffle=continuous_shuffle, rules=rules)
+    for record in records:
+        if isinstance(record, str):
+            record = RoundRecord.decode(record)
+        if game.game_phase != 'betting':
+            game.reset_round()
+        play_record(game, record)
+    return game
@@ -2,6 +2,8 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
+    # Multi-seat blackjack table websocket
+    re_path(r'ws/blackjack/table/(?P<game_id>\w+)/$', consumers.BlackJackTableConsumer.as_asgi()),
     # Blackjack game websocket
     re_path(r'ws/blackjack/(?P<game_id>\w+)/$', consumers.BlackJackConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -0,0 +1,134 @@
+from typing import Dict, Optional, Tuple, Union
+import math
+
+SURRENDER_TYPES = ('none', 'late', 'early')
+
+
+class RuleSet:
+    """
+        Table rules shared by the engine, the AI, the solvers and the simulators.
+        - dealer_hits_soft_17: H17 when True, S17 otherwise
+        - blackjack_pays: payout ratio of a natural, e.g. (3, 2) or (6, 5)
+        - double_after_split: whether split hands can be doubled (DAS)
+        - max_split_hands: most hands a round can be split into (None = unlimited)
+        - surrender: 'none', 'late' (a dealer blackjack still takes the whole bet)
+          or 'early' (half the bet is always returned)
+        The dealer never peeks for blackjack, so an early surrender also saves half
+        the bet against a dealer blackjack.
+    """
+    __slots__ = ('name', 'description', 'num_decks', 'dealer_hits_soft_17', 'blackjack_pays',
+                 'double_after_split', 'max_split_hands', 'surrender')
+
+    def __init__(self,
+                 name: str,
+                 description: str = '',
+                 num_decks: int = 6,
+                 dealer_hits_soft_17: bool = False,
+                 blackjack_pays: Tuple[int, int] = (3, 2),
+                 double_after_split: bool = True,
+                 max_split_hands: Optional[int] = None,
+                 surrender: str = 'early'):
+        if surrender not in SURRENDER_TYPES:
+            raise ValueError(f"Unknown surrender type: {surrender}")
+        if max_split_hands is not None and max_split_hands < 1:
+            raise ValueError(f"max_split_hands must be at least 1, got {max_split_hands}")
+        self.name = name
+        self.description = description
+        self.num_decks = num_decks
+        self.dealer_hits_soft_17 = dealer_hits_soft_17
+        self.blackjack_pays = tuple(blackjack_pays)
+        self.double_after_split = double_after_split
+        self.max_split_hands = max_split_hands
+        self.surrender = surrender
+
+    @property
+    def key(self) -> str:
+        """
+            Canonical name of the rule values (not the profile name), e.g. '6d-s17-3to2-das-splitany-early'
+        """
+        return '-'.join((
+            f"{self.num_decks}d",
+            'h17' if self.dealer_hits_soft_17 else 's17',
+            '{}to{}'.format(*self.blackjack_pays),
+            'das' if self.double_after_split else 'nodas',
+            f"split{self.max_split_hands or 'any'}",
+            self.surrender,
+        ))
+
+    def __eq__(self, other):
+        return isinstance(other, RuleSet) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"RuleSet({self.name!r}, {self.key!r})"
+
+    @property
+    def blackjack_ratio(self) -> float:
+        return self.blackjack_pays[0] / self.blackjack_pays[1]
+
+    @property
+    def unit_bet(self) -> int:
+        """
+            Smallest bet with every payout in whole chips: even (surrender, insurance and 3:2)
+            and a multiple of the blackjack payout denominator (e.g. 10 chips for 6:5)
+        """
+        return math.lcm(2, self.blackjack_pays[1])
+
+    def blackjack_payout(self, bet: int) -> int:
+        """
+            Whole chips won by a natural (rounded down)
+        """
+        return bet * self.blackjack_pays[0] // self.blackjack_pays[1]
+
+    def with_decks(self, num_decks: int) -> 'RuleSet':
+        if num_decks == self.num_decks:
+            return self
+        return RuleSet(**{**self.to_dict(), 'num_decks': num_decks})
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RuleSet':
+        return cls(**{field: data[field] for field in cls.__slots__ if field in data})
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'description': self.description,
+            'num_decks': self.num_decks,
+            'dealer_hits_soft_17': self.dealer_hits_soft_17,
+            'blackjack_pays': list(self.blackjack_pays),
+            'double_after_split': self.double_after_split,
+            'max_split_hands': self.max_split_hands,
+            'surrender': self.surrender,
+        }
+
+
+DEFAULT_RULES = RuleSet('classic', 'Six decks, dealer stands on all 17s, 3:2, double after split, unlimited splits, surrender')
+
+RULE_PROFILES: Dict[str, RuleSet] = {
+    'classic': DEFAULT_RULES,
+    'vegas-strip': RuleSet('vegas-strip', 'Four decks, S17, 3:2, double after split, split to 4 hands, late surrender',
+                           num_decks=4, max_split_hands=4, surrender='late'),
+    'downtown': RuleSet('downtown', 'Two decks, H17, 3:2, double after split, split to 4 hands, no surrender',
+                        num_decks=2, dealer_hits_soft_17=True, max_split_hands=4, surrender='none'),
+    'atlantic-city': RuleSet('atlantic-city', 'Eight decks, S17, 3:2, double after split, split to 4 hands, late surrender',
+                             num_decks=8, max_split_hands=4, surrender='late'),
+    'single-deck-6-5': RuleSet('single-deck-6-5', 'One deck, H17, blackjack pays 6:5, no double after split, one split, no surrender',
+                               num_decks=1, dealer_hits_soft_17=True, blackjack_pays=(6, 5),
+                               double_after_split=False, max_split_hands=2, surrender='none'),
+}
+
+
+def get_rules(rules: Union[str, RuleSet, None] = None) -> RuleSet:
+    """
+        Resolve a profile name (or a RuleSet, or None for the default rules)
+    """
+    if rules is None:
+        return DEFAULT_RULES
+    if isinstance(rules, RuleSet):
+        return rules
+    try:
+        return RULE_PROFILES[rules]
+    except KeyError:
+        raise ValueError(f"Unknown rule profile: {rules}") from None
@@ -0,0 +1,163 @@
+from .game_engine import BlackJackGame, Rank
+from .ai_agent import BlackJackAI, Strategy
+from .probability import unseen_composition
+from .rules import get_rules
+from .simulator import SimulationResult
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+import secrets
+
+# Bankroll large enough that doubles and splits are never refused
+UNLIMITED_CHIPS = 10 ** 12
+
+
+def play_round(game: BlackJackGame, ai: BlackJackAI, bet: int) -> bool:
+    """
+        Play one full round synchronously, with the same decisions as the consumer's AI mode
+        Returns: False if the bet could not be placed
+    """
+    if not game.place_bet(bet) or not game.start_round():
+        return False
+    while game.game_phase == 'playing':
+        current_hand = game.player_hands[game.current_hand_index]
+        dealer_up_card = game.dealer_hand.cards[1]     # cards[0] is the hidden hole card
+        # Check if AI should buy insurance
+        if (game.current_hand_index == 0 and
+                dealer_up_card.rank == Rank.ACE and not current_hand.is_insured and
+                game.player_chips >= game.current_bet // 2):
+            if ai.should_buy_insurance(dealer_up_card, current_hand):
+                game.buy_insurance()
+        # Get AI's decision
+        ai.observe_shoe(unseen_composition(game))
+        action = ai.get_action(
+            current_hand,
+            dealer_up_card,
+            can_double=game.can_double(),
+            can_split=game.can_split(),
+            can_surrender=(game.current_hand_index == 0 and game.can_surrender())
+        )
+        # Execute action, with the same fallbacks as the consumer
+        if action == 'hit':
+            played = game.hit()
+        elif action == 'stand':
+            played = game.stand()
+        elif action == 'double':
+            played = game.double_down() or game.hit()
+        elif action == 'split':
+            played = game.split() or game.hit()
+        elif action == 'surrender':
+            played = game.surrender() or game.stand()
+        else:
+            played = False
+        if not played:
+            break
+    return True
+
+
+def shard_seed(seed: int, shard_index: int) -> str:
+    """
+        Independent, reproducible RNG seed for one shard of a run
+    """
+    return f"{seed}:{shard_index}"
+
+
+def run_shard(strategy: Strategy, num_decks: Optional[int], num_rounds: int, seed: int, shard_index: int,
+              rules: Optional[str] = None) -> SimulationResult:
+    """
+        Play num_rounds rounds with a private game, AI and RNG stream, betting the rules'
+        unit bet (e.g. 10 chips for 6:5) so every return is whole chips
+        Returns: partial aggregate
+    """
+    game = BlackJackGame(num_decks=num_decks, seed=shard_seed(seed, shard_index), rules=rules)
+    ai = BlackJackAI(strategy=strategy, rules=game.rules)
+    game.deck.add_shuffle_listener(ai.reset_count)
+    game.add_card_listener(lambda card: ai.observe_card(card, game.deck.remaining() / 52))
+    unit_bet = game.rules.unit_bet
+    chips = np.empty(num_rounds, dtype=np.int64)
+    for i in range(num_rounds):
+        game.player_chips = UNLIMITED_CHIPS
+        play_round(game, ai, unit_bet)
+        chips[i] = game.player_chips - UNLIMITED_CHIPS
+        game.reset_round()
+    result = SimulationResult(unit_bet=unit_bet)
+    result.add_chips(chips)
+    return result
+
+
+class SimulationRunner:
+    """
+        Runs a strategy study across worker processes.
+        Rounds are split into fixed-size shards, each with its own game, AI and
+        seeded RNG stream, so a fixed seed gives bit-identical results for any
+        number of workers. Partial aggregates are merged as shards finish.
+        An executor shared with other runs can be given instead of workers; shards not
+        started yet are cancelled when progress() is closed early.
+    """
+    def __init__(self,
+                 strategy: Strategy = 'basic',
+                 num_rounds: int = 100000,
+                 num_decks: Optional[int] = None,
+                 seed: Optional[int] = None,
+                 workers: Optional[int] = None,
+                 shard_size: int = 10000,
+                 rules: Optional[str] = None,
+                 executor: Optional[Executor] = None):
+        self.strategy = strategy
+        self.num_rounds = num_rounds
+        self.num_decks = num_decks
+        self.rules = rules      # rule profile name, sent to the workers
+        self.seed = seed if seed is not None else secrets.randbits(64)
+        self.workers = workers
+        self.shard_size = shard_size
+        self.executor = executor
+        self.unit_bet = get_rules(rules).unit_bet
+        self.result = SimulationResult(unit_bet=self.unit_bet)
+
+    def shards(self):
+        """
+            Rounds per shard, in shard order
+        """
+        full, rest = divmod(self.num_rounds, self.shard_size)
+        return [self.shard_size] * full + ([rest] if rest else [])
+
+    def progress(self) -> Iterator[Dict]:
+        """
+            Run the study, yielding the merged aggregate after every finished shard
+        """
+        self.result = SimulationResult(unit_bet=self.unit_bet)
+        if self.executor is not None:
+            yield from self.collect(self.executor, self.shards())
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                yield from self.collect(executor, self.shards())
+
+    def collect(self, executor: Executor, shards: List[int]) -> Iterator[Dict]:
+        futures = [
+            executor.submit(run_shard, self.strategy, self.num_decks, rounds, self.seed, index, self.rules)
+            for index, rounds in enumerate(shards)
+        ]
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                self.result.merge(future.result())
+                yield {
+                    'strategy': self.strategy,
+                    'seed': self.seed,
+                    'shards_done': done,
+                    'shards_total': len(shards),
+                    'rounds_done': self.result.rounds,
+                    'rounds_total': self.num_rounds,
+                    'result': self.result.to_dict(),
+                }
+        finally:
+            # Stopped early: drop the shards that have not started
+            for future in futures:
+                future.cancel()
+
+    def run(self) -> SimulationResult:
+        """
+            Run the study to completion
+        """
+        for _ in self.progress():
+            pass
+        return self.result
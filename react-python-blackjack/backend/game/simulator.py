@@ -0,0 +1,444 @@
+from .game_engine import Card, Hand, Suit, Rank
+from .ai_agent import BlackJackAI
+from .counting import CountingSystem
+from .rules import RuleSet
+from .strategy import VALUE_RANKS, hard_total_values, make_hand
+from typing import Optional, Tuple
+import numpy as np
+
+# Action codes stored in compiled policy tables
+STAND, HIT, DOUBLE, SPLIT, SURRENDER = range(5)
+ACTION_CODES = {
+    'stand': STAND,
+    'hit': HIT,
+    'double': DOUBLE,
+    'split': SPLIT,
+    'surrender': SURRENDER,
+}
+
+# Policy table rows: hard totals 0-21, soft totals 12-21, pairs of Ace-Ten
+SOFT_OFFSET = 22
+PAIR_OFFSET = 32
+POLICY_ROWS = 42
+
+# One deck of card values (Ace = 1, face cards = 10)
+DECK_VALUES = np.array([min(rank, 10) for rank in range(1, 14)] * 4, dtype=np.int8)
+
+
+# -----------------------------
+#     POLICY COMPILATION
+# -----------------------------
+def _representative_hand(row: int) -> Optional[Hand]:
+    """
+        Build a hand matching a policy table row (None for unreachable rows)
+    """
+    if row < 4:
+        return None
+    if row < SOFT_OFFSET:
+        return make_hand(hard_total_values(row))
+    if row < PAIR_OFFSET:
+        total = row - SOFT_OFFSET + 12
+        return make_hand([1, total - 11] if total > 12 else [1, 1])
+    value = row - PAIR_OFFSET + 1
+    return make_hand([value, value])
+
+def _allowed(action: int, can_double: bool, can_split: bool, can_surrender: bool) -> int:
+    """
+        Apply the consumer's fallbacks for actions that are not allowed
+    """
+    if action == DOUBLE and not can_double:
+        return HIT
+    if action == SPLIT and not can_split:
+        return HIT
+    if action == SURRENDER and not can_surrender:
+        return STAND
+    return action
+
+def compile_policy(ai: BlackJackAI) -> np.ndarray:
+    """
+        Compile an AI strategy into a lookup table indexed by
+        [hand row, dealer up card value (Ace = 1), flags], where
+        flags = can_double * 4 + can_split * 2 + can_surrender
+    """
+    policy = np.full((POLICY_ROWS, 11, 8), HIT, dtype=np.int8)
+    for row in range(POLICY_ROWS):
+        hand = _representative_hand(row)
+        if hand is None:
+            continue
+        for up_value in range(1, 11):
+            up_card = Card(Suit.HEARTS, VALUE_RANKS[up_value])
+            for flags in range(8):
+                can_double, can_split, can_surrender = bool(flags & 4), bool(flags & 2), bool(flags & 1)
+                action = ai.get_action(hand, up_card,
+                                       can_double=can_double,
+                                       can_split=can_split,
+                                       can_surrender=can_surrender)
+                policy[row, up_value, flags] = _allowed(ACTION_CODES.get(action, STAND),
+                                                        can_double, can_split, can_surrender)
+    return policy
+
+
+# -----------------------------
+#       SIMULATION RESULTS
+# -----------------------------
+class SimulationResult:
+    """
+        Aggregate outcome of simulated rounds (returns in units of the initial bet).
+        Returns are summed as integer chips of a unit_bet chip bet (RuleSet.unit_bet, so every
+        payout is whole chips): the sums are exact, and merging partial results in any order
+        gives identical totals. They are converted to bet units only when read.
+    """
+    def __init__(self, unit_bet: int = 2):
+        self.unit_bet = unit_bet
+        self.rounds = 0
+        self.wins = 0
+        self.losses = 0
+        self.pushes = 0
+        self.total_chips = 0
+        self.total_squared_chips = 0
+
+    def add(self, returns: np.ndarray):
+        """
+            Accumulate an array of per-round net returns, in units of the bet
+        """
+        self.add_chips(np.rint(np.asarray(returns) * self.unit_bet).astype(np.int64))
+
+    def add_chips(self, chips: np.ndarray):
+        """
+            Accumulate an array of per-round net returns, in chips of a unit_bet bet
+        """
+        self.rounds += int(chips.size)
+        self.wins += int(np.count_nonzero(chips > 0))
+        self.losses += int(np.count_nonzero(chips < 0))
+        self.pushes += int(np.count_nonzero(chips == 0))
+        self.total_chips += int(chips.sum())
+        self.total_squared_chips += int(np.square(chips).sum())
+
+    def merge(self, other: 'SimulationResult'):
+        """
+            Merge another partial result (with the same unit bet) into this one
+        """
+        if other.unit_bet != self.unit_bet:
+            raise ValueError(f"Cannot merge results with unit bets {self.unit_bet} and {other.unit_bet}")
+        self.rounds += other.rounds
+        self.wins += other.wins
+        self.losses += other.losses
+        self.pushes += other.pushes
+        self.total_chips += other.total_chips
+        self.total_squared_chips += other.total_squared_chips
+
+    @property
+    def total_return(self) -> float:
+        return self.total_chips / self.unit_bet
+
+    @property
+    def total_squared(self) -> float:
+        return self.total_squared_chips / self.unit_bet ** 2
+
+    @property
+    def ev(self) -> float:
+        if self.rounds > 0:
+            return self.total_return / self.rounds
+        return 0.0
+
+    @property
+    def variance(self) -> float:
+        if self.rounds > 0:
+            return self.total_squared / self.rounds - self.ev ** 2
+        return 0.0
+
+    @property
+    def std_dev(self) -> float:
+        return self.variance ** 0.5
+
+    @property
+    def standard_error(self) -> float:
+        if self.rounds > 0:
+            return self.std_dev / self.rounds ** 0.5
+        return 0.0
+
+    def confidence_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        """
+            Normal-approximation confidence interval for the EV (95% by default)
+        """
+        margin = z * self.standard_error
+        return self.ev - margin, self.ev + margin
+
+    @property
+    def win_rate(self) -> float:
+        if self.rounds > 0:
+            return self.wins / self.rounds
+        return 0.0
+
+    @property
+    def loss_rate(self) -> float:
+        if self.rounds > 0:
+            return self.losses / self.rounds
+        return 0.0
+
+    @property
+    def push_rate(self) -> float:
+        if self.rounds > 0:
+            return self.pushes / self.rounds
+        return 0.0
+
+    def to_dict(self):
+        """
+            Get dictionary with all aggregate results
+        """
+        return {
+            'rounds': self.rounds,
+            'ev': self.ev,
+            'variance': self.variance,
+            'std_dev': self.std_dev,
+            'confidence_interval': list(self.confidence_interval()),
+            'win_rate': self.win_rate,
+            'loss_rate': self.loss_rate,
+            'push_rate': self.push_rate,
+        }
+
+
+# -----------------------------
+#        BATCH SIMULATOR
+# -----------------------------
+class BatchSimulator:
+    """
+        Plays the BlackJackGame rules for many independent shoes at once:
+        - The table rules of the AI (or the given RuleSet): S17/H17, blackjack payout,
+          double after split, split limit and surrender type; no dealer peek
+        - Double on any two cards, surrender on the first hand
+        - Insurance pays 2:1, offered to the first hand against an Ace
+        Each lane plays one round per step from its own shoe. Splits are
+        limited to max_hands hands per round, and payouts are exact
+        fractions of the bet (the engine rounds them to whole chips).
+        With a counting system, each shuffle stores the cumulative tag sum of
+        every shoe, so the count at any dealing position is a single lookup.
+        Given whole-chip bets and bankrolls, a round is settled in chips with the
+        engine's rounding, and doubles, splits and insurance need the chips to cover them.
+    """
+    def __init__(self,
+                 ai: BlackJackAI,
+                 num_decks: Optional[int] = None,
+                 num_shoes: int = 10000,
+                 max_hands: int = 4,
+                 reshuffle_at: int = 20,
+                 seed: Optional[int] = None,
+                 counting: Optional[CountingSystem] = None,
+                 rules: Optional[RuleSet] = None):
+        self.rules = rules or ai.rules
+        if num_decks is not None:
+            self.rules = self.rules.with_decks(num_decks)
+        num_decks = self.rules.num_decks
+        self.policy = compile_policy(ai)
+        self.insure = bool(ai.should_buy_insurance(Card(Suit.HEARTS, Rank.ACE), make_hand([10, 10])))
+        self.num_shoes = num_shoes
+        self.max_hands = min(max_hands, self.rules.max_split_hands or max_hands)
+        self.reshuffle_at = reshuffle_at
+        self.shoe_size = 52 * num_decks
+        self.rng = np.random.default_rng(seed)
+        self.shoes = np.tile(DECK_VALUES, (num_shoes, num_decks))
+        self.cursor = np.full(num_shoes, self.shoe_size, dtype=np.int64)   # forces a shuffle on first round
+        self.num_decks = num_decks
+        self.counting = counting
+        self.tag_sums = np.zeros((num_shoes, self.shoe_size + 1), dtype=np.int16) if counting else None
+
+    def shuffle_low_shoes(self):
+        """
+            Reshuffle every shoe running low on cards before a round starts
+        """
+        lanes = np.flatnonzero(self.shoe_size - self.cursor < self.reshuffle_at)
+        if lanes.size:
+            self.shoes[lanes] = self.rng.permuted(self.shoes[lanes], axis=1)
+            self.cursor[lanes] = 0
+            if self.counting is not None:
+                self.tag_sums[lanes, 1:] = np.cumsum(self.counting.count_values(self.shoes[lanes]), axis=1)
+
+    def running_counts(self) -> np.ndarray:
+        """
+            Running count of every shoe before its next round (due shoes are reshuffled first)
+        """
+        self.shuffle_low_shoes()
+        dealt = np.minimum(self.cursor, self.shoe_size)
+        return self.tag_sums[np.arange(self.num_shoes), dealt] + self.counting.initial_count(self.num_decks)
+
+    def true_counts(self) -> np.ndarray:
+        """
+            Betting count of every shoe before its next round
+        """
+        running = self.running_counts()
+        if not self.counting.balanced:
+            return running.astype(float)
+        decks_remaining = (self.shoe_size - np.minimum(self.cursor, self.shoe_size)) / 52
+        return np.divide(running, decks_remaining, out=np.zeros(self.num_shoes), where=decks_remaining > 0)
+
+    def draw(self, lanes: np.ndarray) -> np.ndarray:
+        """
+            Deal one card from each of the given shoes
+        """
+        cards = self.shoes[lanes, self.cursor[lanes] % self.shoe_size]
+        self.cursor[lanes] += 1
+        return cards
+
+    @staticmethod
+    def hand_value(hard: np.ndarray, aces: np.ndarray) -> np.ndarray:
+        """
+            Hand values with one Ace counted as 11 when it does not bust
+        """
+        return hard + 10 * ((aces > 0) & (hard <= 11))
+
+    def play_round(self, bets: Optional[np.ndarray] = None, chips: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+            Play one round in every shoe, optionally with a whole-chip bet and bankroll per shoe
+            Returns: net return per shoe in units of the initial bet, or net chips when bets are given
+        """
+        n, max_hands = self.num_shoes, self.max_hands
+        lanes = np.arange(n)
+        self.shuffle_low_shoes()
+        # Chips left to cover doubles, splits and insurance once the bet is placed
+        free = chips - bets if chips is not None else None
+        # Per hand state: hard total (Aces as 1), Ace count, card count, first two cards
+        hard = np.zeros((n, max_hands), dtype=np.int16)
+        aces = np.zeros((n, max_hands), dtype=np.int8)
+        ncards = np.zeros((n, max_hands), dtype=np.int8)
+        first = np.zeros((n, max_hands), dtype=np.int8)
+        second = np.zeros((n, max_hands), dtype=np.int8)
+        stake = np.ones((n, max_hands))
+        done = np.zeros((n, max_hands), dtype=bool)
+        surrendered = np.zeros((n, max_hands), dtype=bool)
+        num_hands = np.ones(n, dtype=np.int8)
+
+        def add_card(idx, slot, cards):
+            hard[idx, slot] += cards
+            aces[idx, slot] += cards == 1
+            ncards[idx, slot] += 1
+            count = ncards[idx, slot]
+            first[idx, slot] = np.where(count == 1, cards, first[idx, slot])
+            second[idx, slot] = np.where(count == 2, cards, second[idx, slot])
+
+        # Deal initial cards in engine order
+        add_card(lanes, 0, self.draw(lanes))
+        up_card = self.draw(lanes)
+        add_card(lanes, 0, self.draw(lanes))
+        hole_card = self.draw(lanes)
+        dealer_hard = (up_card + hole_card).astype(np.int16)
+        dealer_aces = ((up_card == 1).astype(np.int8) + (hole_card == 1))
+
+        # A natural ends the player's turn immediately
+        natural = self.hand_value(hard[:, 0], aces[:, 0]) == 21
+        done[:, 0] = natural
+        insured = (up_card == 1) & ~natural if self.insure else np.zeros(n, dtype=bool)
+        if free is not None:
+            insured &= free >= bets // 2
+            free -= np.where(insured, bets // 2, 0)
+
+        # Play each hand slot until every lane has finished it
+        for slot in range(max_hands):
+            while True:
+                active = np.flatnonzero((slot < num_hands) & ~done[:, slot])
+                if not active.size:
+                    break
+                h, a, c = hard[active, slot], aces[active, slot], ncards[active, slot]
+                value = self.hand_value(h, a)
+                soft = value != h
+                two_cards = c == 2
+                pair = two_cards & (first[active, slot] == second[active, slot])
+                row = np.where(pair, PAIR_OFFSET + first[active, slot] - 1,
+                               np.where(soft, SOFT_OFFSET + value - 12, value))
+                flags = ((two_cards & (self.rules.double_after_split | (num_hands[active] == 1))) * 4
+                         + (pair & (num_hands[active] < max_hands)) * 2
+                         + (two_cards & (slot == 0) & (self.rules.surrender != 'none')))
+                action = self.policy[row, up_card[active], flags]
+                if free is not None:
+                    # The engine refuses doubles and splits the bankroll cannot cover; the AI hits instead
+                    short = ((action == DOUBLE) | (action == SPLIT)) & (free[active] < bets[active])
+                    action = np.where(short, HIT, action)
+                    spent = active[(action == DOUBLE) | (action == SPLIT)]
+                    free[spent] -= bets[spent]
+
+                sel = active[action == STAND]
+                done[sel, slot] = True
+
+                sel = active[action == SURRENDER]
+                surrendered[sel, slot] = True
+                done[sel, slot] = True
+
+                sel = active[action == HIT]
+                add_card(sel, slot, self.draw(sel))
+                done[sel, slot] = self.hand_value(hard[sel, slot], aces[sel, slot]) > 21
+
+                sel = active[action == DOUBLE]
+                stake[sel, slot] = 2
+                add_card(sel, slot, self.draw(sel))
+                done[sel, slot] = True
+
+                sel = active[action == SPLIT]
+                if sel.size:
+                    new_slot = num_hands[sel].astype(np.intp)
+                    moved = second[sel, slot]
+                    hard[sel, slot] -= moved
+                    aces[sel, slot] -= moved == 1
+                    ncards[sel, slot] = 1
+                    add_card(sel, new_slot, moved)
+                    add_card(sel, slot, self.draw(sel))
+                    add_card(sel, new_slot, self.draw(sel))
+                    num_hands[sel] += 1
+
+        # Dealer draws to 17 in every lane, as in play_dealer_hand
+        dealer_cards = np.full(n, 2)
+        while True:
+            dealer_value = self.hand_value(dealer_hard, dealer_aces)
+            must_hit = dealer_value < 17
+            if self.rules.dealer_hits_soft_17:
+                must_hit |= (dealer_value == 17) & (dealer_hard != 17)
+            drawing = np.flatnonzero(must_hit)
+            if not drawing.size:
+                break
+            cards = self.draw(drawing)
+            dealer_hard[drawing] += cards
+            dealer_aces[drawing] += cards == 1
+            dealer_cards[drawing] += 1
+
+        # Resolve bets as in resolve_bets
+        dealer_value = self.hand_value(dealer_hard, dealer_aces)[:, None]
+        dealer_blackjack = (dealer_cards == 2)[:, None] & (dealer_value == 21)
+        dealer_bust = dealer_value > 21
+        value = self.hand_value(hard, aces)
+        bust = value > 21
+        blackjack = (ncards == 2) & (value == 21)
+        # A late surrender loses the whole bet to a dealer blackjack
+        forfeit = surrendered & dealer_blackjack if self.rules.surrender == 'late' else np.zeros_like(surrendered)
+        outcomes = [surrendered & ~forfeit, bust | forfeit, blackjack & ~dealer_blackjack,
+                    dealer_bust | (value > dealer_value), value == dealer_value]
+        in_play = np.arange(max_hands) < num_hands[:, None]
+        if bets is None:
+            payoff = np.select(outcomes, [-0.5 * stake, -stake, self.rules.blackjack_ratio * stake, stake, 0.0], default=-stake)
+            returns = (payoff * in_play).sum(axis=1)
+            returns += np.where(insured, np.where(dealer_blackjack[:, 0], 1.0, -0.5), 0.0)
+            return returns
+        # Whole chips, rounded as in resolve_bets and surrender
+        bet = bets[:, None]
+        wager = stake.astype(np.int64) * bet
+        numerator, denominator = self.rules.blackjack_pays
+        payoff = np.select(outcomes, [bet // 2 - bet, -wager, bet * numerator // denominator, wager, 0], default=-wager)
+        insurance = bets // 2
+        return ((payoff * in_play).sum(axis=1)
+                + np.where(insured, np.where(dealer_blackjack[:, 0], 2 * insurance, -insurance), 0))
+
+    def run(self, num_rounds: int) -> SimulationResult:
+        """
+            Simulate num_rounds rounds spread across all shoes
+        """
+        result = SimulationResult(unit_bet=self.rules.unit_bet)
+        remaining = num_rounds
+        while remaining > 0:
+            returns = self.play_round()
+            result.add(returns[:remaining])
+            remaining -= self.num_shoes
+        return result
+
+
+def simulate(ai: BlackJackAI, num_rounds: int, **kwargs) -> SimulationResult:
+    """
+        Simulate num_rounds rounds of the given AI strategy
+    """
+    return BatchSimulator(ai, **kwargs).run(num_rounds)
@@ -0,0 +1,210 @@
+from .game_engine import ACTION_CODES, BlackJackGame, CARDS, Deck, Hand, RoundRecord
+from .rules import RULE_PROFILES, SURRENDER_TYPES, RuleSet
+from array import array
+from typing import List, Optional, Tuple
+import random
+import struct
+
+# Binary game snapshot layout (little endian, version 1):
+#   header    magic 'BJGS', version
+#   rules     profile name, num_decks, H17/DAS flags, blackjack payout, max split hands, surrender
+#   game      seed, history limit, phase, current hand, chips, bet, insurance bet
+#   deck      penetration, continuous flag, shoe seed, cursor, shoe size, shoe bytes (one card
+#             code each), deck generator state
+#   hands     dealer hand, then the player hands: card codes, bet, flags, action codes
+#   history   round records, oldest first, and the current round record
+SNAPSHOT_MAGIC = b'BJGS'
+SNAPSHOT_VERSION = 1
+GAME_PHASES = ('betting', 'playing', 'dealer_turn', 'finished')
+ACTION_NAMES = {code: action for action, code in ACTION_CODES.items()}
+NO_LIMIT = 0xFFFFFFFF
+
+HEADER = struct.Struct('<4sB')
+RULES = struct.Struct('<BBBBBB')
+GAME = struct.Struct('<IBBqqq')
+DECK = struct.Struct('<dBQHH')
+HAND = struct.Struct('<BqB')
+RECORD = struct.Struct('<QHqqB')
+LENGTH = struct.Struct('<B')
+COUNT = struct.Struct('<I')
+# random.Random state: 624 state words and the position, then the cached gauss value
+RNG_STATE_WORDS = 625
+RNG_GAUSS = struct.Struct('<Bd')
+
+# Hand flags
+SPLIT, DOUBLED, SURRENDERED, INSURED = 1, 2, 4, 8
+# Round record flags
+HAS_ROUND_RECORD, ROUND_RECORD_IN_HISTORY = 1, 2
+
+
+def pack_text(text: str) -> bytes:
+    data = text.encode()
+    if len(data) > 255:
+        raise ValueError(f"Text too long for a snapshot: {text[:32]!r}...")
+    return LENGTH.pack(len(data)) + data
+
+
+def pack_hand(hand: Hand) -> bytes:
+    flags = (hand.is_split * SPLIT | hand.is_doubled * DOUBLED
+             | hand.is_surrendered * SURRENDERED | hand.is_insured * INSURED)
+    codes = bytes(card.code for card in hand.cards)
+    actions = ''.join(ACTION_CODES[action] for action in hand.actions)
+    return HAND.pack(len(codes), hand.bet, flags) + codes + pack_text(actions)
+
+
+def pack_record(record: RoundRecord) -> bytes:
+    actions = record.actions.encode()
+    return RECORD.pack(record.shoe_seed, record.cursor, record.chips, record.bet, len(actions)) + actions
+
+
+def dump_game(game: BlackJackGame, include_history: bool = False) -> bytes:
+    """
+        Serialize a game to a compact binary snapshot (about 3 KB for a six deck shoe,
+        most of it the deck generator state, which keeps later shuffles identical).
+        Only the current round record is kept unless include_history is set.
+        Listeners and the last round's hand results are not part of the snapshot.
+    """
+    if type(game) is not BlackJackGame:
+        raise TypeError(f"Only single player games can be snapshotted, got {type(game).__name__}")
+    rules, deck = game.rules, game.deck
+    seed = game.seed
+    parts = [
+        HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION),
+        pack_text(rules.name),
+        RULES.pack(rules.num_decks, rules.dealer_hits_soft_17 | rules.double_after_split << 1,
+                   *rules.blackjack_pays, rules.max_split_hands or 0, SURRENDER_TYPES.index(rules.surrender)),
+        pack_text(('i' if isinstance(seed, int) else 's') + str(seed)),
+        GAME.pack(NO_LIMIT if game.history.maxlen is None else game.history.maxlen,
+                  GAME_PHASES.index(game.game_phase), game.current_hand_index,
+                  game.player_chips, game.current_bet, game.insurance_bet),
+        DECK.pack(deck.penetration, deck.continuous, deck.shoe_seed, deck.cursor, len(deck.shoe)),
+        deck.shoe.tobytes(),
+    ]
+    version, words, gauss = deck.rng.getstate()
+    parts.append(array('I', words).tobytes())
+    parts.append(RNG_GAUSS.pack(gauss is not None, gauss or 0.0))
+    parts.append(pack_hand(game.dealer_hand))
+    parts.append(LENGTH.pack(len(game.player_hands)))
+    parts.extend(pack_hand(hand) for hand in game.player_hands)
+    # History
+    history = list(game.history) if include_history else list(game.history)[-1:]
+    record = game.round_record
+    in_history = record is not None and bool(history) and history[-1] is record
+    flags = (record is not None) * HAS_ROUND_RECORD | in_history * ROUND_RECORD_IN_HISTORY
+    parts.append(COUNT.pack(len(history)))
+    parts.extend(pack_record(entry) for entry in history)
+    parts.append(LENGTH.pack(flags))
+    if record is not None and not in_history:
+        parts.append(pack_record(record))
+    return b''.join(parts)
+
+
+class SnapshotReader:
+    """
+        Cursor over the bytes of a snapshot
+    """
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, layout: struct.Struct) -> Tuple:
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def read(self, size: int) -> bytes:
+        if self.offset + size > len(self.data):
+            raise ValueError("Truncated game snapshot")
+        data = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return data
+
+    def text(self) -> str:
+        return bytes(self.read(*self.unpack(LENGTH))).decode()
+
+    def hand(self) -> Hand:
+        num_cards, bet, flags = self.unpack(HAND)
+        hand = Hand()
+        for code in self.read(num_cards):
+            hand.add_card(CARDS[code])
+        hand.bet = bet
+        hand.is_split = bool(flags & SPLIT)
+        hand.is_doubled = bool(flags & DOUBLED)
+        hand.is_surrendered = bool(flags & SURRENDERED)
+        hand.is_insured = bool(flags & INSURED)
+        hand.actions = [ACTION_NAMES[code] for code in self.text()]
+        return hand
+
+    def record(self) -> RoundRecord:
+        shoe_seed, cursor, chips, bet, num_actions = self.unpack(RECORD)
+        return RoundRecord(shoe_seed, cursor, chips, bet, bytes(self.read(num_actions)).decode())
+
+
+def load_rules(name: str, num_decks: int, flags: int, pays: Tuple[int, int],
+               max_split_hands: int, surrender: int) -> RuleSet:
+    """
+        The named profile when the values match it, otherwise a RuleSet with these values
+    """
+    rules = RuleSet(name, num_decks=num_decks, dealer_hits_soft_17=bool(flags & 1), blackjack_pays=pays,
+                    double_after_split=bool(flags & 2), max_split_hands=max_split_hands or None,
+                    surrender=SURRENDER_TYPES[surrender])
+    profile = RULE_PROFILES.get(name)
+    if profile is not None and profile.with_decks(num_decks) == rules:
+        return profile.with_decks(num_decks)
+    return rules
+
+
+def load_game(data: bytes) -> BlackJackGame:
+    """
+        Rebuild a game from a snapshot made by dump_game
+        Raises: ValueError for data that is not a valid snapshot
+    """
+    try:
+        return read_game(SnapshotReader(data))
+    except (struct.error, IndexError, KeyError) as error:
+        raise ValueError(f"Invalid game snapshot: {error}") from None
+
+
+def read_game(reader: SnapshotReader) -> BlackJackGame:
+    magic, version = reader.unpack(HEADER)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not a game snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported game snapshot version: {version}")
+    name = reader.text()
+    num_decks, rule_flags, pays_win, pays_bet, max_split_hands, surrender = reader.unpack(RULES)
+    rules = load_rules(name, num_decks, rule_flags, (pays_win, pays_bet), max_split_hands, surrender)
+    seed = reader.text()
+    seed = int(seed[1:]) if seed[0] == 'i' else seed[1:]
+    history_limit, phase, hand_index, chips, bet, insurance_bet = reader.unpack(GAME)
+    penetration, continuous, shoe_seed, cursor, shoe_size = reader.unpack(DECK)
+    shoe = reader.read(shoe_size)
+    words = array('I')
+    words.frombytes(reader.read(RNG_STATE_WORDS * words.itemsize))
+    has_gauss, gauss = reader.unpack(RNG_GAUSS)
+    if shoe_size != num_decks * 52:
+        raise ValueError(f"Shoe of {shoe_size} cards for {num_decks} decks")
+    rng = random.Random()
+    rng.setstate((3, tuple(words), gauss if has_gauss else None))
+    deck = Deck.from_shoe(shoe, rng, shoe_seed, cursor, penetration, bool(continuous))
+    game = BlackJackGame(seed=seed, rules=rules, history_limit=None if history_limit == NO_LIMIT else history_limit,
+                         deck=deck)
+    game.game_phase = GAME_PHASES[phase]
+    game.current_hand_index = hand_index
+    game.player_chips = chips
+    game.current_bet = bet
+    game.insurance_bet = insurance_bet
+    game.dealer_hand = reader.hand()
+    game.player_hands = [reader.hand() for _ in range(*reader.unpack(LENGTH))]
+    history: List[RoundRecord] = [reader.record() for _ in range(*reader.unpack(COUNT))]
+    game.history.extend(history)
+    flags, = reader.unpack(LENGTH)
+    record: Optional[RoundRecord] = None
+    if flags & ROUND_RECORD_IN_HISTORY:
+        record = history[-1]
+    elif flags & HAS_ROUND_RECORD:
+        record = reader.record()
+    game.round_record = record
+    if reader.offset != len(reader.data):
+        raise ValueError("Trailing bytes after game snapshot")
+    return game
@@ -0,0 +1,162 @@
+from channels.db import database_sync_to_async
+from django.db.models import F
+from django.db.models.functions import Greatest
+from typing import Dict, List, Optional
+from .game_engine import BlackJackGame
+from .models import PlayerStatistics
+
+# Counters added to PlayerStatistics with F() increments
+COUNTER_FIELDS = (
+    'total_hands', 'total_wagered', 'total_won', 'net_profit',
+    'hands_won', 'hands_lost', 'hands_pushed', 'blackjacks', 'busts', 'double_wins',
+    'ai_hands_played', 'ai_hands_won',
+)
+# Best values merged with Greatest()
+BEST_FIELDS = ('biggest_win', 'biggest_loss', 'highest_chips', 'longest_win_streak', 'longest_lose_streak')
+
+
+class StatisticsDelta:
+    """
+        Pending changes to one user's PlayerStatistics, folded in memory hand by hand.
+        Counters are increments, bests are maxima over the pending hands, and the
+        streak is the absolute value after the last hand (positive = wins in a row).
+        first_run and streak_from_start describe the session's opening run, so the
+        streak stored by earlier sessions can be continued once it is known.
+    """
+    def __init__(self, current_streak: int = 0, first_run: int = 0, streak_from_start: bool = True):
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTER_FIELDS, 0)
+        self.bests: Dict[str, int] = dict.fromkeys(BEST_FIELDS, 0)
+        self.new_sessions = 0
+        self.current_streak = current_streak
+        self.first_run = first_run
+        self.streak_from_start = streak_from_start
+
+    def __bool__(self):
+        return self.counters['total_hands'] > 0
+
+    def add_hand(self, result: Dict, ai_mode: bool = False):
+        """
+            Fold one resolved hand (as produced by BlackJackGame.resolve_bets) into the delta
+        """
+        counters, bests = self.counters, self.bests
+        payout = result['payout']
+        won = result['result'] in ('win', 'blackjack')
+        lost = result['result'] in ('lose', 'surrender')
+        counters['total_hands'] += 1
+        counters['total_wagered'] += result['player_bet']
+        counters['net_profit'] += payout
+        counters['hands_won'] += won
+        counters['hands_lost'] += lost
+        counters['hands_pushed'] += result['result'] == 'push'
+        counters['blackjacks'] += result['player_blackjack']
+        counters['busts'] += result['player_bust']
+        counters['double_wins'] += won and result['was_doubled']
+        if ai_mode:
+            counters['ai_hands_played'] += 1
+            counters['ai_hands_won'] += won
+        if payout > 0:
+            counters['total_won'] += payout
+            bests['biggest_win'] = max(bests['biggest_win'], payout)
+        elif payout < 0:
+            bests['biggest_loss'] = max(bests['biggest_loss'], -payout)
+        # Pushes keep the streak going
+        if won:
+            self.update_streak(self.current_streak + 1 if self.current_streak > 0 else 1)
+        elif lost:
+            self.update_streak(self.current_streak - 1 if self.current_streak < 0 else -1)
+
+    def update_streak(self, streak: int):
+        if (streak > 0) != (self.current_streak > 0) and self.current_streak:
+            self.streak_from_start = False
+        self.current_streak = streak
+        if self.streak_from_start:
+            self.first_run = streak
+        self.record_streak(streak)
+
+    def record_streak(self, streak: int):
+        if streak > 0:
+            self.bests['longest_win_streak'] = max(self.bests['longest_win_streak'], streak)
+        else:
+            self.bests['longest_lose_streak'] = max(self.bests['longest_lose_streak'], -streak)
+
+    def add_round(self, results: List[Dict], chips: int, ai_mode: bool = False):
+        """
+            Fold every hand of a resolved round, plus the bankroll after it
+        """
+        for result in results:
+            self.add_hand(result, ai_mode)
+        self.bests['highest_chips'] = max(self.bests['highest_chips'], chips)
+
+    def continue_streak(self, stored_streak: int):
+        """
+            Continue the streak stored by earlier sessions into the session's opening run
+        """
+        if not stored_streak or (self.first_run and (self.first_run > 0) != (stored_streak > 0)):
+            return
+        opening_run = stored_streak + self.first_run
+        self.record_streak(opening_run)
+        if self.streak_from_start:
+            self.current_streak = self.first_run = opening_run
+
+    def as_update(self) -> Dict:
+        """
+            Keyword arguments for a single atomic QuerySet.update()
+        """
+        update = {field: F(field) + value for field, value in self.counters.items() if value}
+        update.update({field: Greatest(F(field), value) for field, value in self.bests.items() if value})
+        if self.new_sessions:
+            update['total_sessions'] = F('total_sessions') + self.new_sessions
+        update['current_streak'] = self.current_streak
+        return update
+
+
+class StatisticsAggregator:
+    """
+        Keeps a user's PlayerStatistics up to date incrementally.
+        Rounds are folded into an in-memory StatisticsDelta (O(1) per hand), and each
+        flush applies the whole batch with one UPDATE of F() and Greatest() expressions.
+        The stored row is read once, on the first flush: its counters become the baseline
+        for this session (e.g. for lifetime achievements) and its streak is continued in memory.
+    """
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.delta = StatisticsDelta()
+        self.delta.new_sessions = 1
+        self.baseline: Optional[Dict[str, int]] = None
+
+    def record_round(self, game: BlackJackGame, ai_mode: bool = False):
+        self.delta.add_round(game.hand_results, game.player_chips, ai_mode)
+
+    def take_delta(self) -> StatisticsDelta:
+        """
+            Detach the pending delta, carrying the streak over to a fresh one
+        """
+        delta = self.delta
+        self.delta = StatisticsDelta(delta.current_streak, delta.first_run, delta.streak_from_start)
+        return delta
+
+    def apply(self, delta: StatisticsDelta) -> Optional[Dict[str, int]]:
+        """
+            Write a delta to the database
+            Returns: the stored counters and streak before the first write, otherwise None
+        """
+        baseline = None
+        if self.baseline is None:
+            stats, _ = PlayerStatistics.objects.get_or_create(user_id=self.user_id)
+            baseline = {field: getattr(stats, field) for field in COUNTER_FIELDS + ('current_streak',)}
+            delta.continue_streak(stats.current_streak)
+        PlayerStatistics.objects.filter(user_id=self.user_id).update(**delta.as_update())
+        return baseline
+
+    async def flush(self):
+        """
+            Apply the pending delta off the event loop
+        """
+        if not self.delta:
+            return
+        delta = self.take_delta()
+        baseline = await database_sync_to_async(self.apply)(delta)
+        if baseline is not None:
+            # Rounds recorded during the first write continue the stored streak as well
+            self.baseline = baseline
+            self.delta.continue_streak(baseline['current_streak'])
@@ -0,0 +1,297 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import asyncio
+import sqlite3
+import threading
+import time
+
+
+class VersionConflict(Exception):
+    """
+        A game was saved from an outdated version (someone else saved it since it was loaded)
+    """
+    def __init__(self, key: str, expected: int, actual: int):
+        super().__init__(f"Game {key} is at version {actual}, not {expected}")
+        self.key = key
+        self.expected = expected
+        self.actual = actual
+
+
+class StoredGame:
+    """
+        Game snapshot (bytes) and the version it was saved as
+    """
+    __slots__ = ('data', 'version')
+
+    def __init__(self, data: bytes, version: int):
+        self.data = data
+        self.version = version
+
+
+class GameStore:
+    """
+        Game state store interface, with optimistic versioning: every save passes the version
+        it was based on (0 for a new game) and returns the new version, and a save based on
+        an outdated version raises VersionConflict instead of overwriting.
+        Games not saved for ttl seconds expire (never with ttl None).
+    """
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+
+    async def load(self, key: str) -> Optional[StoredGame]:
+        raise NotImplementedError
+
+    async def version(self, key: str) -> int:
+        """
+            Current version of a game (0 if there is none)
+        """
+        stored = await self.load(key)
+        return stored.version if stored else 0
+
+    async def save(self, key: str, data: bytes, version: int) -> int:
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+
+class MemoryGameStore(GameStore):
+    """
+        Games kept in this process only, at most max_entries of them (None for no limit).
+        Games are kept in the order they were saved, which is also their expiry order, so
+        each save drops the expired games from the front and then the oldest over the limit.
+    """
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = 10000):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self.games: 'OrderedDict[str, Tuple[StoredGame, float]]' = OrderedDict()  # game and expiry time
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, key: str) -> Optional[StoredGame]:
+        entry = self.games.get(key)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self.games[key]
+            self.expired += 1
+            return None
+        return entry[0]
+
+    def sweep(self):
+        """
+            Remove the expired games, and the oldest saved ones beyond max_entries
+        """
+        games, now = self.games, time.monotonic()
+        while games and next(iter(games.values()))[1] < now:
+            games.popitem(last=False)
+            self.expired += 1
+        if self.max_entries is not None:
+            while len(games) > self.max_entries:
+                games.popitem(last=False)
+                self.evicted += 1
+
+    async def load(self, key: str) -> Optional[StoredGame]:
+        return self.get(key)
+
+    async def save(self, key: str, data: bytes, version: int) -> int:
+        stored = self.get(key)
+        current = stored.version if stored else 0
+        if current != version:
+            raise VersionConflict(key, version, current)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float('inf')
+        self.games[key] = (StoredGame(data, version + 1), expires)
+        self.games.move_to_end(key)
+        self.sweep()
+        return version + 1
+
+    async def delete(self, key: str):
+        self.games.pop(key, None)
+
+
+class SQLiteGameStore(GameStore):
+    """
+        Games in an SQLite database, shared by the worker processes of one host.
+        Queries run in a thread, one at a time per store.
+    """
+    def __init__(self, path: str = 'games.sqlite3', ttl: Optional[float] = None):
+        super().__init__(ttl)
+        self.path = str(path)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS game_state ('
+            'key TEXT PRIMARY KEY, data BLOB NOT NULL, version INTEGER NOT NULL, expires REAL)'
+        )
+
+    def expiry(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl is not None else None
+
+    def load_sync(self, key: str) -> Optional[StoredGame]:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT data, version FROM game_state WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+        return StoredGame(bytes(row[0]), row[1]) if row else None
+
+    def save_sync(self, key: str, data: bytes, version: int) -> int:
+        now = time.time()
+        with self.lock:
+            connection = self.connection
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                if version == 0:
+                    connection.execute('DELETE FROM game_state WHERE key = ? AND expires <= ?', (key, now))
+                    cursor = connection.execute(
+                        'INSERT OR IGNORE INTO game_state (key, data, version, expires) VALUES (?, ?, 1, ?)',
+                        (key, data, self.expiry())
+                    )
+                else:
+                    cursor = connection.execute(
+                        'UPDATE game_state SET data = ?, version = version + 1, expires = ? '
+                        'WHERE key = ? AND version = ? AND (expires IS NULL OR expires > ?)',
+                        (data, self.expiry(), key, version, now)
+                    )
+                if cursor.rowcount != 1:
+                    row = connection.execute(
+                        'SELECT version FROM game_state WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+                    ).fetchone()
+                    connection.execute('ROLLBACK')
+                    raise VersionConflict(key, version, row[0] if row else 0)
+                connection.execute('COMMIT')
+            except sqlite3.Error:
+                connection.execute('ROLLBACK')
+                raise
+        return version + 1
+
+    def delete_sync(self, key: str):
+        with self.lock:
+            self.connection.execute('DELETE FROM game_state WHERE key = ?', (key,))
+
+    async def load(self, key: str) -> Optional[StoredGame]:
+        return await asyncio.to_thread(self.load_sync, key)
+
+    async def save(self, key: str, data: bytes, version: int) -> int:
+        return await asyncio.to_thread(self.save_sync, key, data, version)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.delete_sync, key)
+
+
+class RedisGameStore(GameStore):
+    """
+        Games in Redis, shared by every worker. Each game is a hash of its data and version,
+        and saves are compare-and-set in a Lua script.
+        Needs the redis package (redis.asyncio) unless a client is given.
+    """
+    SAVE_SCRIPT = """
+        local current = tonumber(redis.call('HGET', KEYS[1], 'version') or '0')
+        if current ~= tonumber(ARGV[2]) then
+            return -current - 1
+        end
+        redis.call('HSET', KEYS[1], 'data', ARGV[1], 'version', current + 1)
+        if tonumber(ARGV[3]) > 0 then
+            redis.call('PEXPIRE', KEYS[1], ARGV[3])
+        end
+        return current + 1
+    """
+
+    def __init__(self,
+                 url: str = 'redis://127.0.0.1:6379/0',
+                 prefix: str = 'game-state:',
+                 ttl: Optional[float] = None,
+                 client=None):
+        super().__init__(ttl)
+        if client is None:
+            import redis.asyncio
+            client = redis.asyncio.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.save_script = client.register_script(self.SAVE_SCRIPT)
+
+    async def load(self, key: str) -> Optional[StoredGame]:
+        data, version = await self.client.hmget(self.prefix + key, 'data', 'version')
+        return StoredGame(data, int(version)) if data is not None else None
+
+    async def version(self, key: str) -> int:
+        version = await self.client.hget(self.prefix + key, 'version')
+        return int(version) if version is not None else 0
+
+    async def save(self, key: str, data: bytes, version: int) -> int:
+        ttl = int(self.ttl * 1000) if self.ttl is not None else 0
+        result = await self.save_script(keys=[self.prefix + key], args=[data, version, ttl])
+        if result < 0:
+            raise VersionConflict(key, version, -result - 1)
+        return result
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+
+class CachedGameStore(GameStore):
+    """
+        Local cache in front of a shared store. Loads only fetch the data when the shared
+        version differs from the cached one; saves go through to the shared store.
+        Holds the max_entries most recently used games.
+    """
+    def __init__(self, backend: GameStore, max_entries: int = 1024):
+        super().__init__(backend.ttl)
+        self.backend = backend
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[str, StoredGame]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def remember(self, key: str, stored: StoredGame):
+        self.entries[key] = stored
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def load(self, key: str) -> Optional[StoredGame]:
+        cached = self.entries.get(key)
+        if cached is not None and await self.backend.version(key) == cached.version:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return cached
+        self.misses += 1
+        stored = await self.backend.load(key)
+        if stored is None:
+            self.entries.pop(key, None)
+        else:
+            self.remember(key, stored)
+        return stored
+
+    async def version(self, key: str) -> int:
+        return await self.backend.version(key)
+
+    async def save(self, key: str, data: bytes, version: int) -> int:
+        try:
+            version = await self.backend.save(key, data, version)
+        except VersionConflict:
+            self.entries.pop(key, None)
+            raise
+        self.remember(key, StoredGame(data, version))
+        return version
+
+    async def delete(self, key: str):
+        self.entries.pop(key, None)
+        await self.backend.delete(key)
+
+
+@lru_cache(maxsize=None)
+def get_game_store() -> GameStore:
+    """
+        The store configured by settings.GAME_STORE (BACKEND class path, OPTIONS, LOCAL_CACHE
+        entries in front of it); games are kept in memory if it is not set
+    """
+    config = getattr(settings, 'GAME_STORE', {})
+    store = import_string(config.get('BACKEND', 'game.store.MemoryGameStore'))(**config.get('OPTIONS', {}))
+    if config.get('LOCAL_CACHE'):
+        store = CachedGameStore(store, config['LOCAL_CACHE'])
+    return store
@@ -0,0 +1,271 @@
+from .game_engine import Hand, Card, Suit, Rank
+from .expected_value import solver_for, full_shoe
+from .rules import DEFAULT_RULES, RULE_PROFILES, RuleSet
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+import argparse
+import json
+
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+DEFAULT_CHART = DATA_DIR / 'basic_strategy.json'
+WIN_RATES_FILE = DATA_DIR / 'strategy_win_rates.json'
+STRATEGY_TABLES_DIR = DATA_DIR / 'strategy_tables'
+
+# Chart columns are dealer up cards 2-10 and Ace (value 11)
+UPCARDS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'A']
+PAIR_LABELS = {'A': 11, **{str(value): value for value in range(2, 11)}}
+
+# Chart codes resolved to an action, given (can_double, can_surrender)
+CHART_CODES = {
+    'H': lambda can_double, can_surrender: 'hit',
+    'S': lambda can_double, can_surrender: 'stand',
+    'D': lambda can_double, can_surrender: 'double' if can_double else 'hit',
+    'Ds': lambda can_double, can_surrender: 'double' if can_double else 'stand',
+    'Rh': lambda can_double, can_surrender: 'surrender' if can_surrender else 'hit',
+    'Rs': lambda can_double, can_surrender: 'surrender' if can_surrender else 'stand',
+}
+PAIR_CODES = {'P', '-', 'Rp'}
+
+# Card ranks used to build representative hands (by blackjack value, Ace = 1)
+VALUE_RANKS = {
+    1: Rank.ACE, 2: Rank.TWO, 3: Rank.THREE, 4: Rank.FOUR, 5: Rank.FIVE,
+    6: Rank.SIX, 7: Rank.SEVEN, 8: Rank.EIGHT, 9: Rank.NINE, 10: Rank.TEN,
+}
+
+
+def make_hand(values: List[int]) -> Hand:
+    hand = Hand()
+    for value in values:
+        hand.add_card(Card(Suit.SPADES, VALUE_RANKS[value]))
+    return hand
+
+def hard_total_values(total: int) -> List[int]:
+    """
+        Representative non-pair cards without an Ace for a hard total
+    """
+    for first in range(10, 1, -1):
+        second = total - first
+        if 2 <= second <= 10 and second != first:
+            return [first, second]
+    # 20 and 21 can only be reached as non-pairs with three cards
+    for first in range(10, 1, -1):
+        for second in range(first - 1, 1, -1):
+            third = total - first - second
+            if 2 <= third <= 10:
+                return [first, second, third]
+    return [2, total - 2]
+
+
+class StrategyTable:
+    """
+        Basic strategy chart compiled into lookup tables.
+        Hard, soft and pair tables are indexed by [hand total or pair card value][dealer up card value],
+        with one fully resolved set of tables for every combination of
+        can_double / can_split / can_surrender, so a decision is a constant-time lookup.
+    """
+    def __init__(self, chart: Dict):
+        self.name = chart.get('name', 'custom')
+        self.description = chart.get('description', '')
+        hard = self.parse_rows(chart['hard'], 'hard')
+        soft = self.parse_rows(chart['soft'], 'soft')
+        pairs = self.parse_rows(chart['pairs'], 'pairs')
+        self.tables = [
+            self.compile(hard, soft, pairs, bool(flags & 4), bool(flags & 2), bool(flags & 1))
+            for flags in range(8)
+        ]
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'StrategyTable':
+        """
+            Load a strategy chart from a JSON data file
+        """
+        with open(path) as chart_file:
+            return cls(json.load(chart_file))
+
+    @staticmethod
+    def parse_rows(rows: Dict[str, str], section: str) -> Dict[int, List[str]]:
+        """
+            Parse chart rows ("S S Rh ...") keyed by hand total or pair card
+        """
+        parsed = {}
+        for key, row in rows.items():
+            codes = row.split()
+            if len(codes) != len(UPCARDS):
+                raise ValueError(f"{section} row {key} must have {len(UPCARDS)} columns")
+            valid = PAIR_CODES if section == 'pairs' else CHART_CODES
+            for code in codes:
+                if code not in valid:
+                    raise ValueError(f"Unknown code '{code}' in {section} row {key}")
+            parsed[PAIR_LABELS[key] if section == 'pairs' else int(key)] = codes
+        return parsed
+
+    @staticmethod
+    def compile(hard: Dict[int, List[str]],
+                soft: Dict[int, List[str]],
+                pairs: Dict[int, List[str]],
+                can_double: bool, can_split: bool, can_surrender: bool):
+        """
+            Resolve chart codes for one combination of allowed actions
+        """
+        def resolve_totals(rows, total):
+            if total not in rows:
+                # Totals missing from the chart: hit low totals, stand on 17+
+                return ['stand' if total >= 17 else 'hit'] * 12
+            return [None, None] + [CHART_CODES[code](can_double, can_surrender) for code in rows[total]]
+
+        hard_table = [resolve_totals(hard, total) for total in range(22)]
+        soft_table = [resolve_totals(soft, total) for total in range(22)]
+        pair_table = [None] * 12
+        for value in range(2, 12):
+            # Unsplit pairs are played by their total (A-A is a soft 12)
+            fallback = soft_table[12] if value == 11 else hard_table[value * 2]
+            codes = pairs.get(value, ['-'] * len(UPCARDS))
+            row = [None, None]
+            for code, otherwise in zip(codes, fallback[2:]):
+                if code == 'Rp' and can_surrender:
+                    row.append('surrender')
+                elif code in ('P', 'Rp') and can_split:
+                    row.append('split')
+                else:
+                    row.append(otherwise)
+            pair_table[value] = row
+        return hard_table, soft_table, pair_table
+
+    def action(self,
+               player_hand: Hand,
+               dealer_up_card: Card,
+               can_double: bool, can_split: bool, can_surrender: bool) -> str:
+        """
+            Look up the chart action for a hand
+        """
+        flags = (4 if can_double else 0) + (2 if can_split else 0) + (1 if can_surrender else 0)
+        hard_table, soft_table, pair_table = self.tables[flags]
+        dealer_value = dealer_up_card.value()
+        if player_hand.can_split():
+            return pair_table[player_hand.cards[0].value()][dealer_value]
+        if player_hand.is_soft():
+            return soft_table[player_hand.value()][dealer_value]
+        return hard_table[min(player_hand.value(), 21)][dealer_value]
+
+
+@lru_cache(maxsize=None)
+def load_strategy_table(path: Union[str, Path] = DEFAULT_CHART) -> StrategyTable:
+    """
+        Load (once) and return the strategy table for a chart file
+    """
+    return StrategyTable.load(path)
+
+
+@lru_cache(maxsize=None)
+def load_equivalent_win_rates(path: Union[str, Path] = WIN_RATES_FILE) -> Dict[str, float]:
+    """
+        Load (once) the equivalent win rate (1 + EV) / 2 of each strategy from a tournament
+        report, or an empty mapping if no report has been generated
+    """
+    try:
+        with open(path) as rates_file:
+            report = json.load(rates_file)
+    except FileNotFoundError:
+        return {}
+    return {name: stats['equivalent_win_rate'] for name, stats in report['strategies'].items()}
+
+
+# -----------------------------
+#    CHARTS PER RULE PROFILE
+# -----------------------------
+def chart_code(values: Dict[str, float]) -> str:
+    """
+        Chart code for the action values of a two-card hand (without splitting)
+    """
+    hit_first = values['hit'] > values['stand']
+    best = max(values, key=values.get)
+    if best == 'double':
+        return 'D' if hit_first else 'Ds'
+    if best == 'surrender':
+        return 'Rh' if hit_first else 'Rs'
+    return 'H' if hit_first else 'S'
+
+def pair_code(values: Dict[str, float]) -> str:
+    best = max(values, key=values.get)
+    if best == 'split':
+        return 'P'
+    if best == 'surrender' and values['split'] >= max(value for action, value in values.items() if action != 'surrender'):
+        return 'Rp'
+    return '-'
+
+def derive_chart(rules: RuleSet) -> Dict:
+    """
+        Basic strategy chart for a rule set: the highest expected value action of a
+        representative hand against every up card, from a full shoe
+    """
+    solver = solver_for(rules)
+    can_surrender = rules.surrender != 'none'
+    up_values = list(range(2, 11)) + [1]
+
+    def row(values: List[int], code, can_split: bool = False) -> str:
+        hand = make_hand(values)
+        codes = []
+        for up_value in up_values:
+            up_card = Card(Suit.HEARTS, VALUE_RANKS[up_value])
+            composition = full_shoe(rules.num_decks, exclude=tuple(hand.cards) + (up_card,))
+            codes.append(code(solver.action_values(hand, up_card, composition, True, can_split, can_surrender)))
+        return ' '.join(f"{code:<2}" for code in codes).rstrip()
+
+    return {
+        'name': rules.key,
+        'description': f"Basic strategy derived for {rules.name}: {rules.description}",
+        'upcards': UPCARDS,
+        'hard': {str(total): row(hard_total_values(total), chart_code) for total in range(4, 22)},
+        'soft': {str(total): row([1, total - 11] if total > 12 else [1, 1], chart_code) for total in range(12, 22)},
+        'pairs': {label: row([value if value < 11 else 1] * 2, pair_code, can_split=True)
+                  for label, value in PAIR_LABELS.items()},
+    }
+
+def strategy_chart_path(rules: RuleSet) -> Path:
+    return STRATEGY_TABLES_DIR / f"{rules.key}.json"
+
+def write_chart(chart: Dict, path: Union[str, Path]):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as chart_file:
+        json.dump(chart, chart_file, indent=2)
+        chart_file.write('\n')
+
+
+@lru_cache(maxsize=None)
+def strategy_table_for(rules: RuleSet = DEFAULT_RULES) -> StrategyTable:
+    """
+        Strategy table for a rule set. The default rules use the shipped chart (at any
+        deck count); other rule sets load their derived chart, deriving and caching it
+        to disk the first time it is needed.
+    """
+    if rules.with_decks(DEFAULT_RULES.num_decks) == DEFAULT_RULES:
+        return load_strategy_table()
+    path = strategy_chart_path(rules)
+    if not path.exists():
+        chart = derive_chart(rules)
+        try:
+            write_chart(chart, path)
+        except OSError:
+            return StrategyTable(chart)     # read-only install: keep the chart in memory only
+    return load_strategy_table(path)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description='Derive and cache the strategy chart of every rule profile')
+    parser.add_argument('profiles', nargs='*', default=list(RULE_PROFILES))
+    parser.add_argument('--force', action='store_true', help='derive charts that are already cached')
+    args = parser.parse_args(argv)
+    for name in args.profiles:
+        rules = RULE_PROFILES[name]
+        if rules == DEFAULT_RULES:
+            continue
+        path = strategy_chart_path(rules)
+        if args.force or not path.exists():
+            write_chart(derive_chart(rules), path)
+        print(f"{name}: {path}")
+
+
+if __name__ == '__main__':
+    main()
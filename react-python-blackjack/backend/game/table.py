@@ -0,0 +1,224 @@
+from .game_engine import BlackJackGame, Card, Deck, Hand
+from .rules import RuleSet, get_rules
+from typing import Callable, Dict, List, Optional, Union
+import random
+import secrets
+
+MAX_SEATS = 7
+
+
+class TableSeat(BlackJackGame):
+    """
+        One player at a BlackJackTable: a BlackJackGame with its own chips, bets and hands,
+        dealt from the table's shoe and settled against the table's dealer hand.
+        Phases: betting, waiting (dealt, another seat is playing), playing, dealer_turn, finished
+    """
+    def __init__(self, table: 'BlackJackTable', seat_index: int, player_name: str, chips: int = 1000):
+        self.table = table      # set first: the dealer hand below belongs to the table
+        super().__init__(rules=table.rules, seed=0, history_limit=0, deck=table.deck)
+        self.seat_index = seat_index
+        self.player_name = player_name
+        self.player_chips = chips
+        self.card_listeners = table.card_listeners     # cards are shown to the whole table
+
+    @property
+    def dealer_hand(self) -> Hand:
+        return self.table.dealer_hand
+
+    @dealer_hand.setter
+    def dealer_hand(self, hand: Hand):
+        pass    # the table deals and resets the dealer hand
+
+    def place_bet(self, amount: int) -> bool:
+        """
+            Place this round's bet (once, while the table is taking bets)
+        """
+        if self.table.game_phase != 'betting' or self.current_bet:
+            return False
+        return super().place_bet(amount)
+
+    def start_round(self):
+        """
+            Rounds are dealt by the table, to every seat with a bet
+        """
+        return self.table.start_round()
+
+    def deal_hand(self):
+        """
+            Start this seat's hand for a round the table is dealing
+        """
+        hand = Hand()
+        hand.bet = self.current_bet
+        self.player_hands = [hand]
+        self.current_hand_index = 0
+        self.game_phase = 'waiting'
+
+    def move_to_next_hand(self):
+        """
+            Move to the next hand, or pass the turn once every hand is played
+        """
+        self.current_hand_index += 1
+        if self.current_hand_index >= len(self.player_hands):
+            self.game_phase = 'dealer_turn'
+            self.table.next_turn()
+
+    def to_dict(self):
+        return {
+            'seat': self.seat_index,
+            'player_name': self.player_name,
+            'player_hands': [hand.to_dict() for hand in self.player_hands],
+            'current_hand_index': self.current_hand_index,
+            'game_phase': self.game_phase,
+            'player_chips': self.player_chips,
+            'current_bet': self.current_bet,
+            'insurance_bet': self.insurance_bet,
+        }
+
+
+class BlackJackTable:
+    """
+        Up to max_seats players sharing one shoe and one dealer.
+        - Every seat with a bet is dealt into the round, a card at a time in seat order
+          and then the dealer, as at a casino table
+        - Seats play their hands in turn; the dealer plays once when the last seat is done,
+          and every seat's bets are settled against that hand
+        - Card listeners see every card shown at the table (e.g. a shared card count)
+    """
+    def __init__(self,
+                 table_id: str = 'default',
+                 rules: Union[str, RuleSet, None] = None,
+                 seed: Optional[Union[int, str]] = None,
+                 penetration: float = 0.75,
+                 max_seats: int = MAX_SEATS):
+        self.table_id = table_id
+        self.rules = get_rules(rules)
+        self.seed = seed if seed is not None else secrets.randbits(64)
+        self.deck = Deck(self.rules.num_decks, rng=random.Random(self.seed), penetration=penetration)
+        self.dealer_hand = Hand()
+        self.seats: List[Optional[TableSeat]] = [None] * max_seats
+        self.game_phase = 'betting'     # betting, playing, dealer_turn, finished
+        self.turn: Optional[int] = None     # index of the seat playing
+        self.card_listeners: List[Callable[[Card], None]] = []
+
+    def add_card_listener(self, listener: Callable[[Card], None]):
+        """
+            Register a callback invoked with every card as it becomes visible at the table
+        """
+        self.card_listeners.append(listener)
+
+    def deal_visible(self) -> Card:
+        card = self.deck.deal()
+        for listener in self.card_listeners:
+            listener(card)
+        return card
+
+    def players(self) -> List[TableSeat]:
+        return [seat for seat in self.seats if seat is not None]
+
+    def is_empty(self) -> bool:
+        return all(seat is None for seat in self.seats)
+
+    def join(self, player_name: str, chips: int = 1000) -> Optional[TableSeat]:
+        """
+            Take the first free seat (None when the table is full)
+        """
+        for index, seat in enumerate(self.seats):
+            if seat is None:
+                self.seats[index] = TableSeat(self, index, player_name, chips)
+                return self.seats[index]
+        return None
+
+    def leave(self, seat: TableSeat):
+        """
+            Free a seat; its hands in a round being played are forfeited
+        """
+        if self.seats[seat.seat_index] is not seat:
+            return
+        self.seats[seat.seat_index] = None
+        if self.turn == seat.seat_index:
+            self.next_turn()
+
+    def start_round(self) -> bool:
+        """
+            Deal a round to every seat with a bet
+        """
+        players = [seat for seat in self.players() if seat.current_bet > 0]
+        if self.game_phase != 'betting' or not players:
+            return False
+        self.dealer_hand = Hand()
+        self.deck.prepare_round()
+        for seat in players:
+            seat.deal_hand()
+        for seat in players:
+            seat.player_hands[0].add_card(self.deal_visible())
+        self.dealer_hand.add_card(self.deck.deal())     # hole card, hidden until the dealer plays
+        for seat in players:
+            seat.player_hands[0].add_card(self.deal_visible())
+        self.dealer_hand.add_card(self.deal_visible())
+        # A natural has nothing left to play
+        for seat in players:
+            if seat.player_hands[0].is_blackjack():
+                seat.game_phase = 'dealer_turn'
+        self.game_phase = 'playing'
+        self.turn = -1
+        self.next_turn()
+        return True
+
+    def next_turn(self):
+        """
+            Pass the turn to the next seat with a hand to play, or to the dealer
+        """
+        for index in range(self.turn + 1, len(self.seats)):
+            seat = self.seats[index]
+            if seat is not None and seat.game_phase == 'waiting':
+                self.turn = index
+                seat.game_phase = 'playing'
+                return
+        self.turn = None
+        self.play_dealer_hand()
+
+    def dealer_must_hit(self) -> bool:
+        value = self.dealer_hand.value()
+        return value < 17 or (value == 17 and self.rules.dealer_hits_soft_17 and self.dealer_hand.is_soft())
+
+    def play_dealer_hand(self):
+        """
+            Dealer plays once for the whole table, then every dealt seat is settled
+        """
+        self.game_phase = 'dealer_turn'
+        # Reveal the hole card
+        for listener in self.card_listeners:
+            listener(self.dealer_hand.cards[0])
+        while self.dealer_must_hit():
+            self.dealer_hand.add_card(self.deal_visible())
+        self.game_phase = 'finished'
+        for seat in self.players():
+            if seat.player_hands:
+                seat.game_phase = 'finished'
+                seat.resolve_bets()
+
+    def reset_round(self) -> bool:
+        """
+            Clear a finished round and take bets for the next one
+        """
+        if self.game_phase != 'finished':
+            return False
+        self.dealer_hand = Hand()
+        for seat in self.players():
+            seat.reset_round()
+        self.game_phase = 'betting'
+        return True
+
+    def get_state(self) -> Dict:
+        """
+            Get dictionary with the table state, the same for every seat
+        """
+        return {
+            'table_id': self.table_id,
+            'rules': self.rules.name,
+            'game_phase': self.game_phase,
+            'turn': self.turn,
+            'dealer_hand': self.dealer_hand.to_dict(hide_first=self.game_phase in ['betting', 'playing']),
+            'deck_remaining': self.deck.remaining(),
+            'seats': [seat.to_dict() if seat is not None else None for seat in self.seats],
+        }
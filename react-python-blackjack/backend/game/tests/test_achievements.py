@@ -0,0 +1,136 @@
+from game.achievements import ACHIEVEMENTS, AchievementTracker
+from game.game_engine import BlackJackGame
+from game.statistics import StatisticsAggregator
+import pytest
+
+
+def hand(result, bet=10, blackjack=False, doubled=False):
+    return {
+        'result': result,
+        'player_bet': bet,
+        'player_blackjack': blackjack,
+        'was_doubled': doubled,
+    }
+
+
+def play(tracker, *results, chips=1000, ai_mode=False):
+    game = BlackJackGame(seed=1)
+    game.player_chips = chips
+    for result in results:
+        game.hand_results = [result]
+        tracker.record_round(game, ai_mode=ai_mode)
+
+
+def pending_names(tracker):
+    return [rule.name for rule in tracker.pending]
+
+
+class TestAchievementRules:
+    """
+        Test threshold crossings
+    """
+    def test_rules_cover_model_examples(self):
+        assert len(ACHIEVEMENTS) == 7
+        assert len({rule.name for rule in ACHIEVEMENTS}) == 7
+
+    def test_first_win(self):
+        tracker = AchievementTracker(user_id=1)
+        play(tracker, hand('lose'))
+        assert tracker.pending == []
+        play(tracker, hand('win'))
+        assert pending_names(tracker) == ['First Win']
+
+    def test_fires_once(self):
+        tracker = AchievementTracker(user_id=1)
+        play(tracker, hand('win'), hand('win'))
+        assert pending_names(tracker) == ['First Win']
+
+    def test_lucky_streak_survives_pushes(self):
+        tracker = AchievementTracker(user_id=1)
+        play(tracker, *[hand('win')] * 2, hand('push'), *[hand('win')] * 2)
+        assert 'Lucky Streak' not in pending_names(tracker)
+        play(tracker, hand('win'))
+        assert 'Lucky Streak' in pending_names(tracker)
+
+    def test_lucky_streak_resets_on_loss(self):
+        tracker = AchievementTracker(user_id=1)
+        play(tracker, *[hand('win')] * 4, hand('surrender'), *[hand('win')] * 4)
+        assert 'Lucky Streak' not in pending_names(tracker)
+
+    def test_high_roller(self):
+        tracker = AchievementTracker(user_id=1)
+        play(tracker, hand('lose', bet=500))
+        assert pending_names(tracker) == ['High Roller']
+
+    def test_card_counter_needs_ai(self):
+        tracker = AchievementTracker(user_id=1)
+        play(tracker, *[hand('win')] * 100)
+        assert 'Card Counter' not in pending_names(tracker)
+        play(tracker, *[hand('win')] * 100, ai_mode=True)
+        assert 'Card Counter' in pending_names(tracker)
+
+    def test_risk_taker(self):
+        tracker = AchievementTracker(user_id=1)
+        play(tracker, *[hand('win', doubled=True)] * 19, hand('lose', doubled=True))
+        assert 'Risk Taker' not in pending_names(tracker)
+        play(tracker, hand('win', doubled=True))
+        assert 'Risk Taker' in pending_names(tracker)
+
+    def test_survivor_resets_when_broke(self):
+        tracker = AchievementTracker(user_id=1)
+        play(tracker, *[hand('lose')] * 99)
+        play(tracker, hand('lose'), chips=0)
+        assert 'Survivor' not in pending_names(tracker)
+        play(tracker, *[hand('push')] * 100)
+        assert 'Survivor' in pending_names(tracker)
+
+    def test_lifetime_totals_use_stored_statistics(self):
+        statistics = StatisticsAggregator(user_id=1)
+        tracker = AchievementTracker(user_id=1, statistics=statistics)
+        play(tracker, hand('win', blackjack=True))
+        assert 'Blackjack Master' not in pending_names(tracker)
+        statistics.baseline = {'blackjacks': 9, 'hands_won': 9}
+        tracker.check()
+        assert 'Blackjack Master' in pending_names(tracker)
+
+    def test_risk_taker_counts_stored_double_wins(self):
+        statistics = StatisticsAggregator(user_id=1)
+        tracker = AchievementTracker(user_id=1, statistics=statistics)
+        statistics.baseline = {'double_wins': 19, 'current_streak': 0}
+        play(tracker, hand('win', doubled=True))
+        assert 'Risk Taker' in pending_names(tracker)
+
+    def test_lucky_streak_continues_stored_streak(self):
+        statistics = StatisticsAggregator(user_id=1)
+        tracker = AchievementTracker(user_id=1, statistics=statistics)
+        play(tracker, hand('win'), hand('push'), hand('win'))
+        statistics.baseline = {'current_streak': 3}
+        tracker.check()
+        assert 'Lucky Streak' in pending_names(tracker)
+
+    def test_stored_streak_ends_at_first_loss(self):
+        statistics = StatisticsAggregator(user_id=1)
+        tracker = AchievementTracker(user_id=1, statistics=statistics)
+        play(tracker, hand('win'), hand('lose'), hand('win'), hand('win'))
+        statistics.baseline = {'current_streak': 3}
+        tracker.check()
+        assert 'Lucky Streak' not in pending_names(tracker)
+        statistics.baseline = {'current_streak': 4}
+        tracker.check()
+        assert 'Lucky Streak' in pending_names(tracker)   # 4 stored wins and the opening win
+
+
+@pytest.mark.asyncio
+class TestAchievementFlush:
+    """
+        Test batched unlock writes
+    """
+    async def test_one_bulk_insert_per_flush(self, monkeypatch):
+        tracker = AchievementTracker(user_id=1)
+        writes = []
+        monkeypatch.setattr(tracker, 'write', lambda rules: writes.append([rule.name for rule in rules]))
+        play(tracker, hand('win', bet=500))
+        await tracker.flush()
+        await tracker.flush()
+        assert writes == [['First Win', 'High Roller']]
+        assert tracker.pending == []
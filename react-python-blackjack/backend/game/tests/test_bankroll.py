@@ -0,0 +1,87 @@
+from game.ai_agent import BlackJackAI
+from game.bankroll import BankrollSimulator, compile_bet_spread, SPREAD_COUNTS
+from game.kelly import EdgeTable, KellyBetSizer, MIN_BIN_ROUNDS
+from game.simulator import BatchSimulator
+import numpy as np
+import pytest
+
+
+class TestChipSettlement:
+    """
+        Test whole-chip rounds in the batch simulator
+    """
+    def test_matches_unit_returns_with_deep_bankroll(self):
+        units = BatchSimulator(BlackJackAI(strategy='basic'), num_shoes=3000, seed=5)
+        chips = BatchSimulator(BlackJackAI(strategy='basic'), num_shoes=3000, seed=5)
+        bets = np.full(3000, 2, dtype=np.int64)
+        for _ in range(5):
+            expected = units.play_round() * 2
+            assert np.array_equal(chips.play_round(bets, np.full(3000, 10 ** 6, dtype=np.int64)), expected)
+
+    def test_rounds_odd_bets_like_the_engine(self):
+        simulator = BatchSimulator(BlackJackAI(strategy='basic'), num_shoes=5000, seed=6)
+        bets = np.full(5000, 25, dtype=np.int64)
+        for _ in range(5):
+            net = simulator.play_round(bets, np.full(5000, 10 ** 6, dtype=np.int64))
+            assert 37 in net    # 3:2 on 25 chips floors to 37
+            assert 38 not in net
+
+    def test_cannot_lose_more_than_the_bankroll(self):
+        simulator = BatchSimulator(BlackJackAI(strategy='basic'), num_shoes=5000, seed=7)
+        bets = np.full(5000, 10, dtype=np.int64)
+        for _ in range(5):
+            assert simulator.play_round(bets, bets.copy()).min() >= -10
+
+
+class TestBetSizing:
+    """
+        Test vectorized bet sizes
+    """
+    def test_spread_matches_ai(self):
+        ai = BlackJackAI(strategy='basic')
+        spread = compile_bet_spread(ai, 25)
+        for count in (-3, 0, 2, 3, 4, 5, 9):
+            ai.true_count = count
+            assert spread[count - SPREAD_COUNTS[0]] == ai.get_bet_size(25, 10 ** 9)
+
+    def test_kelly_sizes_match_scalar(self):
+        edges = np.array([-0.01, 0.0, 0.01, 0.03])
+        table = EdgeTable(-1, [MIN_BIN_ROUNDS] * 4, edges * MIN_BIN_ROUNDS, (1.3 + edges ** 2) * MIN_BIN_ROUNDS)
+        sizer = KellyBetSizer(table, 0.5)
+        counts = np.array([-4.0, 0.5, 1.7, 2.2, 6.0])
+        chips = np.array([5000, 20000, 20000, 9, 100000])
+        expected = [sizer.bet_size(count, 10, int(chip)) for count, chip in zip(counts, chips)]
+        assert list(sizer.bet_sizes(counts, 10, chips)) == expected
+
+
+class TestBankrollSimulator:
+    """
+        Test bankroll trajectories
+    """
+    def test_checkpoints_stream(self):
+        simulator = BankrollSimulator(BlackJackAI(strategy='basic'), num_trajectories=500, seed=1)
+        reports = list(simulator.progress(300, checkpoint_every=100))
+        assert [report['round'] for report in reports] == [100, 200, 300]
+        ruin = [report['risk_of_ruin'] for report in reports]
+        assert ruin == sorted(ruin)
+        assert (simulator.chips >= 0).all()
+        assert set(reports[-1]['percentiles']) == {'5', '25', '50', '75', '95'}
+
+    def test_ruined_trajectories_stop(self):
+        simulator = BankrollSimulator(BlackJackAI(strategy='simple'), starting_chips=50, num_trajectories=300, seed=2)
+        report = simulator.run(1000, checkpoint_every=50)
+        ruined = simulator.ruined_at >= 0
+        assert report['risk_of_ruin'] == pytest.approx(ruined.mean())
+        assert (simulator.chips[ruined] == 0).all()
+        assert report['median_session_length'] <= report['round']
+        assert report['ruin_curve'][-1] == [report['round'], report['risk_of_ruin']]
+
+    def test_reproducible_with_seed(self):
+        first = BankrollSimulator(BlackJackAI(strategy='basic'), num_trajectories=200, seed=3).run(200)
+        second = BankrollSimulator(BlackJackAI(strategy='basic'), num_trajectories=200, seed=3).run(200)
+        assert first == second
+
+    def test_flat_bet_never_exceeds_base(self):
+        simulator = BankrollSimulator(BlackJackAI(strategy='basic'), num_trajectories=100, flat_bet=True, seed=4)
+        simulator.simulator.true_counts = lambda: np.full(100, 10.0)
+        assert simulator.bet_sizes().max() == 25
@@ -1,8 +1,15 @@
+from array import array
 from channels.testing import WebsocketCommunicator
 from channels.routing import URLRouter
 from django.db.transaction import commit
 from django.urls import re_path
-from game.consumers import BlackJackConsumer
+from game.consumers import TABLE_ELSEWHERE_CLOSE_CODE, WORKER_ID, BlackJackConsumer, BlackJackTableConsumer
+from game.game_engine import CARDS, VALUE_INDEX, Hand
+from game.protocol import apply_delta
+from game.registry import GameRegistry
+from game.snapshot import dump_game
+from game.store import get_game_store
+from game.table import BlackJackTable
 import json
 import pytest
 import asyncio
@@ -37,6 +44,23 @@ class TestBlackjackWebSocketConnection:
         assert response['state']['game_phase'] == 'betting'
         await communicator.disconnect()
 
+    async def test_rules_from_query_string(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/?rules=downtown")
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        assert response['state']['rules'] == 'downtown'
+        assert response['state']['deck_remaining'] == 104
+        await communicator.disconnect()
+
+    async def test_unknown_rules(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/?rules=nope")
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        assert response['type'] == 'error'
+        response = await communicator.receive_json_from()
+        assert response['state']['rules'] == 'classic'
+        await communicator.disconnect()
+
 
 @pytest.mark.asyncio
 @pytest.mark.django_db
@@ -130,6 +154,56 @@ class TestPlayingActions:
         assert response['type'] in ['game_state', 'error']
         await communicator.disconnect()
 
+    async def test_hint_action(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
+        await self.setup_game(communicator)
+        # Ask for a hint
+        await communicator.send_json_to({'action': 'hint'})
+        response = await communicator.receive_json_from()
+        # A natural blackjack finishes the hand before a hint can be given
+        assert response['type'] in ['hint', 'error']
+        if response['type'] == 'hint':
+            assert response['best_action'] in response['action_values']
+            assert 'stand' in response['action_values']
+        await communicator.disconnect()
+
+    async def test_hint_ignores_hole_card(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
+        existing = set(BlackJackConsumer.games)
+        await communicator.connect()
+        await communicator.receive_json_from()  # Initial
+        game = self.connected_game(existing)
+        # Player ten and seven, dealer hole five and up card six
+        game.deck.shoe[:4] = array('B', [9, 4, 6, 5])
+        await communicator.send_json_to({'action': 'bet', 'amount': 100})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'deal'})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'hint'})
+        hint = await communicator.receive_json_from()
+        # Swap the hole card with an undealt ten: the unseen cards stay the same
+        deck = game.deck
+        position = deck.shoe.index(22, deck.cursor)
+        deck.shoe[position] = 4
+        deck.counts[VALUE_INDEX[4]] += 1
+        deck.counts[VALUE_INDEX[22]] -= 1
+        up_card = game.dealer_hand.cards[1]
+        game.dealer_hand = Hand()
+        game.dealer_hand.add_card(CARDS[22])
+        game.dealer_hand.add_card(up_card)
+        await communicator.send_json_to({'action': 'hint'})
+        assert await communicator.receive_json_from() == hint
+        await communicator.disconnect()
+
+    @staticmethod
+    def connected_game(existing):
+        """
+            Game of the one consumer connected since the registry held the existing channels
+        """
+        channels = set(BlackJackConsumer.games) - existing
+        assert len(channels) == 1
+        return BlackJackConsumer.games[channels.pop()]
+
     async def test_reset_action(self, blackjack_application):
         communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
         await self.setup_game(communicator)
@@ -202,6 +276,16 @@ class TestErrorHandling:
         assert response['type'] == 'error'
         await communicator.disconnect()
 
+    async def test_hint_when_not_playing(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
+        await communicator.connect()
+        await communicator.receive_json_from()
+        # Ask for a hint in betting phase
+        await communicator.send_json_to({'action': 'hint'})
+        response = await communicator.receive_json_from()
+        assert response['type'] == 'error'
+        await communicator.disconnect()
+
     async def test_hit_when_not_playing(self, blackjack_application):
         communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
         await communicator.connect()
@@ -240,3 +324,282 @@ class TestMultipleConnections:
         await comm1.disconnect()
         await comm2.disconnect()
 
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+class TestTables:
+    """
+        Test multi-seat tables
+    """
+    @pytest.fixture
+    def table_application(self):
+        return URLRouter([
+            re_path(r'ws/blackjack/table/(?P<game_id>\w+)/$', BlackJackTableConsumer.as_asgi()),
+        ])
+
+    async def test_seats_share_table_state(self, table_application):
+        comm1 = WebsocketCommunicator(table_application, "/ws/blackjack/table/shared/")
+        comm2 = WebsocketCommunicator(table_application, "/ws/blackjack/table/shared/")
+        await comm1.connect()
+        assert (await comm1.receive_json_from()) == {'type': 'seat', 'seat': 0}
+        await comm1.receive_json_from()     # table state
+        await comm2.connect()
+        assert (await comm2.receive_json_from()) == {'type': 'seat', 'seat': 1}
+        # Both seats see the second player sit down
+        state1 = await comm1.receive_json_from()
+        state2 = await comm2.receive_json_from()
+        assert state1 == state2
+        assert [seat['seat'] for seat in state1['state']['seats'] if seat] == [0, 1]
+        # ...and the first player's bet
+        await comm1.send_json_to({'action': 'bet', 'amount': 100})
+        state1 = await comm1.receive_json_from()
+        state2 = await comm2.receive_json_from()
+        assert state1 == state2
+        assert state2['state']['seats'][0]['current_bet'] == 100
+        await comm2.disconnect()
+        state1 = await comm1.receive_json_from()
+        assert state1['state']['seats'][1] is None
+        await comm1.disconnect()
+        assert 'shared' not in BlackJackTableConsumer.tables
+
+    async def test_only_seat_in_turn_plays(self, table_application):
+        table = BlackJackTableConsumer.tables['turns'] = BlackJackTable('turns')
+        table.deck.shoe[:6] = array('B', [9, 8, 4, 6, 7, 5])     # no naturals
+        comm1 = WebsocketCommunicator(table_application, "/ws/blackjack/table/turns/")
+        comm2 = WebsocketCommunicator(table_application, "/ws/blackjack/table/turns/")
+        await comm1.connect()
+        await comm2.connect()
+        for _ in range(3):
+            await comm1.receive_json_from()
+        for _ in range(2):
+            await comm2.receive_json_from()
+        await comm1.send_json_to({'action': 'bet', 'amount': 100})
+        await comm1.receive_json_from()
+        await comm2.receive_json_from()
+        await comm2.send_json_to({'action': 'bet', 'amount': 100})
+        await comm1.receive_json_from()
+        await comm2.receive_json_from()
+        await comm2.send_json_to({'action': 'deal'})
+        state = (await comm2.receive_json_from())['state']
+        await comm1.receive_json_from()
+        assert state['turn'] == 0
+        await comm2.send_json_to({'action': 'hit'})
+        response = await comm2.receive_json_from()
+        assert response['type'] == 'error'
+        await comm1.disconnect()
+        await comm2.disconnect()
+
+    async def test_table_claimed_by_worker(self, table_application):
+        communicator = WebsocketCommunicator(table_application, "/ws/blackjack/table/claimed/")
+        await communicator.connect()
+        await communicator.receive_json_from()
+        stored = await get_game_store().load('blackjack-table:claimed')
+        assert stored.data == WORKER_ID.encode()
+        await communicator.disconnect()
+        assert await get_game_store().load('blackjack-table:claimed') is None
+
+    async def test_table_hosted_elsewhere(self, table_application):
+        store = get_game_store()
+        await store.save('blackjack-table:elsewhere', b'another-worker', 0)
+        communicator = WebsocketCommunicator(table_application, "/ws/blackjack/table/elsewhere/")
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        assert response['type'] == 'error'
+        assert (await communicator.receive_output())['code'] == TABLE_ELSEWHERE_CLOSE_CODE
+        assert 'elsewhere' not in BlackJackTableConsumer.tables
+        await store.delete('blackjack-table:elsewhere')
+
+    async def test_full_table(self, table_application):
+        BlackJackTableConsumer.tables['tiny'] = BlackJackTable('tiny', max_seats=1)
+        comm1 = WebsocketCommunicator(table_application, "/ws/blackjack/table/tiny/")
+        comm2 = WebsocketCommunicator(table_application, "/ws/blackjack/table/tiny/")
+        await comm1.connect()
+        await comm2.connect()
+        response = await comm2.receive_json_from()
+        assert response == {'type': 'error', 'error': 'Table is full!'}
+        await comm1.disconnect()
+        await comm2.disconnect()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+class TestDeltaProtocol:
+    """
+        Test the snapshot and delta protocol
+    """
+    async def test_snapshot_then_deltas(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/?protocol=2")
+        await communicator.connect()
+        snapshot = await communicator.receive_json_from()
+        assert snapshot['type'] == 'game_state' and snapshot['seq'] == 1
+        await communicator.send_json_to({'action': 'bet', 'amount': 100})
+        delta = await communicator.receive_json_from()
+        assert delta['type'] == 'game_delta' and delta['seq'] == 2
+        assert delta['set']['player_chips'] == 900
+        apply_delta(snapshot, delta)
+        assert snapshot['state']['current_bet'] == 100
+        await communicator.disconnect()
+
+    async def test_resync(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/?protocol=2")
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'bet', 'amount': 100})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'resync'})
+        response = await communicator.receive_json_from()
+        assert response['type'] == 'game_state' and response['seq'] == 3
+        assert response['state']['current_bet'] == 100
+        await communicator.disconnect()
+
+    async def test_unknown_protocol(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/?protocol=9")
+        await communicator.connect()
+        assert (await communicator.receive_json_from())['type'] == 'error'
+        response = await communicator.receive_json_from()
+        assert response['type'] == 'game_state' and 'seq' not in response
+        await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+class TestTurboMode:
+    """
+        Test turbo AI sessions
+    """
+    async def test_turbo_streams_summaries(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'turbo', 'hands': 50, 'base_bet': 10, 'summary_every': 20})
+        summaries = []
+        while not summaries or not summaries[-1]['done']:
+            response = await communicator.receive_json_from(timeout=10)
+            assert response['type'] == 'turbo_summary'
+            summaries.append(response)
+        assert summaries[-1]['rounds_played'] == 50 or summaries[-1]['chips'] == 0
+        state = await communicator.receive_json_from()
+        assert state['type'] == 'game_state'
+        assert state['state']['player_chips'] == summaries[-1]['chips']
+        await communicator.disconnect()
+
+    async def test_actions_rejected_during_turbo(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'turbo', 'hands': 100000, 'base_bet': 1, 'summary_every': 100000})
+        await communicator.send_json_to({'action': 'bet', 'amount': 10})
+        response = await communicator.receive_json_from()
+        assert response['type'] == 'error'
+        await communicator.send_json_to({'action': 'stop_turbo'})
+        response = await communicator.receive_json_from(timeout=10)
+        assert response['type'] == 'turbo_summary' and response['done']
+        await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+class TestSessions:
+    """
+        Test resuming games from the game store
+    """
+    async def test_resume_session(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/?rules=downtown")
+        await communicator.connect()
+        session_id = (await communicator.receive_json_from())['session_id']
+        await communicator.send_json_to({'action': 'bet', 'amount': 100})
+        await communicator.receive_json_from()
+        await communicator.disconnect()
+        # Reconnect, e.g. to another worker
+        communicator = WebsocketCommunicator(blackjack_application, f"/ws/blackjack/test/?session={session_id}")
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        assert response['session_id'] == session_id
+        assert response['state']['current_bet'] == 100
+        assert response['state']['player_chips'] == 900
+        assert response['state']['rules'] == 'downtown'
+        assert (await communicator.receive_json_from())['type'] == 'info'
+        await communicator.disconnect()
+
+    async def test_unknown_session_starts_new_game(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/?session=gone")
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        assert response['session_id'] == 'gone' and response['state']['current_bet'] == 0
+        assert await communicator.receive_nothing()
+        await communicator.disconnect()
+
+    async def test_invalid_session_id(self, blackjack_application):
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/?session=no%20spaces")
+        await communicator.connect()
+        assert (await communicator.receive_json_from())['type'] == 'error'
+        response = await communicator.receive_json_from()
+        assert response['type'] == 'game_state' and response['session_id'] != 'no spaces'
+        await communicator.disconnect()
+
+    async def test_session_taken_over(self, blackjack_application):
+        first = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
+        await first.connect()
+        session_id = (await first.receive_json_from())['session_id']
+        second = WebsocketCommunicator(blackjack_application, f"/ws/blackjack/test/?session={session_id}")
+        await second.connect()
+        await second.receive_json_from()
+        await second.send_json_to({'action': 'bet', 'amount': 50})
+        await second.receive_json_from()
+        await second.disconnect()
+        # The first connection's game is outdated: its next checkpoint (at the end of a round) fails
+        # and it is closed
+        await first.send_json_to({'action': 'bet', 'amount': 10})
+        await first.receive_json_from()
+        await first.send_json_to({'action': 'deal'})
+        response = await first.receive_json_from()
+        if response['state']['game_phase'] == 'playing':
+            await first.send_json_to({'action': 'stand'})
+            await first.receive_json_from()
+        assert (await first.receive_json_from())['type'] == 'error'
+        assert (await first.receive_output())['code'] == 4009
+
+    async def test_checkpoint_at_round_end(self, blackjack_application, monkeypatch):
+        saves = []
+        save_session = BlackJackConsumer.save_session
+
+        async def counting_save(consumer, data=None):
+            saves.append(consumer.games[consumer.channel_name].game_phase)
+            await save_session(consumer, data)
+
+        monkeypatch.setattr(BlackJackConsumer, 'save_session', counting_save)
+        communicator = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'bet', 'amount': 10})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'deal'})
+        response = await communicator.receive_json_from()
+        if response['state']['game_phase'] == 'playing':
+            await communicator.send_json_to({'action': 'stand'})
+            await communicator.receive_json_from()
+        # Saved once the round finished, not on connect or after the bet and the deal
+        assert saves == ['finished']
+        await communicator.disconnect()
+
+    async def test_evicted_game_resumed(self, blackjack_application, monkeypatch):
+        monkeypatch.setattr(BlackJackConsumer, 'games', GameRegistry(capacity=1, snapshot=dump_game))
+        monkeypatch.setattr(BlackJackConsumer, 'ai_agents', GameRegistry(capacity=1))
+        first = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
+        await first.connect()
+        session_id = (await first.receive_json_from())['session_id']
+        await first.send_json_to({'action': 'bet', 'amount': 100})
+        await first.receive_json_from()
+        # A second game doesn't fit: the first one is evicted and its connection closed
+        second = WebsocketCommunicator(blackjack_application, "/ws/blackjack/test/")
+        await second.connect()
+        await second.receive_json_from()
+        assert (await first.receive_json_from())['type'] == 'error'
+        assert (await first.receive_output())['code'] == 4008
+        await second.disconnect()
+        first = WebsocketCommunicator(blackjack_application, f"/ws/blackjack/test/?session={session_id}")
+        await first.connect()
+        assert (await first.receive_json_from())['state']['current_bet'] == 100
+        assert BlackJackConsumer.games.stats()['restored'] == 1
+        await first.disconnect()
@@ -0,0 +1,96 @@
+from game.ai_agent import BlackJackAI
+from game.counting import COUNTING_SYSTEMS, CountingSystem, get_counting_system
+from game.game_engine import BlackJackGame, CARDS
+from game.simulator import BatchSimulator
+import numpy as np
+import pytest
+
+
+class TestCountingSystems:
+    """
+        Test tag vectors
+    """
+    @pytest.mark.parametrize('key', ['hi-lo', 'hi-opt-ii', 'omega-ii'])
+    def test_balanced_systems_sum_to_zero(self, key):
+        system = COUNTING_SYSTEMS[key]
+        assert sum(system.code_tags) == 0
+
+    def test_ko_ends_shoe_at_plus_four(self):
+        system = COUNTING_SYSTEMS['ko']
+        assert system.initial_count(6) + 6 * sum(system.code_tags) == 4
+
+    def test_code_tags_follow_values(self):
+        system = COUNTING_SYSTEMS['omega-ii']
+        for card in CARDS:
+            assert system.tag(card) == system.value_tags[min(card.value(), 10) if card.value() != 11 else 1]
+
+    def test_rejects_short_tag_vector(self):
+        with pytest.raises(ValueError):
+            CountingSystem('broken', (1, 1, 1))
+
+    def test_unknown_system(self):
+        with pytest.raises(ValueError):
+            get_counting_system('wong-halves')
+
+    def test_unbalanced_true_count_is_running_count(self):
+        assert COUNTING_SYSTEMS['ko'].true_count(3, 2.5) == 3
+
+
+class TestLiveCount:
+    """
+        Test counts fed by the game as cards are shown
+    """
+    def test_hole_card_counted_at_reveal(self):
+        game = BlackJackGame(seed=8)
+        seen = []
+        game.add_card_listener(seen.append)
+        game.place_bet(10)
+        game.start_round()
+        if game.game_phase == 'playing':
+            shown = game.player_hands[0].cards + game.dealer_hand.cards[1:]
+            assert sorted(card.code for card in seen) == sorted(card.code for card in shown)
+            game.stand()
+        visible = [card for hand in game.player_hands for card in hand.cards] + game.dealer_hand.cards
+        assert sorted(card.code for card in seen) == sorted(card.code for card in visible)
+
+    def test_ai_count_matches_shown_cards(self):
+        game = BlackJackGame(seed=12)
+        ai = BlackJackAI(strategy='basic', counting_system='hi-opt-ii')
+        game.add_card_listener(lambda card: ai.observe_card(card, game.deck.remaining() / 52))
+        seen = []
+        game.add_card_listener(seen.append)
+        for _ in range(10):
+            game.reset_round()
+            game.place_bet(10)
+            game.start_round()
+            while game.game_phase == 'playing':
+                game.stand()
+        assert ai.running_count == sum(ai.counting.tag(card) for card in seen)
+        assert ai.true_count == pytest.approx(ai.running_count / (game.deck.remaining() / 52))
+
+    def test_reset_uses_initial_count(self):
+        ai = BlackJackAI(strategy='basic', counting_system='ko', num_decks=6)
+        ai.running_count = 7
+        ai.reset_count()
+        assert ai.running_count == -20
+
+
+class TestVectorizedCount:
+    """
+        Test batch simulator counts
+    """
+    def test_counts_match_dealt_cards(self):
+        system = COUNTING_SYSTEMS['hi-lo']
+        simulator = BatchSimulator(BlackJackAI(strategy='basic'), num_shoes=20, seed=4, counting=system)
+        for _ in range(8):
+            simulator.play_round()
+        counts = simulator.running_counts()
+        for lane in range(20):
+            dealt = simulator.shoes[lane, :simulator.cursor[lane]]
+            assert counts[lane] == system.value_tags[dealt].sum()
+
+    def test_true_counts_per_deck_remaining(self):
+        simulator = BatchSimulator(BlackJackAI(strategy='basic'), num_shoes=5, seed=4, counting=COUNTING_SYSTEMS['hi-lo'])
+        simulator.play_round()
+        decks = (simulator.shoe_size - simulator.cursor) / 52
+        assert np.allclose(simulator.true_counts(), simulator.running_counts() / decks)
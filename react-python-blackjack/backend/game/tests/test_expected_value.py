@@ -0,0 +1,104 @@
+from game.ai_agent import BlackJackAI
+from game.expected_value import ExpectedValueSolver, full_shoe
+from game.game_engine import Hand, Card, Suit, Rank
+import pytest
+
+
+def make_hand(*ranks):
+    hand = Hand()
+    for rank in ranks:
+        hand.add_card(Card(Suit.HEARTS, rank))
+    return hand
+
+
+def solve(solver, hand, up_rank, **flags):
+    up_card = Card(Suit.CLUBS, up_rank)
+    composition = full_shoe(exclude=tuple(hand.cards) + (up_card,))
+    return solver.action_values(hand, up_card, composition, **flags)
+
+
+@pytest.fixture
+def solver():
+    return ExpectedValueSolver()
+
+
+class TestActionValues:
+    """
+        Test expected values of player actions
+    """
+    def test_only_allowed_actions_are_valued(self, solver):
+        values = solve(solver, make_hand(Rank.TEN, Rank.SEVEN), Rank.TEN,
+                       can_double=False, can_split=False, can_surrender=False)
+        assert set(values) == {'stand', 'hit'}
+
+    def test_surrender_is_half_a_bet(self, solver):
+        values = solve(solver, make_hand(Rank.TEN, Rank.SIX), Rank.TEN, can_surrender=True)
+        assert values['surrender'] == -0.5
+
+    def test_stand_on_hard_20_beats_hit(self, solver):
+        values = solve(solver, make_hand(Rank.TEN, Rank.KING), Rank.SIX)
+        assert values['stand'] > values['hit']
+        assert values['stand'] > 0.5
+
+    def test_double_11_vs_6(self, solver):
+        values = solve(solver, make_hand(Rank.FIVE, Rank.SIX), Rank.SIX)
+        assert max(values, key=values.get) == 'double'
+
+    def test_split_aces(self, solver):
+        values = solve(solver, make_hand(Rank.ACE, Rank.ACE), Rank.SIX, can_split=True)
+        assert max(values, key=values.get) == 'split'
+
+    def test_hit_is_certain_loss_when_only_tens_remain(self, solver):
+        hand = make_hand(Rank.TEN, Rank.SIX)
+        up_card = Card(Suit.CLUBS, Rank.SEVEN)
+        values = solver.action_values(hand, up_card, (0,) * 9 + (20,))
+        assert values['hit'] == pytest.approx(-1.0)
+        # Dealer always makes 17, beating a stand on 16
+        assert values['stand'] == pytest.approx(-1.0)
+
+
+class TestSolverCache:
+    """
+        Test caching of solved states
+    """
+    def test_repeated_state_hits_cache(self, solver):
+        hand = make_hand(Rank.TEN, Rank.SIX)
+        solve(solver, hand, Rank.TEN)
+        solve(solver, hand, Rank.TEN)
+        assert solver.cache_info()['hits'] == 1
+        assert solver.cache_info()['misses'] == 1
+
+    def test_same_bucket_reuses_result(self, solver):
+        hand = make_hand(Rank.TEN, Rank.SIX)
+        up_card = Card(Suit.CLUBS, Rank.TEN)
+        composition = list(full_shoe(exclude=(up_card,)))
+        first = solver.action_values(hand, up_card, tuple(composition))
+        # 95 and 93 tens fall in the same bucket of 4
+        composition[9] -= 2
+        assert solver.action_values(hand, up_card, tuple(composition)) is first
+
+    def test_cache_is_bounded(self):
+        solver = ExpectedValueSolver(maxsize=2)
+        for rank in (Rank.TWO, Rank.THREE, Rank.FOUR):
+            solve(solver, make_hand(Rank.TEN, Rank.SIX), rank)
+        assert solver.cache_info()['size'] == 2
+
+
+class TestOptimalStrategy:
+    """
+        Test the optimal AI strategy
+    """
+    def test_optimal_ai_without_observed_shoe(self):
+        ai = BlackJackAI(strategy='optimal')
+        action = ai.get_action(make_hand(Rank.FIVE, Rank.SIX), Card(Suit.CLUBS, Rank.SIX), can_double=True)
+        assert action == 'double'
+
+    def test_optimal_ai_uses_observed_shoe(self):
+        ai = BlackJackAI(strategy='optimal')
+        # Only small cards left: hitting 16 cannot bust
+        ai.observe_shoe((0, 20, 0, 0, 0, 0, 0, 0, 0, 0))
+        action = ai.get_action(make_hand(Rank.TEN, Rank.SIX), Card(Suit.CLUBS, Rank.TEN), can_double=False)
+        assert action == 'hit'
+
+    def test_optimal_description(self):
+        assert 'Optimal' in BlackJackAI(strategy='optimal').get_strategy_description()
@@ -3,6 +3,8 @@ from redis.backoff import DecorrelatedJitterBackoff
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from twisted.mail.maildir import initializeMaildir
 
+from array import array
+from game.ai_agent import BlackJackAI
 from game.game_engine import Card, Deck, Hand, BlackJackGame, Suit, Rank
 import pytest
 
@@ -28,7 +30,7 @@ class TestCard:
         assert jack.value() == 10
 
     def test_number_card_value(self):
-        five = Card(Suit.HEARTS, Rank.KING)
+        five = Card(Suit.HEARTS, Rank.FIVE)
         assert five.value() == 5
 
     def test_card_to_dict(self):
@@ -38,6 +40,13 @@ class TestCard:
         assert card_dict['rank'] == 'K'
         assert card_dict['value'] == 10
 
+    def test_card_code_round_trip(self):
+        card = Card(Suit.CLUBS, Rank.QUEEN)
+        shared = Card.from_code(card.code)
+        assert shared.suit == Suit.CLUBS
+        assert shared.rank == Rank.QUEEN
+        assert 0 <= card.code < 52
+
 class TestDeck:
     """
         Test Deck Class
@@ -73,9 +82,89 @@ class TestDeck:
         for _ in range(45):
             deck.deal()
         assert len(deck.cards) < 20
-        # Next deal should trigger reshuffle
+        assert deck.needs_shuffle()
+        # Dealing never reshuffles in the middle of a round
+        deck.deal()
+        assert len(deck.cards) == 6
+        # The next round starts from a fresh shoe
+        deck.prepare_round()
+        assert len(deck.cards) == 52
+
+    def test_deck_reshuffles_at_cut_card(self):
+        deck = Deck(num_decks=2, penetration=0.5)
+        for _ in range(51):
+            deck.deal()
+        deck.prepare_round()
+        assert deck.remaining() == 53
+        deck.deal()
+        deck.prepare_round()
+        assert deck.remaining() == 104
+
+    def test_deck_reshuffles_when_exhausted(self):
+        deck = Deck(num_decks=1, penetration=1.0)
+        for _ in range(52):
+            deck.deal()
         deck.deal()
-        assert len(deck.cards) == 51   # Full deck minus one dealt
+        assert deck.remaining() == 51
+
+    def test_deck_rejects_invalid_penetration(self):
+        with pytest.raises(ValueError):
+            Deck(num_decks=1, penetration=1.5)
+
+    def test_continuous_shuffler_returns_discards(self):
+        deck = Deck(num_decks=1, continuous=True)
+        shoe = deck.shoe
+        for _ in range(10):
+            deck.deal()
+        deck.prepare_round()
+        assert deck.shoe is shoe
+        assert deck.remaining() == 52
+        assert deck.composition() == (4, 4, 4, 4, 4, 4, 4, 4, 4, 16)
+        assert sorted(deck.shoe) == list(range(52))
+
+    def test_shuffle_notifies_listeners(self):
+        deck = Deck(num_decks=1, penetration=0.5)
+        shuffles = []
+        deck.add_shuffle_listener(lambda: shuffles.append(True))
+        deck.prepare_round()
+        assert shuffles == []
+        for _ in range(26):
+            deck.deal()
+        deck.prepare_round()
+        assert shuffles == [True]
+
+    def test_shuffle_resets_ai_count(self):
+        game = BlackJackGame(num_decks=1, penetration=0.5)
+        ai = BlackJackAI(strategy='basic')
+        game.deck.add_shuffle_listener(ai.reset_count)
+        ai.running_count = 5
+        ai.true_count = 2
+        for _ in range(26):
+            game.deck.deal()
+        game.place_bet(10)
+        game.start_round()
+        assert ai.running_count == 0
+        assert ai.true_count == 0
+
+    def test_deck_deals_shared_cards(self):
+        deck = Deck(num_decks=1)
+        card = deck.deal()
+        assert card is Card.from_code(card.code)
+
+    def test_deck_reset_reuses_buffer(self):
+        deck = Deck(num_decks=2)
+        shoe = deck.shoe
+        for _ in range(30):
+            deck.deal()
+        deck.reset()
+        assert deck.shoe is shoe
+        assert deck.remaining() == 104
+        assert sorted(deck.shoe) == sorted(list(range(52)) * 2)
+
+    def test_deck_cards_view_matches_deal_order(self):
+        deck = Deck(num_decks=1)
+        upcoming = deck.cards[:3]
+        assert [deck.deal() for _ in range(3)] == upcoming
 
 class TestHand:
     """
@@ -140,7 +229,41 @@ class TestHand:
         hand.add_card(Card(Suit.HEARTS, Rank.ACE))
         hand.add_card(Card(Suit.DIAMONDS, Rank.SIX))
         assert hand.is_soft() is True
-        assert hand.value() == 25
+        assert hand.value() == 17
+
+    def test_hand_soft_with_two_aces(self):
+        hand = Hand()
+        hand.add_card(Card(Suit.HEARTS, Rank.ACE))
+        hand.add_card(Card(Suit.DIAMONDS, Rank.ACE))
+        assert hand.is_soft() is True
+        assert hand.value() == 12
+        hand.add_card(Card(Suit.CLUBS, Rank.FIVE))
+        assert hand.is_soft() is True
+        assert hand.value() == 17
+
+    def test_hand_hard_after_ace_demoted(self):
+        hand = Hand()
+        hand.add_card(Card(Suit.HEARTS, Rank.ACE))
+        hand.add_card(Card(Suit.DIAMONDS, Rank.SIX))
+        hand.add_card(Card(Suit.CLUBS, Rank.TEN))
+        assert hand.is_soft() is False
+        assert hand.value() == 17
+
+    def test_hand_pop_card_updates_totals(self):
+        hand = Hand()
+        hand.add_card(Card(Suit.HEARTS, Rank.ACE))
+        hand.add_card(Card(Suit.DIAMONDS, Rank.ACE))
+        card = hand.pop_card()
+        assert card.rank == Rank.ACE
+        assert hand.value() == 11
+        assert hand.is_soft() is True
+
+    def test_hand_assigning_cards_recomputes_totals(self):
+        hand = Hand()
+        hand.add_card(Card(Suit.HEARTS, Rank.TWO))
+        hand.cards = [Card(Suit.HEARTS, Rank.ACE), Card(Suit.DIAMONDS, Rank.KING)]
+        assert hand.value() == 21
+        assert hand.is_blackjack() is True
 
     def test_hand_can_split_pairs(self):
         hand = Hand()
@@ -361,6 +484,15 @@ class TestBlackJackGame:
         assert game.game_phase == 'betting'
         assert game.current_bet == 0
 
+    @pytest.mark.parametrize("hole,up,offered", [(0, 5, False), (5, 13, True)])
+    def test_insurance_offered_on_up_card_ace(self, hole, up, offered):
+        game = BlackJackGame()
+        # Player ten and seven, then the dealer hole and up cards
+        game.deck.shoe[:4] = array('B', [9, hole, 6, up])
+        game.place_bet(100)
+        game.start_round()
+        assert game.buy_insurance() is offered
+
 
 # Parametrized tests
 @pytest.mark.parametrize("rank,expected_value", [
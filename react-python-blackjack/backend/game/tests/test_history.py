@@ -0,0 +1,217 @@
+from channels.testing import WebsocketCommunicator
+from channels.routing import URLRouter
+from datetime import timedelta
+from django.db.models import F
+from django.urls import re_path
+from django.utils import timezone
+from game.ai_agent import BlackJackAI
+from game.consumers import BlackJackConsumer
+from game.game_engine import BlackJackGame, Card, Suit, Rank
+from game.history import DatabaseHandSink, HandHistoryRecorder, MemoryHandSink
+from game.runner import play_round
+import asyncio
+import pytest
+
+
+def finished_game(seed=1, rounds=1):
+    game = BlackJackGame(seed=seed)
+    ai = BlackJackAI(strategy='basic')
+    for _ in range(rounds):
+        game.reset_round()
+        play_round(game, ai, 10)
+    return game
+
+
+class FailingSink:
+    def write(self, rows):
+        raise RuntimeError("database unavailable")
+
+
+class TestHandResults:
+    """
+        Test per hand outcomes from resolve_bets
+    """
+    def test_payouts_match_chips(self):
+        game = BlackJackGame(seed=4)
+        ai = BlackJackAI(strategy='basic')
+        for _ in range(50):
+            game.reset_round()
+            chips = game.player_chips
+            play_round(game, ai, 10)
+            assert sum(result['payout'] for result in game.hand_results) == game.player_chips - chips
+
+    def test_result_fields(self):
+        game = BlackJackGame(seed=1)
+        game.place_bet(100)
+        game.start_round()
+        game.player_hands[0].cards = [Card(Suit.HEARTS, Rank.TEN), Card(Suit.HEARTS, Rank.NINE)]
+        game.dealer_hand.cards = [Card(Suit.CLUBS, Rank.TEN), Card(Suit.CLUBS, Rank.EIGHT)]
+        game.game_phase = 'playing'
+        game.stand()
+        result = game.hand_results[0]
+        assert result['result'] == 'win'
+        assert result['payout'] == 100
+        assert result['player_value'] == 19
+        assert result['dealer_value'] == 18
+        assert result['actions'] == ['stand']
+
+    def test_round_listener_called(self):
+        game = BlackJackGame(seed=1)
+        rounds = []
+        game.add_round_listener(lambda finished: rounds.append(len(finished.hand_results)))
+        play_round(game, BlackJackAI(strategy='basic'), 10)
+        assert len(rounds) == 1 and rounds[0] >= 1
+
+
+@pytest.mark.asyncio
+class TestHandHistoryRecorder:
+    """
+        Test buffering and background flushing
+    """
+    async def test_flushes_on_size_threshold(self):
+        sink = MemoryHandSink()
+        recorder = HandHistoryRecorder(sink, flush_size=3, flush_interval=60)
+        recorder.start()
+        game = BlackJackGame(seed=2)
+        ai = BlackJackAI(strategy='basic')
+        while recorder.hands_recorded < 3:
+            game.reset_round()
+            play_round(game, ai, 10)
+            recorder.record_round(game)
+        for _ in range(50):
+            if sink.rows:
+                break
+            await asyncio.sleep(0.01)
+        assert len(sink.rows) == recorder.hands_recorded
+        assert [row['hand_number'] for row in sink.rows] == list(range(1, recorder.hands_recorded + 1))
+        await recorder.close()
+
+    async def test_flushes_on_interval(self):
+        sink = MemoryHandSink()
+        recorder = HandHistoryRecorder(sink, flush_size=100, flush_interval=0.05)
+        recorder.start()
+        recorder.record_round(finished_game())
+        await asyncio.sleep(0.2)
+        assert sink.rows
+        await recorder.close()
+
+    async def test_close_flushes_remaining(self):
+        sink = MemoryHandSink()
+        recorder = HandHistoryRecorder(sink, flush_size=100, flush_interval=60)
+        recorder.start()
+        recorder.record_round(finished_game())
+        await recorder.close()
+        assert len(sink.rows) == recorder.hands_recorded
+        assert recorder.task is None
+
+    async def test_buffer_is_bounded(self):
+        sink = MemoryHandSink()
+        recorder = HandHistoryRecorder(sink, flush_size=1000, max_buffer=5)
+        game = BlackJackGame(seed=3)
+        ai = BlackJackAI(strategy='basic')
+        for _ in range(10):
+            game.reset_round()
+            play_round(game, ai, 10)
+            recorder.record_round(game)
+        assert len(recorder.buffer) == 5
+        assert recorder.hands_dropped == recorder.hands_recorded - 5
+        await recorder.flush()
+        assert sink.rows[-1]['hand_number'] == recorder.hands_recorded
+
+    async def test_failed_write_is_counted(self):
+        recorder = HandHistoryRecorder(FailingSink())
+        recorder.record_round(finished_game())
+        await recorder.flush()
+        assert recorder.hands_failed == recorder.hands_recorded
+        assert not recorder.buffer
+
+
+class TestDatabaseHandSink:
+    """
+        Test the session totals added by each write, without a database
+    """
+    def test_session_update(self):
+        sink = DatabaseHandSink(ai_mode=True, ai_strategy='optimal')
+        sink.started_at = timezone.now() - timedelta(seconds=90)
+        rows = [
+            {'result': 'blackjack', 'payout': 15, 'player_bet': 10, 'player_blackjack': True, 'player_bust': False, 'was_doubled': False},
+            {'result': 'lose', 'payout': -20, 'player_bet': 20, 'player_blackjack': False, 'player_bust': True, 'was_doubled': False},
+            {'result': 'push', 'payout': 0, 'player_bet': 10, 'player_blackjack': False, 'player_bust': False, 'was_doubled': False},
+            {'result': 'surrender', 'payout': -5, 'player_bet': 10, 'player_blackjack': False, 'player_bust': False, 'was_doubled': False},
+        ]
+        update = sink.session_update(rows)
+        assert update['hands_played'] == F('hands_played') + 4
+        assert update['hands_won'] == F('hands_won') + 1
+        assert update['hands_lost'] == F('hands_lost') + 2
+        assert update['hands_pushed'] == F('hands_pushed') + 1
+        assert update['blackjacks'] == F('blackjacks') + 1
+        assert update['busts'] == F('busts') + 1
+        assert update['total_wagered'] == F('total_wagered') + 50
+        assert update['net_winnings'] == F('net_winnings') + -10
+        assert update['ending_chips'] == F('ending_chips') + -10
+        assert update['ai_mode'] and update['ai_strategy'] == 'optimal'
+        assert 90 <= update['duration'] < 100
+
+    def test_net_matches_chips(self):
+        recorder = HandHistoryRecorder(MemoryHandSink())
+        game = BlackJackGame(seed=4)
+        ai = BlackJackAI(strategy='basic')
+        for _ in range(30):
+            game.reset_round()
+            play_round(game, ai, 10)
+            recorder.record_round(game)
+        sink = DatabaseHandSink(starting_chips=1000)
+        sink.started_at = timezone.now()
+        update = sink.session_update(list(recorder.buffer))
+        assert update['ending_chips'] == F('ending_chips') + (game.player_chips - 1000)
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+class TestConsumerHistory:
+    """
+        Test that the consumer records finished rounds
+    """
+    async def test_disconnect_flushes_history(self, monkeypatch):
+        sink = MemoryHandSink()
+        monkeypatch.setattr(BlackJackConsumer, 'create_history_sink', lambda consumer, game: sink)
+        application = URLRouter([
+            re_path(r'ws/blackjack/(?P<game_id>\w+)/$', BlackJackConsumer.as_asgi()),
+        ])
+        communicator = WebsocketCommunicator(application, "/ws/blackjack/test/")
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'bet', 'amount': 10})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'deal'})
+        response = await communicator.receive_json_from()
+        if response['state']['game_phase'] == 'playing':
+            await communicator.send_json_to({'action': 'stand'})
+            await communicator.receive_json_from()
+        await communicator.disconnect()
+        assert len(sink.rows) == 1
+        assert sink.rows[0]['player_bet'] == 10
+
+    async def test_ai_settings_passed_to_sink(self, monkeypatch):
+        sink = MemoryHandSink()
+        monkeypatch.setattr(BlackJackConsumer, 'create_history_sink', lambda consumer, game: sink)
+        application = URLRouter([
+            re_path(r'ws/blackjack/(?P<game_id>\w+)/$', BlackJackConsumer.as_asgi()),
+        ])
+        communicator = WebsocketCommunicator(application, "/ws/blackjack/test/")
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'set_ai_strategy', 'strategy': 'optimal'})
+        await communicator.receive_json_from()
+        assert not sink.ai_mode and sink.ai_strategy is None
+        await communicator.send_json_to({'action': 'toggle_ai'})
+        await communicator.receive_json_from()
+        await communicator.disconnect()
+        assert sink.ai_mode and sink.ai_strategy == 'optimal'
+
+    async def test_starting_chips(self):
+        consumer = BlackJackConsumer()
+        consumer.scope = {}
+        game = BlackJackGame(seed=1)
+        game.player_chips = 750
+        assert consumer.create_history_sink(game).starting_chips == 750
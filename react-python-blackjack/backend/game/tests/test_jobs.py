@@ -0,0 +1,139 @@
+from django.test import AsyncClient
+from game.jobs import JobManager, SimulationJob, job_key, parse_job_params
+from game.runner import SimulationRunner
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import pytest
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+async def collect(job, timeout=None):
+    return [line async for line in job.follow(timeout=timeout)]
+
+
+async def response_lines(response):
+    return [json.loads(line) for line in b''.join([chunk async for chunk in response.streaming_content]).splitlines()]
+
+
+class TestJobParams:
+    """
+        Test job parameter validation and hashing
+    """
+    def test_defaults(self):
+        params = parse_job_params({'seed': 1})
+        assert params == {'strategy': 'basic', 'rules': 'classic', 'hands': 100000, 'seed': 1}
+
+    def test_missing_seed(self):
+        assert parse_job_params({})['seed'] is None
+
+    @pytest.mark.parametrize('data', [{'strategy': 'psychic'}, {'rules': 'european'}, {'hands': 0}, {'hands': 'many'}])
+    def test_rejects_invalid(self, data):
+        with pytest.raises(ValueError):
+            parse_job_params(data)
+
+    def test_key_ignores_order(self):
+        assert job_key({'a': 1, 'b': 2}) == job_key({'b': 2, 'a': 1})
+        assert job_key({'a': 1}) != job_key({'a': 2})
+
+
+class TestSimulationJob:
+    """
+        Test running and following jobs
+    """
+    async def test_lines_and_result(self, executor):
+        job = SimulationJob(parse_job_params({'hands': 25000, 'seed': 5}))
+        job.run(executor)
+        lines = await collect(job)
+        assert [line['type'] for line in lines] == ['progress', 'progress', 'progress', 'result']
+        assert job.status == 'done'
+        expected = SimulationRunner(num_rounds=25000, seed=5, shard_size=10000, rules='classic', workers=1).run()
+        assert lines[-1]['result'] == expected.to_dict()
+
+    async def test_cancel(self, executor):
+        job = SimulationJob(parse_job_params({'hands': 100000, 'seed': 5}))
+        job.cancel()
+        job.run(executor)
+        assert job.status == 'cancelled'
+        assert (await collect(job))[-1]['type'] == 'cancelled'
+
+    async def test_follow_does_not_block_event_loop(self):
+        job = SimulationJob(parse_job_params({'seed': 1}))
+        reader = asyncio.create_task(collect(job, timeout=10))
+        await asyncio.sleep(0.01)   # the loop runs while the reader waits
+        assert not reader.done()
+        await asyncio.to_thread(job.publish, {'type': 'progress'})
+        await asyncio.to_thread(job.publish, {'type': 'result'}, 'done')
+        assert [line['type'] for line in await reader] == ['progress', 'result']
+
+    async def test_follow_timeout(self):
+        job = SimulationJob(parse_job_params({'seed': 1}))
+        assert await collect(job, timeout=0.01) == []
+
+
+class TestJobManager:
+    """
+        Test the job cache
+    """
+    async def test_same_params_cached(self):
+        manager = JobManager(workers=1)
+        params = parse_job_params({'hands': 100, 'seed': 3})
+        job, cached = manager.submit(params)
+        assert not cached
+        assert (await collect(job, timeout=60))[-1]['type'] == 'result'
+        again, cached = manager.submit(dict(params))
+        assert cached and again is job
+        other, cached = manager.submit({**params, 'seed': 4})
+        assert not cached and other is not job
+        await collect(other, timeout=60)
+
+    async def test_unseeded_jobs_cached(self):
+        manager = JobManager(workers=1)
+        job, cached = manager.submit(parse_job_params({'hands': 100}))
+        assert not cached and isinstance(job.params['seed'], int)
+        again, cached = manager.submit(parse_job_params({'hands': 100}))
+        assert cached and again is job
+        await collect(job, timeout=60)
+
+    async def test_evicts_finished_jobs(self):
+        manager = JobManager(workers=1, max_cached=1)
+        first, _ = manager.submit(parse_job_params({'hands': 100, 'seed': 1}))
+        await collect(first, timeout=60)
+        second, _ = manager.submit(parse_job_params({'hands': 100, 'seed': 2}))
+        await collect(second, timeout=60)
+        assert manager.get(first.job_id) is None
+        assert manager.get(second.job_id) is second
+
+
+class TestJobViews:
+    """
+        Test the HTTP job API
+    """
+    async def test_stream_job(self):
+        client = AsyncClient()
+        response = await client.post('/api/blackjack/jobs/', {'hands': 200, 'seed': 11}, content_type='application/json')
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = await response_lines(response)
+        assert lines[0]['type'] == 'job' and not lines[0]['cached']
+        assert lines[-1]['type'] == 'result' and lines[-1]['result']['rounds'] == 200
+        # Repeated requests are served from the cache
+        response = await client.post('/api/blackjack/jobs/', {'hands': 200, 'seed': 11}, content_type='application/json')
+        lines = await response_lines(response)
+        assert lines[0]['cached'] and lines[-1]['type'] == 'result'
+        detail = (await client.get(f"/api/blackjack/jobs/{lines[0]['job_id']}/")).json()
+        assert detail['status'] == 'done'
+
+    async def test_invalid_params(self):
+        response = await AsyncClient().post('/api/blackjack/jobs/', {'strategy': 'psychic'},
+                                            content_type='application/json')
+        assert response.status_code == 400
+
+    async def test_unknown_job(self):
+        assert (await AsyncClient().get('/api/blackjack/jobs/nope/')).status_code == 404
+        assert (await AsyncClient().delete('/api/blackjack/jobs/nope/')).status_code == 404
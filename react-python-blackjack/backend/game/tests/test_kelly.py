@@ -0,0 +1,90 @@
+from game.ai_agent import BlackJackAI
+from game.kelly import EdgeTable, KellyBetSizer, MIN_BIN_ROUNDS, edge_table_path, load_edge_table, measure_edge_table
+from game.rules import DEFAULT_RULES, RULE_PROFILES
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def table():
+    """
+        Edge table with a 2% edge at +2 and above, variance 1.25
+    """
+    rounds = [MIN_BIN_ROUNDS] * 5
+    edges = np.array([-0.02, -0.01, 0.0, 0.01, 0.02])
+    return EdgeTable(-2, rounds, edges * MIN_BIN_ROUNDS, (1.25 + edges ** 2) * MIN_BIN_ROUNDS)
+
+
+class TestEdgeTable:
+    """
+        Test edge and variance bins
+    """
+    def test_counts_truncate_and_clamp(self, table):
+        assert table.edge(1.9) == pytest.approx(0.01)
+        assert table.edge(-1.5) == pytest.approx(-0.01)
+        assert table.edge(7) == pytest.approx(0.02)
+        assert table.edge(-9) == pytest.approx(-0.02)
+        assert table.variance(2) == pytest.approx(1.25)
+
+    def test_kelly_fraction_is_edge_over_variance(self, table):
+        assert table.kelly_fractions() == pytest.approx([0, 0, 0, 0.008, 0.016])
+
+    def test_sparse_bins_not_bet(self):
+        sparse = EdgeTable(0, [MIN_BIN_ROUNDS - 1], [100.0], [MIN_BIN_ROUNDS * 1.3])
+        assert sparse.kelly_fractions()[0] == 0
+
+    def test_full_kelly_maximizes_growth(self, table):
+        growth = [table.growth_rate(fraction) for fraction in (0.25, 0.5, 1.0, 1.5, 2.0)]
+        assert max(growth) == growth[2]
+        assert table.growth_rate(2.0) == pytest.approx(0, abs=1e-12)
+
+    def test_round_trip(self, table):
+        restored = EdgeTable.from_dict(table.to_dict())
+        assert np.array_equal(restored.rounds, table.rounds)
+        assert restored.edges == pytest.approx(table.edges)
+
+    def test_measure_is_reproducible(self):
+        first = measure_edge_table(num_rounds=20000, batch_size=2000, seed=3)
+        second = measure_edge_table(num_rounds=20000, batch_size=2000, seed=3)
+        assert first.rounds.sum() == 20000
+        assert first.to_dict() == second.to_dict()
+
+    def test_edge_rises_with_count(self):
+        table = load_edge_table('basic', 'hi-lo', DEFAULT_RULES, 0.75)
+        assert edge_table_path('basic', 'hi-lo', DEFAULT_RULES, 0.75).exists()
+        assert table.edge(4) > table.edge(0) > table.edge(-4)
+
+    @pytest.mark.parametrize('profile', list(RULE_PROFILES))
+    @pytest.mark.parametrize('strategy', ['simple', 'basic', 'conservative', 'optimal'])
+    def test_tables_shipped(self, profile, strategy):
+        assert edge_table_path(strategy, 'hi-lo', RULE_PROFILES[profile], 0.75).exists()
+
+    def test_missing_table(self):
+        with pytest.raises(ValueError, match='No edge table'):
+            load_edge_table('basic', 'hi-lo', DEFAULT_RULES, 0.6)
+
+
+class TestKellyBetSizer:
+    """
+        Test bet sizes
+    """
+    def test_bets_fraction_of_bankroll(self, table):
+        sizer = KellyBetSizer(table, fraction=0.5)
+        assert sizer.bet_size(2, base_bet=10, player_chips=10000) == 80
+
+    def test_bets_minimum_without_edge(self, table):
+        sizer = KellyBetSizer(table)
+        assert sizer.bet_size(-2, base_bet=10, player_chips=10000) == 10
+
+    def test_bet_capped(self, table):
+        assert KellyBetSizer(table, max_bet=100).bet_size(2, 10, 100000) == 100
+        assert KellyBetSizer(table).bet_size(2, 10, 5) == 5
+
+    def test_rejects_bad_fraction(self, table):
+        with pytest.raises(ValueError):
+            KellyBetSizer(table, fraction=1.5)
+
+    def test_ai_uses_bet_sizer(self, table):
+        ai = BlackJackAI(strategy='basic', bet_sizer=KellyBetSizer(table))
+        ai.true_count = 2.4
+        assert ai.get_bet_size(25, 10000) == 160
@@ -0,0 +1,105 @@
+from channels.testing import WebsocketCommunicator
+from channels.routing import URLRouter
+from django.test import Client, override_settings
+from django.urls import re_path
+from game.consumers import BlackJackConsumer
+from game.metrics import NULL_SPAN, Histogram, LatencyMetrics, metrics, render_registry
+import pytest
+
+
+@pytest.fixture
+def enabled_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+class TestLatencyMetrics:
+    """
+        Test the latency histograms and their Prometheus text format
+    """
+    def test_histogram_buckets(self):
+        histogram = Histogram(buckets=(0.001, 0.01))
+        for value in (0.0005, 0.001, 0.005, 2.0):
+            histogram.observe(value)
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.cumulative_counts() == [2, 3, 4]
+        assert histogram.count == 4 and histogram.sum == pytest.approx(2.0065)
+
+    def test_disabled_records_nothing(self):
+        latency = LatencyMetrics(enabled=False)
+        assert latency.span('engine') is NULL_SPAN
+        with latency.span('engine'):
+            latency.set_action('hit')
+        assert latency.histograms == {}
+
+    def test_spans_labelled_with_action(self):
+        latency = LatencyMetrics(enabled=True)
+        with latency.span('decode'):
+            latency.set_action('hit')
+        with latency.span('engine'):
+            pass
+        assert set(latency.histograms) == {('decode', 'hit'), ('engine', 'hit')}
+
+    def test_render(self):
+        latency = LatencyMetrics(enabled=True, buckets=(0.001,))
+        latency.observe('engine', 'hit', 0.0005)
+        latency.observe('engine', 'hit', 0.5)
+        assert latency.render('blackjack').splitlines() == [
+            '# HELP blackjack_action_seconds Time spent per stage of handling a WebSocket action',
+            '# TYPE blackjack_action_seconds histogram',
+            'blackjack_action_seconds_bucket{action="hit",stage="engine",le="0.001"} 1',
+            'blackjack_action_seconds_bucket{action="hit",stage="engine",le="+Inf"} 2',
+            'blackjack_action_seconds_sum{action="hit",stage="engine"} 0.5005',
+            'blackjack_action_seconds_count{action="hit",stage="engine"} 2',
+        ]
+
+    def test_render_registry(self):
+        text = render_registry('blackjack', {'live': 2, 'evicted': 1})
+        assert text.splitlines() == [
+            '# TYPE blackjack_games_live gauge', 'blackjack_games_live 2',
+            '# TYPE blackjack_games_evicted_total counter', 'blackjack_games_evicted_total 1',
+        ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+class TestConsumerMetrics:
+    """
+        Test the stages timed while the consumer handles actions
+    """
+    async def test_action_stages(self, enabled_metrics):
+        application = URLRouter([re_path(r'ws/blackjack/(?P<game_id>\w+)/$', BlackJackConsumer.as_asgi())])
+        communicator = WebsocketCommunicator(application, "/ws/blackjack/test/")
+        await communicator.connect()
+        await communicator.receive_json_from()  # Initial state
+        await communicator.send_json_to({'action': 'bet', 'amount': 100})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'cheat'})
+        await communicator.receive_json_from()
+        await communicator.disconnect()
+        for stage in ('decode', 'engine', 'serialize', 'send'):
+            assert enabled_metrics.histograms[(stage, 'bet')].count == 1
+        assert enabled_metrics.histograms[('decode', 'unknown')].count == 1
+
+
+class TestMetricsEndpoint:
+    """
+        Test the Prometheus metrics endpoint
+    """
+    def test_serves_metrics(self, enabled_metrics):
+        enabled_metrics.observe('engine', 'hit', 0.0001)
+        response = Client().get('/api/blackjack/metrics/')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        text = response.content.decode()
+        assert 'blackjack_action_seconds_count{action="hit",stage="engine"} 1' in text
+        assert '# TYPE blackjack_games_live gauge' in text
+
+    def test_disabled(self):
+        assert Client().get('/api/blackjack/metrics/').status_code == 404
+
+    def test_local_only(self, enabled_metrics):
+        with override_settings(GAME_METRICS={'ALLOWED_IPS': ['10.0.0.1']}):
+            assert Client().get('/api/blackjack/metrics/').status_code == 403
@@ -0,0 +1,97 @@
+from game.game_engine import BlackJackGame, Card, Deck, Suit, Rank
+from game.probability import DealerProbabilities, OUTCOMES, unseen_composition, card_index
+import pytest
+
+SIX_DECKS = (24, 24, 24, 24, 24, 24, 24, 24, 24, 96)
+
+
+def stack_deck(deck, codes):
+    """
+        Move the given card codes to the top of the shoe, in dealing order
+    """
+    for position, code in enumerate(codes):
+        other = deck.shoe.index(code, position)
+        deck.shoe[position], deck.shoe[other] = code, deck.shoe[position]
+
+
+def without(composition, index):
+    counts = list(composition)
+    counts[index] -= 1
+    return tuple(counts)
+
+
+@pytest.fixture
+def calculator():
+    return DealerProbabilities(maxsize=1000)
+
+
+class TestDealerProbabilities:
+    """
+        Test exact dealer outcome probabilities
+    """
+    @pytest.mark.parametrize("up_index", range(10))
+    def test_probabilities_sum_to_one(self, calculator, up_index):
+        outcomes = calculator.outcomes(up_index, without(SIX_DECKS, up_index))
+        assert sum(outcomes) == pytest.approx(1.0)
+
+    def test_only_tens_left(self, calculator):
+        # Dealer 7 + ten = hard 17, stands
+        outcomes = calculator.for_card(Card(Suit.HEARTS, Rank.SEVEN), (0,) * 9 + (10,))
+        assert outcomes['17'] == pytest.approx(1.0)
+
+    def test_ace_with_only_tens_is_blackjack(self, calculator):
+        outcomes = calculator.for_card(Card(Suit.HEARTS, Rank.ACE), (0,) * 9 + (10,))
+        assert outcomes['blackjack'] == pytest.approx(1.0)
+
+    def test_dealer_stands_on_soft_17(self, calculator):
+        # Ace + six is a soft 17, the dealer must stand
+        outcomes = calculator.for_card(Card(Suit.HEARTS, Rank.ACE), (0, 0, 0, 0, 0, 4, 0, 0, 0, 0))
+        assert outcomes['17'] == pytest.approx(1.0)
+
+    def test_dealer_draws_on_16(self, calculator):
+        # Six + ten = 16, the dealer draws another ten and busts
+        outcomes = calculator.for_card(Card(Suit.HEARTS, Rank.SIX), (0,) * 9 + (10,))
+        assert outcomes['bust'] == pytest.approx(1.0)
+
+    def test_six_deck_bust_rate_vs_six(self, calculator):
+        outcomes = calculator.outcomes(5, without(SIX_DECKS, 5))
+        assert outcomes[OUTCOMES.index('bust')] == pytest.approx(0.4228, abs=1e-3)
+
+    def test_results_are_memoized(self, calculator):
+        composition = without(SIX_DECKS, 9)
+        calculator.outcomes(9, composition)
+        misses = calculator.cache_info().misses
+        calculator.outcomes(9, composition)
+        assert calculator.cache_info().misses == misses
+
+
+class TestUnseenComposition:
+    """
+        Test shoe composition tracking
+    """
+    def test_fresh_deck_composition(self):
+        deck = Deck(num_decks=1)
+        assert deck.composition() == (4,) * 9 + (16,)
+
+    def test_composition_tracks_dealt_cards(self):
+        deck = Deck(num_decks=1)
+        card = deck.deal()
+        composition = deck.composition()
+        assert sum(composition) == 51
+        assert composition[card_index(card)] == (16 if card.value() == 10 else 4) - 1
+
+    def test_unseen_includes_hole_card(self):
+        game = BlackJackGame(num_decks=1)
+        game.place_bet(10)
+        game.start_round()
+        composition = unseen_composition(game)
+        assert sum(composition) == game.deck.remaining() + 1
+
+    def test_unseen_composition_of_known_deal(self):
+        game = BlackJackGame(num_decks=1)
+        # Player ten and seven, dealer hole five and up card six
+        stack_deck(game.deck, [9, 4, 6, 5])
+        game.place_bet(10)
+        game.start_round()
+        assert game.dealer_hand.cards[0].rank == Rank.FIVE
+        assert unseen_composition(game) == (4, 4, 4, 4, 4, 3, 3, 4, 4, 15)
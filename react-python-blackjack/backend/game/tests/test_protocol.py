@@ -0,0 +1,94 @@
+from game.game_engine import BlackJackGame
+from game.protocol import GameStateEncoder, apply_delta
+import copy
+import json
+import random
+import pytest
+
+
+def hide_dealer_card(game: BlackJackGame) -> bool:
+    return game.game_phase in ['betting', 'playing']
+
+
+def play_action(game: BlackJackGame, rng: random.Random):
+    """
+        Take a random step of a session
+    """
+    if game.game_phase == 'betting':
+        if not game.current_bet:
+            game.place_bet(rng.choice([10, 25, 50]))
+        else:
+            game.start_round()
+    elif game.game_phase == 'playing':
+        action = rng.choice([game.hit, game.stand, game.double_down, game.split, game.surrender, game.buy_insurance])
+        action()
+    else:
+        game.reset_round()
+
+
+class TestGameStateEncoder:
+    """
+        Test snapshot and delta encoding
+    """
+    @pytest.mark.parametrize('seed', range(5))
+    def test_deltas_rebuild_state(self, seed):
+        game = BlackJackGame(seed=seed)
+        game.player_chips = 100000
+        encoder = GameStateEncoder(game)
+        client = json.loads(json.dumps(encoder.snapshot(hide_dealer_card(game), ai_mode=False)))
+        rng = random.Random(seed)
+        for step in range(300):
+            play_action(game, rng)
+            delta = encoder.delta(hide_dealer_card(game), ai_mode=step > 150)
+            if delta is not None:
+                apply_delta(client, json.loads(json.dumps(delta)))
+            assert client['state'] == game.get_state(hide_dealer_card(game))
+            assert client['ai_mode'] == (step > 150)
+
+    def test_first_message_is_snapshot(self):
+        encoder = GameStateEncoder(BlackJackGame(seed=1))
+        message = encoder.delta()
+        assert message['type'] == 'game_state' and message['seq'] == 1
+
+    def test_hole_card_revealed(self):
+        game = BlackJackGame(seed=1)
+        game.place_bet(10)
+        game.start_round()
+        encoder = GameStateEncoder(game)
+        encoder.snapshot(hide_dealer_card=True)
+        game.game_phase = 'finished'
+        delta = encoder.delta(hide_dealer_card=False)
+        assert delta['set']['dealer_hand.cards.0'] == game.dealer_hand.cards[0].to_dict()
+
+    def test_nothing_changed(self):
+        encoder = GameStateEncoder(BlackJackGame(seed=1))
+        encoder.snapshot()
+        assert encoder.delta() is None
+        assert encoder.seq == 1
+
+    def test_hit_appends_card(self):
+        game = BlackJackGame(seed=3)
+        game.place_bet(10)
+        game.start_round()
+        while game.game_phase != 'playing' or game.player_hands[0].value() >= 21:
+            game.reset_round()
+            game.place_bet(10)
+            game.start_round()
+        encoder = GameStateEncoder(game)
+        snapshot = encoder.snapshot()
+        game.hit()
+        delta = encoder.delta(hide_dealer_card(game))
+        assert delta['append']['player_hands.0.cards'] == [game.player_hands[0].cards[-1].to_dict()]
+        assert delta['set']['deck_remaining'] == game.deck.remaining()
+        if game.game_phase == 'playing':
+            assert len(json.dumps(delta)) * 3 < len(json.dumps(snapshot))
+
+    def test_sequence_gap(self):
+        game = BlackJackGame(seed=1)
+        encoder = GameStateEncoder(game)
+        client = copy.deepcopy(encoder.snapshot())
+        game.place_bet(10)
+        encoder.delta()
+        game.start_round()
+        with pytest.raises(ValueError):
+            apply_delta(client, encoder.delta())
@@ -0,0 +1,75 @@
+from django.test import override_settings
+from game.registry import GameRegistry, registry_from_settings
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGameRegistry:
+    """
+        Test capacity, idle eviction and snapshot-on-evict
+    """
+    def test_capacity_evicts_least_recently_used(self):
+        evicted = []
+        registry = GameRegistry(capacity=2)
+        for key in 'abc':
+            if key == 'c':
+                registry['a']      # a is now more recently used than b
+            registry.add(key, key.upper(), on_evict=lambda value, data: evicted.append(value))
+        assert list(registry) == ['a', 'c']
+        assert evicted == ['B']
+        assert registry.stats() == {'live': 2, 'capacity': 2, 'evicted': 1, 'expired': 0, 'restored': 0}
+
+    def test_idle_entries_expire(self):
+        clock = FakeClock()
+        evicted = []
+        registry = GameRegistry(idle_ttl=10, clock=clock)
+        registry.add('a', 'A', on_evict=lambda value, data: evicted.append(value))
+        registry.add('b', 'B')
+        clock.now = 8
+        assert registry['b'] == 'B'
+        clock.now = 15
+        assert registry.get('a') is None
+        assert registry.get('b') == 'B'
+        assert evicted == ['A'] and registry.expired == 1
+        clock.now = 30
+        registry.add('c', 'C')
+        assert list(registry) == ['c']
+
+    def test_snapshot_on_evict(self):
+        snapshots = []
+        registry = GameRegistry(capacity=1, snapshot=str.encode)
+        registry.add('a', 'game', on_evict=lambda value, data: snapshots.append(data))
+        registry.add('b', 'other', restored=True)
+        assert snapshots == [b'game']
+        assert registry.restored == 1
+
+    def test_removal_is_not_eviction(self):
+        evicted = []
+        registry = GameRegistry(idle_ttl=-1)
+        registry.add('a', 'A', on_evict=lambda value, data: evicted.append(value))
+        registry.add('b', 'B', on_evict=lambda value, data: evicted.append(value))
+        assert registry.pop('b') == 'B'
+        assert registry.pop('b', None) is None
+        assert evicted == ['A'] and not registry
+
+    def test_failing_callback(self):
+        registry = GameRegistry(capacity=1)
+        registry.add('a', 'A', on_evict=lambda value, data: 1 / 0)
+        registry.add('b', 'B')
+        assert list(registry) == ['b']
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            GameRegistry(capacity=0)
+
+    def test_from_settings(self):
+        with override_settings(GAME_REGISTRY={'CAPACITY': 5, 'IDLE_TTL': 60, 'SNAPSHOT_ON_EVICT': False}):
+            registry = registry_from_settings(snapshot=str.encode)
+        assert (registry.capacity, registry.idle_ttl, registry.snapshot) == (5, 60, None)
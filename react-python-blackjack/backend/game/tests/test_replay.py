@@ -0,0 +1,102 @@
+from game.ai_agent import BlackJackAI
+from game.game_engine import BlackJackGame, Deck, RoundRecord
+from game.replay import apply_action, replay_round, replay_session
+from game.runner import play_round
+import pytest
+
+
+def play_session(game, rounds=30):
+    ai = BlackJackAI(strategy='basic')
+    snapshots = []
+    for _ in range(rounds):
+        game.player_chips = 1000
+        play_round(game, ai, 10)
+        snapshots.append((game.get_state(), game.player_chips))
+        game.reset_round()
+    return snapshots
+
+
+class TestSeededGames:
+    """
+        Test per game generators
+    """
+    def test_same_seed_same_cards(self):
+        first = BlackJackGame(seed=7)
+        second = BlackJackGame(seed=7)
+        assert first.deck.cards[:20] == second.deck.cards[:20]
+
+    def test_games_have_independent_generators(self):
+        assert BlackJackGame(seed=1).rng is not BlackJackGame(seed=1).rng
+
+    def test_shoe_seed_determines_order(self):
+        deck = Deck(num_decks=2)
+        order = list(deck.shoe)
+        other = Deck(num_decks=2)
+        other.restore(deck.shoe_seed, 0)
+        assert list(other.shoe) == order
+
+    def test_restore_updates_composition(self):
+        deck = Deck(num_decks=1)
+        for _ in range(10):
+            deck.deal()
+        other = Deck(num_decks=1)
+        other.restore(deck.shoe_seed, 10)
+        assert other.composition() == deck.composition()
+        assert other.cards[:] == deck.cards[:]
+
+
+class TestRoundRecords:
+    """
+        Test compact round records
+    """
+    def test_round_is_recorded(self):
+        game = BlackJackGame(seed=3)
+        game.place_bet(10)
+        game.start_round()
+        if game.game_phase == 'playing':
+            game.stand()
+        record = game.history[-1]
+        assert record is game.round_record
+        assert record.bet == 10
+        assert record.chips == 1000
+        assert record.actions in ('', 's')
+
+    def test_encode_round_trip(self):
+        record = RoundRecord(0xdeadbeef, 42, 990, 20, 'hpsd')
+        assert RoundRecord.decode(record.encode()) == record
+
+    def test_history_is_bounded(self):
+        game = BlackJackGame(seed=3, history_limit=5)
+        play_session(game, rounds=8)
+        assert len(game.history) == 5
+
+    def test_unknown_action_code(self):
+        with pytest.raises(ValueError):
+            apply_action(BlackJackGame(), 'x')
+
+
+class TestReplay:
+    """
+        Test rebuilding past rounds from records
+    """
+    def test_replay_every_round(self):
+        game = BlackJackGame(seed=11)
+        snapshots = play_session(game)
+        for record, (state, chips) in zip(game.history, snapshots):
+            replayed = replay_round(record.encode())
+            assert replayed.get_state() == state
+            assert replayed.player_chips == chips
+
+    def test_replay_partial_round(self):
+        game = BlackJackGame(seed=5)
+        play_session(game, rounds=20)
+        record = next(record for record in game.history if len(record.actions) > 1)
+        replayed = replay_round(record, steps=0)
+        assert replayed.game_phase == 'playing'
+        assert len(replayed.player_hands[0].cards) == 2
+
+    def test_replay_continuous_shuffler_session(self):
+        game = BlackJackGame(seed=21, continuous_shuffle=True)
+        snapshots = play_session(game, rounds=15)
+        replayed = replay_session(21, [record.encode() for record in game.history], continuous_shuffle=True)
+        assert replayed.get_state() == snapshots[-1][0]
@@ -0,0 +1,179 @@
+from game.ai_agent import BlackJackAI
+from game.expected_value import solver_for, expected_value_solver, full_shoe
+from game.game_engine import BlackJackGame
+from game.probability import DealerProbabilities, BUST
+from game.rules import DEFAULT_RULES, RULE_PROFILES, RuleSet, get_rules
+from game.simulator import BatchSimulator
+from game.strategy import StrategyTable, derive_chart, load_strategy_table, make_hand, strategy_chart_path, strategy_table_for
+import numpy as np
+import pytest
+
+
+def deal(game: BlackJackGame, player, dealer, bet: int = 100):
+    """
+        Start a round with fixed cards (values, Ace = 1)
+    """
+    game.place_bet(bet)
+    game.player_hands = [make_hand(player)]
+    game.player_hands[0].bet = bet
+    game.dealer_hand = make_hand(dealer)
+    game.current_hand_index = 0
+    game.game_phase = 'playing'
+
+
+class TestRuleProfiles:
+    """
+        Test rule sets
+    """
+    def test_profile_keys_are_unique(self):
+        keys = [rules.key for rules in RULE_PROFILES.values()]
+        assert len(set(keys)) == len(keys)
+
+    def test_default_key(self):
+        assert DEFAULT_RULES.key == '6d-s17-3to2-das-splitany-early'
+
+    def test_get_rules(self):
+        assert get_rules() is DEFAULT_RULES
+        assert get_rules('downtown') is RULE_PROFILES['downtown']
+        with pytest.raises(ValueError):
+            get_rules('european')
+
+    def test_with_decks(self):
+        rules = RULE_PROFILES['vegas-strip'].with_decks(2)
+        assert rules.num_decks == 2 and rules.surrender == 'late'
+        assert rules != RULE_PROFILES['vegas-strip']
+
+    def test_round_trip(self):
+        rules = RULE_PROFILES['single-deck-6-5']
+        assert RuleSet.from_dict(rules.to_dict()) == rules
+
+    def test_rejects_unknown_surrender(self):
+        with pytest.raises(ValueError):
+            RuleSet('bad', surrender='sometimes')
+
+
+class TestEngineRules:
+    """
+        Test the engine under rule profiles
+    """
+    def test_profile_sets_decks(self):
+        assert BlackJackGame(rules='downtown').deck.remaining() == 104
+        assert BlackJackGame(num_decks=1, rules='downtown').rules.num_decks == 1
+
+    def test_dealer_soft_17(self):
+        for profile, hits in (('classic', False), ('downtown', True)):
+            game = BlackJackGame(rules=profile)
+            deal(game, [10, 8], [1, 6])
+            assert game.dealer_must_hit() is hits
+
+    def test_six_to_five_payout(self):
+        game = BlackJackGame(rules='single-deck-6-5')
+        deal(game, [1, 10], [10, 7], bet=10)
+        game.resolve_bets()
+        assert game.hand_results[0]['payout'] == 12
+        assert game.player_chips == 1000 + 12
+
+    def test_late_surrender_loses_to_blackjack(self):
+        game = BlackJackGame(rules='vegas-strip')
+        deal(game, [10, 6], [1, 10])
+        assert game.surrender()
+        assert game.hand_results[0]['result'] == 'lose'
+        assert game.player_chips == 900
+
+    def test_late_surrender_refunds_half(self):
+        game = BlackJackGame(rules='vegas-strip')
+        deal(game, [10, 6], [10, 9])
+        assert game.surrender()
+        assert game.hand_results[0]['result'] == 'surrender'
+        assert game.player_chips == 950
+
+    def test_early_surrender_beats_blackjack(self):
+        game = BlackJackGame()
+        deal(game, [10, 6], [1, 10])
+        assert game.surrender()
+        assert game.player_chips == 950
+
+    def test_no_surrender(self):
+        game = BlackJackGame(rules='downtown')
+        deal(game, [10, 6], [10, 9])
+        assert not game.can_surrender()
+        assert not game.surrender()
+
+    def test_no_double_after_split(self):
+        game = BlackJackGame(rules='single-deck-6-5')
+        deal(game, [8, 8], [10, 9])
+        assert game.split()
+        assert not game.can_double()
+        assert not game.double_down()
+
+    def test_split_limit(self):
+        game = BlackJackGame(rules='single-deck-6-5')
+        deal(game, [8, 8], [10, 9])
+        assert game.split()
+        game.player_hands[0].cards = make_hand([8, 8]).cards
+        assert not game.can_split()
+        assert not game.split()
+
+    def test_state_names_rules(self):
+        assert BlackJackGame(rules='atlantic-city').get_state()['rules'] == 'atlantic-city'
+
+
+class TestRuleStrategies:
+    """
+        Test solvers and strategy tables per rule set
+    """
+    def test_default_rules_use_shipped_chart(self):
+        assert strategy_table_for(DEFAULT_RULES) is load_strategy_table()
+        assert strategy_table_for(DEFAULT_RULES.with_decks(2)) is load_strategy_table()
+        assert BlackJackAI().strategy_table is load_strategy_table()
+
+    @pytest.mark.parametrize('profile', [name for name in RULE_PROFILES if name != 'classic'])
+    def test_profile_charts_are_cached_on_disk(self, profile):
+        rules = RULE_PROFILES[profile]
+        assert strategy_chart_path(rules).exists()
+        assert strategy_table_for(rules) is strategy_table_for(rules)
+        assert BlackJackAI(rules=profile).strategy_table is strategy_table_for(rules)
+
+    def test_derived_chart_parses(self):
+        chart = derive_chart(RULE_PROFILES['vegas-strip'].with_decks(1))
+        table = StrategyTable(chart)
+        assert table.action(make_hand([10, 1]), make_hand([6]).cards[0], True, False, True) == 'stand'
+        assert table.action(make_hand([6, 5]), make_hand([6]).cards[0], True, False, True) == 'double'
+
+    def test_dealer_hits_soft_17_busts_more(self):
+        composition = full_shoe(6, exclude=tuple(make_hand([6]).cards))
+        stands = DealerProbabilities().outcomes(5, composition)
+        hits = DealerProbabilities(hit_soft_17=True).outcomes(5, composition)
+        assert hits[BUST] > stands[BUST]
+        assert sum(hits) == pytest.approx(1.0)
+
+    def test_solver_follows_payout_and_surrender(self):
+        hand, up_card = make_hand([1, 10]), make_hand([9]).cards[0]
+        composition = full_shoe(1, exclude=tuple(hand.cards) + (up_card,))
+        assert solver_for(DEFAULT_RULES) is expected_value_solver
+        three_two = expected_value_solver.action_values(hand, up_card, composition)['stand']
+        six_five = solver_for(RULE_PROFILES['single-deck-6-5']).action_values(hand, up_card, composition)['stand']
+        assert six_five == pytest.approx(three_two * 1.2 / 1.5)
+        hand = make_hand([10, 6])
+        late = solver_for(RULE_PROFILES['vegas-strip']).action_values(hand, make_hand([1]).cards[0], composition, True, False, True)
+        assert late['surrender'] < -0.5
+        none = solver_for(RULE_PROFILES['downtown']).action_values(hand, make_hand([1]).cards[0], composition, True, False, True)
+        assert 'surrender' not in none
+
+
+class TestSimulatorRules:
+    """
+        Test the batch simulator under rule profiles
+    """
+    def test_six_to_five_chips(self):
+        simulator = BatchSimulator(BlackJackAI(rules='single-deck-6-5'), num_shoes=5000, seed=8)
+        assert simulator.shoe_size == 52
+        bets = np.full(5000, 10, dtype=np.int64)
+        nets = np.concatenate([simulator.play_round(bets, np.full(5000, 10 ** 6, dtype=np.int64)) for _ in range(4)])
+        assert 12 in nets and 15 not in nets
+
+    def test_no_surrender_or_extra_splits(self):
+        simulator = BatchSimulator(BlackJackAI(rules='single-deck-6-5'), num_shoes=5000, seed=8)
+        assert simulator.max_hands == 2
+        returns = np.concatenate([simulator.play_round() for _ in range(10)])
+        assert -0.5 not in returns
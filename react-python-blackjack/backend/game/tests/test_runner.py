@@ -0,0 +1,84 @@
+from array import array
+from game.ai_agent import BlackJackAI
+from game.game_engine import BlackJackGame, Rank
+from game.runner import SimulationRunner, play_round, run_shard
+from game.simulator import SimulationResult
+from itertools import permutations
+
+
+class TestPlayRound:
+    """
+        Test synchronous AI rounds
+    """
+    def test_round_finishes(self):
+        game = BlackJackGame(seed=1)
+        ai = BlackJackAI(strategy='basic')
+        for _ in range(20):
+            assert play_round(game, ai, 10) is True
+            assert game.game_phase == 'finished'
+            game.reset_round()
+
+    def test_rejects_unaffordable_bet(self):
+        game = BlackJackGame(seed=1)
+        assert play_round(game, BlackJackAI(strategy='basic'), 5000) is False
+
+    def test_ai_sees_up_card(self):
+        seen = []
+
+        class RecordingAI(BlackJackAI):
+            def get_action(self, player_hand, dealer_card, *args, **kwargs):
+                seen.append(dealer_card.rank)
+                return 'stand'
+
+        game = BlackJackGame(seed=1)
+        # Player ten and seven, dealer hole five and up card six
+        game.deck.shoe[:4] = array('B', [9, 4, 6, 5])
+        play_round(game, RecordingAI(strategy='basic'), 10)
+        assert seen == [Rank.SIX]
+
+
+class TestRunShard:
+    """
+        Test seeded shards
+    """
+    def test_same_seed_same_result(self):
+        first = run_shard('basic', 6, 300, seed=42, shard_index=3)
+        second = run_shard('basic', 6, 300, seed=42, shard_index=3)
+        assert first.to_dict() == second.to_dict()
+
+    def test_shards_use_independent_streams(self):
+        first = run_shard('basic', 6, 300, seed=42, shard_index=0)
+        second = run_shard('basic', 6, 300, seed=42, shard_index=1)
+        assert first.total_squared != second.total_squared or first.total_return != second.total_return
+
+
+class TestSimulationRunner:
+    """
+        Test the multi-process runner
+    """
+    def test_shard_sizes(self):
+        runner = SimulationRunner(num_rounds=2500, shard_size=1000, seed=1)
+        assert runner.shards() == [1000, 1000, 500]
+
+    def test_progress_is_streamed(self):
+        runner = SimulationRunner(num_rounds=1500, shard_size=500, seed=1, workers=2)
+        updates = list(runner.progress())
+        assert len(updates) == 3
+        assert [update['rounds_done'] for update in updates] == [500, 1000, 1500]
+        low, high = updates[-1]['result']['confidence_interval']
+        assert low <= updates[-1]['result']['ev'] <= high
+
+    def test_results_independent_of_worker_count(self):
+        single = SimulationRunner(num_rounds=2000, shard_size=400, seed=9, workers=1).run()
+        multi = SimulationRunner(num_rounds=2000, shard_size=400, seed=9, workers=3).run()
+        assert single.to_dict() == multi.to_dict()
+
+    def test_merge_order_independent_under_6_to_5(self):
+        shards = [run_shard('basic', None, 300, 7, index, 'single-deck-6-5') for index in range(4)]
+        totals = set()
+        for order in permutations(shards):
+            merged = SimulationResult(unit_bet=10)
+            for shard in order:
+                merged.merge(shard)
+            totals.add((merged.total_return, merged.total_squared, merged.ev))
+        assert len(totals) == 1
@@ -0,0 +1,114 @@
+from game.ai_agent import BlackJackAI
+from game.game_engine import Hand, Card, Suit, Rank
+from game.simulator import (BatchSimulator, SimulationResult, compile_policy, simulate,
+                            STAND, HIT, DOUBLE, SPLIT, SURRENDER, SOFT_OFFSET, PAIR_OFFSET)
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def basic_policy():
+    return compile_policy(BlackJackAI(strategy='basic'))
+
+
+class TestPolicyCompilation:
+    """
+        Test compiling AI strategies into lookup tables
+    """
+    def test_policy_shape(self, basic_policy):
+        assert basic_policy.shape == (42, 11, 8)
+
+    def test_hard_16_vs_10_surrenders_when_allowed(self, basic_policy):
+        assert basic_policy[16, 10, 0b101] == SURRENDER
+        assert basic_policy[16, 10, 0b100] == HIT
+
+    def test_hard_11_doubles_only_when_allowed(self, basic_policy):
+        assert basic_policy[11, 6, 0b100] == DOUBLE
+        assert basic_policy[11, 6, 0b000] == HIT
+
+    def test_pair_of_eights_splits(self, basic_policy):
+        assert basic_policy[PAIR_OFFSET + 7, 10, 0b110] == SPLIT
+
+    def test_soft_19_stands(self, basic_policy):
+        assert basic_policy[SOFT_OFFSET + 7, 10, 0b100] == STAND
+
+    def test_policy_matches_ai_decision(self, basic_policy):
+        ai = BlackJackAI(strategy='basic')
+        hand = Hand()
+        hand.add_card(Card(Suit.HEARTS, Rank.TEN))
+        hand.add_card(Card(Suit.DIAMONDS, Rank.TWO))
+        action = ai.get_action(hand, Card(Suit.CLUBS, Rank.FIVE), can_double=False)
+        assert action == 'stand'
+        assert basic_policy[12, 5, 0] == STAND
+
+    def test_conservative_policy_never_doubles_or_splits(self):
+        policy = compile_policy(BlackJackAI(strategy='conservative'))
+        assert not np.isin(policy, [DOUBLE, SPLIT, SURRENDER]).any()
+
+
+class TestSimulationResult:
+    """
+        Test aggregate statistics
+    """
+    def test_empty_result(self):
+        result = SimulationResult()
+        assert result.ev == 0.0
+        assert result.variance == 0.0
+
+    def test_aggregates(self):
+        result = SimulationResult()
+        result.add(np.array([1.0, -1.0, 0.0, 1.5]))
+        assert result.rounds == 4
+        assert result.wins == 2
+        assert result.losses == 1
+        assert result.pushes == 1
+        assert result.ev == pytest.approx(0.375)
+        assert result.variance == pytest.approx((1 + 1 + 0 + 2.25) / 4 - 0.375 ** 2)
+
+    def test_sums_whole_chips(self):
+        result = SimulationResult(unit_bet=10)
+        result.add(np.array([1.2, -0.5, 0.1 + 0.2]))
+        assert (result.total_chips, result.total_squared_chips) == (10, 12 ** 2 + 5 ** 2 + 3 ** 2)
+        assert result.total_return == 1.0
+
+    def test_merge_needs_same_unit_bet(self):
+        with pytest.raises(ValueError):
+            SimulationResult(unit_bet=2).merge(SimulationResult(unit_bet=10))
+
+
+class TestBatchSimulator:
+    """
+        Test the vectorized simulator
+    """
+    def test_runs_requested_rounds(self):
+        result = simulate(BlackJackAI(strategy='basic'), 2500, num_shoes=1000, seed=1)
+        assert result.rounds == 2500
+        assert result.wins + result.losses + result.pushes == 2500
+
+    def test_seed_is_reproducible(self):
+        first = simulate(BlackJackAI(strategy='basic'), 5000, num_shoes=1000, seed=7)
+        second = simulate(BlackJackAI(strategy='basic'), 5000, num_shoes=1000, seed=7)
+        assert first.to_dict() == second.to_dict()
+
+    def test_returns_within_payout_bounds(self):
+        simulator = BatchSimulator(BlackJackAI(strategy='basic'), num_shoes=2000, seed=3)
+        for _ in range(5):
+            returns = simulator.play_round()
+            # Four doubled hands plus insurance is the widest possible swing
+            assert returns.min() >= -8.5
+            assert returns.max() <= 9.0
+            # Every outcome is a multiple of half a bet
+            assert np.all(returns * 2 == np.round(returns * 2))
+
+    def test_shoes_reshuffle_when_low(self):
+        simulator = BatchSimulator(BlackJackAI(strategy='simple'), num_decks=1, num_shoes=10, seed=3)
+        for _ in range(50):
+            simulator.play_round()
+        assert np.all(simulator.cursor <= simulator.shoe_size)
+
+    @pytest.mark.slow
+    def test_basic_beats_simple(self):
+        basic = simulate(BlackJackAI(strategy='basic'), 200000, seed=11)
+        simple = simulate(BlackJackAI(strategy='simple'), 200000, seed=11)
+        assert -0.03 < basic.ev < 0.03
+        assert basic.ev > simple.ev
@@ -0,0 +1,103 @@
+from game.game_engine import BlackJackGame
+from game.rules import RuleSet
+from game.snapshot import dump_game, load_game
+from game.table import BlackJackTable
+import random
+import pytest
+
+
+def play_action(game: BlackJackGame, rng: random.Random):
+    """
+        Take a random step of a session
+    """
+    if game.game_phase == 'betting':
+        if not game.current_bet:
+            game.place_bet(rng.choice([10, 25, 50]))
+        else:
+            game.start_round()
+    elif game.game_phase == 'playing':
+        action = rng.choice([game.hit, game.stand, game.double_down, game.split, game.surrender, game.buy_insurance])
+        action()
+    else:
+        game.reset_round()
+
+
+def game_fields(game: BlackJackGame):
+    return (game.get_state(hide_dealer_card=False), game.seed, game.rules, game.deck.shoe_seed, game.deck.cursor,
+            list(game.deck.shoe), game.deck.counts, [hand.actions for hand in game.player_hands],
+            [record.encode() for record in game.history], game.round_record)
+
+
+class TestSnapshot:
+    """
+        Test binary game snapshots
+    """
+    @pytest.mark.parametrize('seed', range(4))
+    def test_restore_every_action(self, seed):
+        game = BlackJackGame(seed=seed, continuous_shuffle=seed % 2 == 1)
+        game.player_chips = 100000
+        rng = random.Random(seed)
+        for _ in range(300):
+            play_action(game, rng)
+            restored = load_game(dump_game(game))
+            assert game_fields(restored)[:-2] == game_fields(game)[:-2]
+            assert restored.round_record == game.round_record
+
+    def test_restored_game_plays_on_identically(self):
+        game = BlackJackGame(seed=9, num_decks=1)
+        game.player_chips = 100000
+        rng = random.Random(1)
+        for _ in range(100):
+            play_action(game, rng)
+        restored = load_game(dump_game(game, include_history=True))
+        first, second = random.Random(2), random.Random(2)
+        # Long enough to reshuffle the single deck shoe several times
+        for _ in range(500):
+            play_action(game, first)
+            play_action(restored, second)
+        assert game_fields(restored) == game_fields(game)
+
+    def test_history(self):
+        game = BlackJackGame(seed=3, history_limit=50)
+        game.player_chips = 100000
+        rng = random.Random(3)
+        for _ in range(200):
+            play_action(game, rng)
+        assert len(load_game(dump_game(game)).history) == 1
+        restored = load_game(dump_game(game, include_history=True))
+        assert list(restored.history) == list(game.history)
+        assert restored.history.maxlen == 50
+        assert restored.round_record is restored.history[-1]
+
+    def test_rules(self):
+        assert load_game(dump_game(BlackJackGame(rules='downtown'))).rules.description
+        custom = RuleSet('house', num_decks=3, blackjack_pays=(6, 5), surrender='late')
+        restored = load_game(dump_game(BlackJackGame(rules=custom, seed='lucky')))
+        assert restored.rules == custom and restored.rules.name == 'house'
+        assert restored.seed == 'lucky'
+        assert load_game(dump_game(BlackJackGame(num_decks=2))).rules.num_decks == 2
+
+    def test_compact(self):
+        game = BlackJackGame(seed=1)
+        game.place_bet(10)
+        game.start_round()
+        assert len(dump_game(game)) < 3200
+
+    def test_table_seats_rejected(self):
+        table = BlackJackTable('t1', seed=1)
+        with pytest.raises(TypeError):
+            dump_game(table.join('alice', 1000))
+
+    @pytest.mark.parametrize('damage', [
+        lambda data: data[:-1],
+        lambda data: data + b'\0',
+        lambda data: b'XXXX' + data[4:],
+        lambda data: data[:4] + b'\x09' + data[5:],
+        lambda data: data[:40],
+    ])
+    def test_invalid_data(self, damage):
+        game = BlackJackGame(seed=1)
+        game.place_bet(10)
+        game.start_round()
+        with pytest.raises(ValueError):
+            load_game(damage(dump_game(game)))
@@ -0,0 +1,142 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from game.game_engine import BlackJackGame
+from game.history import HandHistoryRecorder, MemoryHandSink
+from game.statistics import StatisticsAggregator, StatisticsDelta
+import pytest
+
+
+def hand(result, payout, bet=10, blackjack=False, bust=False, doubled=False):
+    return {
+        'result': result,
+        'payout': payout,
+        'player_bet': bet,
+        'player_blackjack': blackjack,
+        'player_bust': bust,
+        'was_doubled': doubled,
+    }
+
+
+WIN = hand('win', 10)
+LOSS = hand('lose', -10)
+PUSH = hand('push', 0)
+
+
+def fold(delta, *results):
+    for result in results:
+        delta.add_hand(result)
+    return delta
+
+
+class TestStatisticsDelta:
+    """
+        Test in-memory folding of hands
+    """
+    def test_counters(self):
+        delta = StatisticsDelta()
+        delta.add_hand(hand('blackjack', 15, blackjack=True), ai_mode=True)
+        delta.add_hand(hand('lose', -20, bet=20, bust=True, doubled=True))
+        delta.add_hand(hand('win', 10, doubled=True))
+        delta.add_hand(hand('surrender', -5))
+        delta.add_hand(PUSH, ai_mode=True)
+        counters = delta.counters
+        assert counters['total_hands'] == 5
+        assert counters['total_wagered'] == 60
+        assert counters['total_won'] == 25
+        assert counters['net_profit'] == 0
+        assert (counters['hands_won'], counters['hands_lost'], counters['hands_pushed']) == (2, 2, 1)
+        assert (counters['blackjacks'], counters['busts'], counters['double_wins']) == (1, 1, 1)
+        assert (counters['ai_hands_played'], counters['ai_hands_won']) == (2, 1)
+        assert delta.bests['biggest_win'] == 15
+        assert delta.bests['biggest_loss'] == 20
+
+    def test_streaks(self):
+        delta = fold(StatisticsDelta(), WIN, WIN, PUSH, WIN, LOSS, LOSS)
+        assert delta.current_streak == -2
+        assert delta.bests['longest_win_streak'] == 3
+        assert delta.bests['longest_lose_streak'] == 2
+        assert delta.first_run == 3
+        assert delta.streak_from_start is False
+
+    def test_highest_chips(self):
+        delta = StatisticsDelta()
+        delta.add_round([WIN], chips=1200)
+        delta.add_round([LOSS], chips=1190)
+        assert delta.bests['highest_chips'] == 1200
+
+    def test_update_uses_expressions(self):
+        delta = fold(StatisticsDelta(), WIN)
+        delta.new_sessions = 1
+        update = delta.as_update()
+        assert update['total_hands'] == F('total_hands') + 1
+        assert update['total_sessions'] == F('total_sessions') + 1
+        assert update['biggest_win'] == Greatest(F('biggest_win'), 10)
+        assert update['current_streak'] == 1
+        assert 'hands_lost' not in update
+
+
+class TestContinueStreak:
+    """
+        Test continuing the stored streak into a session
+    """
+    def test_unbroken_run_extends_stored_streak(self):
+        delta = fold(StatisticsDelta(), WIN, WIN)
+        delta.continue_streak(3)
+        assert delta.current_streak == 5
+        assert delta.bests['longest_win_streak'] == 5
+
+    def test_broken_run_only_updates_longest(self):
+        delta = fold(StatisticsDelta(), WIN, LOSS)
+        delta.continue_streak(4)
+        assert delta.current_streak == -1
+        assert delta.bests['longest_win_streak'] == 5
+
+    def test_opposite_run_ignores_stored_streak(self):
+        delta = fold(StatisticsDelta(), LOSS)
+        delta.continue_streak(4)
+        assert delta.current_streak == -1
+        assert delta.bests['longest_win_streak'] == 0
+
+    def test_only_pushes_keep_stored_streak(self):
+        delta = fold(StatisticsDelta(), PUSH)
+        delta.continue_streak(-2)
+        assert delta.current_streak == -2
+
+
+@pytest.mark.asyncio
+class TestStatisticsAggregator:
+    """
+        Test batching without a database
+    """
+    async def test_one_update_per_flush(self, monkeypatch):
+        applied = []
+        aggregator = StatisticsAggregator(user_id=1)
+
+        def apply(delta):
+            applied.append(delta.as_update())
+            return {'current_streak': 2} if len(applied) == 1 else None
+
+        monkeypatch.setattr(aggregator, 'apply', apply)
+        game = BlackJackGame(seed=1)
+        game.hand_results = [WIN, WIN]
+        aggregator.record_round(game)
+        await aggregator.flush()
+        await aggregator.flush()    # nothing pending
+        game.hand_results = [WIN]
+        aggregator.record_round(game)
+        await aggregator.flush()
+        assert len(applied) == 2
+        assert applied[0]['total_sessions'] == F('total_sessions') + 1
+        assert applied[1]['total_hands'] == F('total_hands') + 1
+        assert applied[1]['current_streak'] == 5
+
+    async def test_flushed_with_hand_history(self):
+        flushed = []
+
+        async def listener():
+            flushed.append(True)
+
+        recorder = HandHistoryRecorder(MemoryHandSink())
+        recorder.add_flush_listener(listener)
+        await recorder.close()
+        assert flushed == [True]
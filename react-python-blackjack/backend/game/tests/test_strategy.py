@@ -0,0 +1,106 @@
+from game.ai_agent import BlackJackAI
+from game.game_engine import Hand, Card, Suit, Rank
+from game.strategy import StrategyTable, load_strategy_table, DEFAULT_CHART
+import copy
+import json
+import pytest
+
+
+def make_hand(*ranks):
+    hand = Hand()
+    for rank in ranks:
+        hand.add_card(Card(Suit.HEARTS, rank))
+    return hand
+
+
+@pytest.fixture(scope='module')
+def default_chart():
+    with open(DEFAULT_CHART) as chart_file:
+        return json.load(chart_file)
+
+
+@pytest.fixture(scope='module')
+def table():
+    return load_strategy_table()
+
+
+class TestStrategyTableLoading:
+    """
+        Test loading strategy charts
+    """
+    def test_default_table_is_cached(self):
+        assert load_strategy_table() is load_strategy_table()
+
+    def test_default_table_name(self, table):
+        assert table.name == 'basic'
+
+    def test_rejects_short_rows(self, default_chart):
+        chart = copy.deepcopy(default_chart)
+        chart['hard']['12'] = 'H H S'
+        with pytest.raises(ValueError):
+            StrategyTable(chart)
+
+    def test_rejects_unknown_codes(self, default_chart):
+        chart = copy.deepcopy(default_chart)
+        chart['soft']['18'] = 'X  S  S  S  S  S  S  S  S  S'
+        with pytest.raises(ValueError):
+            StrategyTable(chart)
+
+    def test_load_from_file(self, tmp_path, default_chart):
+        path = tmp_path / 'chart.json'
+        path.write_text(json.dumps(default_chart))
+        assert StrategyTable.load(path).name == 'basic'
+
+
+class TestStrategyTableLookup:
+    """
+        Test chart lookups and fallback columns
+    """
+    def test_double_falls_back_to_hit(self, table):
+        hand = make_hand(Rank.SIX, Rank.FIVE)
+        dealer = Card(Suit.CLUBS, Rank.SIX)
+        assert table.action(hand, dealer, True, False, False) == 'double'
+        assert table.action(hand, dealer, False, False, False) == 'hit'
+
+    def test_double_falls_back_to_stand_on_soft_18(self, table):
+        hand = make_hand(Rank.ACE, Rank.SEVEN)
+        dealer = Card(Suit.CLUBS, Rank.FOUR)
+        assert table.action(hand, dealer, True, False, False) == 'double'
+        assert table.action(hand, dealer, False, False, False) == 'stand'
+
+    def test_surrender_falls_back_to_hit(self, table):
+        hand = make_hand(Rank.TEN, Rank.SIX)
+        dealer = Card(Suit.CLUBS, Rank.ACE)
+        assert table.action(hand, dealer, False, False, True) == 'surrender'
+        assert table.action(hand, dealer, False, False, False) == 'hit'
+
+    def test_unsplit_pair_plays_total(self, table):
+        hand = make_hand(Rank.EIGHT, Rank.EIGHT)
+        dealer = Card(Suit.CLUBS, Rank.TEN)
+        assert table.action(hand, dealer, False, True, False) == 'split'
+        assert table.action(hand, dealer, False, False, True) == 'surrender'
+        assert table.action(hand, dealer, False, False, False) == 'hit'
+
+    def test_unsplit_aces_play_soft_12(self, table):
+        hand = make_hand(Rank.ACE, Rank.ACE)
+        dealer = Card(Suit.CLUBS, Rank.SIX)
+        assert table.action(hand, dealer, True, False, False) == 'hit'
+
+    def test_three_card_hand_uses_totals(self, table):
+        hand = make_hand(Rank.TWO, Rank.THREE, Rank.EIGHT)
+        dealer = Card(Suit.CLUBS, Rank.FIVE)
+        assert table.action(hand, dealer, False, False, False) == 'stand'
+
+
+class TestCustomCharts:
+    """
+        Test swapping in alternative charts
+    """
+    def test_ai_uses_custom_chart(self, default_chart):
+        chart = copy.deepcopy(default_chart)
+        chart['name'] = 'always-stand-12'
+        chart['hard']['12'] = 'S  S  S  S  S  S  S  S  S  S'
+        ai = BlackJackAI(strategy='basic', strategy_table=StrategyTable(chart))
+        hand = make_hand(Rank.TEN, Rank.TWO)
+        assert ai.get_action(hand, Card(Suit.CLUBS, Rank.TWO), can_double=False) == 'stand'
+        assert BlackJackAI(strategy='basic').get_action(hand, Card(Suit.CLUBS, Rank.TWO), can_double=False) == 'hit'
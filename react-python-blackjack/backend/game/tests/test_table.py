@@ -0,0 +1,152 @@
+from game.table import BlackJackTable, MAX_SEATS
+import pytest
+
+
+def stack(table: BlackJackTable, values):
+    """
+        Put cards with the given values (Ace = 1) on top of the shoe
+    """
+    deck = table.deck
+    for i, value in enumerate(values):
+        deck.shoe[deck.cursor + i] = value - 1     # Hearts, Ace to Ten
+
+
+@pytest.fixture
+def table():
+    table = BlackJackTable('test', seed=1)
+    table.join('alice')
+    table.join('bob')
+    return table
+
+
+class TestSeats:
+    """
+        Test joining and leaving a table
+    """
+    def test_join_takes_free_seats(self):
+        table = BlackJackTable('test')
+        seats = [table.join(f"player {i}") for i in range(MAX_SEATS)]
+        assert [seat.seat_index for seat in seats] == list(range(MAX_SEATS))
+        assert table.join('late') is None
+        table.leave(seats[3])
+        assert table.join('late').seat_index == 3
+
+    def test_seats_share_shoe_and_dealer(self, table):
+        alice, bob = table.players()
+        assert alice.deck is table.deck and bob.deck is table.deck
+        assert alice.dealer_hand is table.dealer_hand
+        assert alice.player_chips == bob.player_chips == 1000
+
+    def test_empty_table(self, table):
+        for seat in table.players():
+            table.leave(seat)
+        assert table.is_empty()
+
+
+class TestTableRound:
+    """
+        Test dealing and playing a round at a table
+    """
+    def test_deal_order(self, table):
+        alice, bob = table.players()
+        alice.place_bet(100)
+        bob.place_bet(50)
+        stack(table, [10, 9, 5, 7, 8, 6])
+        assert table.start_round()
+        assert [card.value() for card in alice.player_hands[0].cards] == [10, 7]
+        assert [card.value() for card in bob.player_hands[0].cards] == [9, 8]
+        assert [card.value() for card in table.dealer_hand.cards] == [5, 6]
+        assert table.game_phase == 'playing' and table.turn == 0
+        assert alice.game_phase == 'playing' and bob.game_phase == 'waiting'
+
+    def test_seats_play_in_turn(self, table):
+        alice, bob = table.players()
+        alice.place_bet(100)
+        bob.place_bet(50)
+        stack(table, [10, 9, 5, 7, 8, 6, 10])
+        table.start_round()
+        assert not bob.hit()
+        assert alice.stand()
+        assert table.turn == 1 and bob.game_phase == 'playing'
+        assert bob.stand()
+        # Dealer draws to 21 once, and both seats lose to it
+        assert table.game_phase == 'finished'
+        assert table.dealer_hand.value() == 21
+        assert alice.hand_results[0]['result'] == bob.hand_results[0]['result'] == 'lose'
+        assert alice.player_chips == 900 and bob.player_chips == 950
+
+    def test_seat_without_bet_sits_out(self, table):
+        alice, bob = table.players()
+        bob.place_bet(50)
+        stack(table, [9, 5, 8, 6])
+        table.start_round()
+        assert alice.player_hands == [] and alice.game_phase == 'betting'
+        assert table.turn == 1
+
+    def test_no_bets_no_round(self, table):
+        assert not table.start_round()
+
+    def test_natural_skips_turn(self, table):
+        alice, bob = table.players()
+        alice.place_bet(100)
+        bob.place_bet(50)
+        stack(table, [1, 9, 5, 10, 8, 6])
+        table.start_round()
+        assert alice.game_phase == 'dealer_turn'
+        assert table.turn == 1
+
+    def test_bet_once_while_betting(self, table):
+        alice, bob = table.players()
+        assert alice.place_bet(100)
+        assert not alice.place_bet(100)
+        table.start_round()
+        assert not bob.place_bet(50)
+
+    def test_leaving_passes_turn(self, table):
+        alice, bob = table.players()
+        alice.place_bet(100)
+        bob.place_bet(50)
+        stack(table, [10, 9, 5, 7, 8, 6, 10])
+        table.start_round()
+        table.leave(alice)
+        assert table.turn == 1 and bob.game_phase == 'playing'
+
+    def test_reset_round(self, table):
+        alice, bob = table.players()
+        alice.place_bet(100)
+        stack(table, [10, 5, 7, 6, 10])
+        table.start_round()
+        assert not table.reset_round()
+        alice.stand()
+        assert table.reset_round()
+        assert table.game_phase == 'betting'
+        assert alice.player_hands == [] and alice.current_bet == 0
+        assert table.dealer_hand.cards == []
+
+    def test_card_listeners_see_every_card(self, table):
+        seen = []
+        table.add_card_listener(seen.append)
+        alice, bob = table.players()
+        alice.place_bet(100)
+        bob.place_bet(50)
+        table.start_round()
+        while table.game_phase == 'playing':
+            table.seats[table.turn].stand()
+        dealt = [card for seat in table.players() for card in seat.player_hands[0].cards] + table.dealer_hand.cards
+        assert sorted(map(repr, seen)) == sorted(map(repr, dealt))
+
+
+class TestTableState:
+    """
+        Test the shared table state
+    """
+    def test_hides_hole_card_during_play(self, table):
+        alice, bob = table.players()
+        alice.place_bet(100)
+        stack(table, [10, 5, 7, 6])
+        table.start_round()
+        state = table.get_state()
+        assert state['dealer_hand']['cards'][0]['hidden']
+        assert state['seats'][0]['current_bet'] == 100
+        assert state['seats'][1]['player_hands'] == []
+        assert state['seats'][2] is None
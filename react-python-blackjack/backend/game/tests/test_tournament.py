@@ -0,0 +1,85 @@
+from game.ai_agent import BlackJackAI
+from game.simulator import BatchSimulator
+from game.strategy import WIN_RATES_FILE, load_equivalent_win_rates
+from game.tournament import PairedComparison, StrategyTournament, equivalent_win_rate, write_win_rates
+import json
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def report():
+    tournament = StrategyTournament(['simple', 'basic'], batch_size=2000, min_rounds=10000, max_rounds=200000, seed=3)
+    return tournament.run()
+
+
+class TestCommonRandomNumbers:
+    """
+        Test that strategies see identical shoes
+    """
+    def test_same_shoes_for_every_strategy(self):
+        simple = BatchSimulator(BlackJackAI('simple'), num_shoes=50, reshuffle_at=312, seed=11)
+        basic = BatchSimulator(BlackJackAI('basic'), num_shoes=50, reshuffle_at=312, seed=11)
+        for _ in range(3):
+            simple.play_round()
+            basic.play_round()
+            assert np.array_equal(simple.shoes, basic.shoes)
+
+
+class TestPairedComparison:
+    """
+        Test sequential stopping of pairwise comparisons
+    """
+    def test_identical_returns_never_decided(self):
+        comparison = PairedComparison('basic', 'simple')
+        returns = np.array([1.0, -1.0, 0.0, 1.5] * 100)
+        comparison.add(returns, returns)
+        assert comparison.mean == 0.0
+        assert comparison.check(z=3.0, min_rounds=10) is False
+
+    def test_clear_difference_decided(self):
+        comparison = PairedComparison('basic', 'simple')
+        comparison.add(np.array([1.0, 0.0] * 500), np.array([0.0, -1.0] * 500))
+        assert comparison.check(z=3.0, min_rounds=10) is True
+        assert comparison.leader == 'basic'
+
+    def test_waits_for_min_rounds(self):
+        comparison = PairedComparison('basic', 'simple')
+        comparison.add(np.ones(10), np.zeros(10))
+        assert comparison.check(z=3.0, min_rounds=1000) is False
+
+
+class TestStrategyTournament:
+    """
+        Test tournament reports
+    """
+    def test_basic_beats_simple(self, report):
+        comparison = report['comparisons'][0]
+        assert comparison['decided'] is True
+        assert comparison['leader'] == 'basic'
+        assert comparison['rounds'] < 200000
+
+    def test_report_has_confidence_intervals(self, report):
+        for stats in report['strategies'].values():
+            low, high = stats['confidence_interval']
+            assert low <= stats['ev'] <= high
+            assert stats['equivalent_win_rate'] == equivalent_win_rate(stats['ev'])
+
+    def test_win_rates_file_round_trip(self, report, tmp_path):
+        path = tmp_path / 'rates.json'
+        write_win_rates(report, path)
+        rates = load_equivalent_win_rates(path)
+        assert rates['basic'] > rates['simple']
+
+    def test_missing_win_rates_file(self, tmp_path):
+        assert load_equivalent_win_rates(tmp_path / 'missing.json') == {}
+
+    def test_ai_uses_measured_rates(self):
+        assert BlackJackAI('basic').get_strategy_equivalent_win_rate() == load_equivalent_win_rates()['basic']
+
+    def test_equivalent_win_rate_from_ev(self):
+        with open(WIN_RATES_FILE) as rates_file:
+            ev = json.load(rates_file)['strategies']['basic']['ev']
+        ai = BlackJackAI('basic')
+        assert ai.get_strategy_equivalent_win_rate() == pytest.approx((1 + ev) / 2)
+        assert ai.get_strategy_win_rate() == 0.495
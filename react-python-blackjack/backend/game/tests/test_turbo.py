@@ -0,0 +1,61 @@
+from game.ai_agent import BlackJackAI
+from game.game_engine import BlackJackGame
+from game.turbo import TurboSession
+import pytest
+
+
+def session(num_rounds: int = 250, **kwargs) -> TurboSession:
+    game = BlackJackGame(seed=7)
+    game.player_chips = 10 ** 6
+    return TurboSession(game, BlackJackAI(strategy='basic'), num_rounds, **kwargs)
+
+
+class TestTurboSession:
+    """
+        Test headless AI sessions
+    """
+    @pytest.mark.asyncio
+    async def test_plays_all_rounds(self):
+        turbo = session(250, summary_every=100)
+        summaries = []
+
+        async def collect(summary):
+            summaries.append(summary)
+
+        await turbo.run(collect)
+        assert [summary['rounds_played'] for summary in summaries] == [100, 200, 250]
+        assert [summary['done'] for summary in summaries] == [False, False, True]
+        final = summaries[-1]
+        assert final['wins'] + final['losses'] + final['pushes'] == final['hands'] >= 250
+        assert final['net'] == turbo.game.player_chips - 10 ** 6
+        assert turbo.game.game_phase == 'betting'
+        assert turbo.record_round not in turbo.game.round_listeners
+
+    @pytest.mark.asyncio
+    async def test_stops_when_broke(self):
+        turbo = session(100000)
+        turbo.game.player_chips = 50
+        summaries = []
+
+        async def collect(summary):
+            summaries.append(summary)
+
+        await turbo.run(collect)
+        assert turbo.game.player_chips == 0
+        assert summaries[-1]['done'] and summaries[-1]['rounds_played'] < 100000
+
+    @pytest.mark.asyncio
+    async def test_stop(self):
+        turbo = session(100000, summary_every=10)
+
+        async def stop_after_first(summary):
+            turbo.stop()
+
+        await turbo.run(stop_after_first)
+        assert turbo.rounds == 10
+
+    def test_rejects_bad_sizes(self):
+        with pytest.raises(ValueError):
+            session(0)
+        with pytest.raises(ValueError):
+            session(10, summary_every=0)
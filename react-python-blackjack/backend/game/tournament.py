@@ -0,0 +1,209 @@
+from .ai_agent import BlackJackAI, Strategy
+from .simulator import BatchSimulator, SimulationResult
+from .rules import get_rules
+from .strategy import WIN_RATES_FILE
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import argparse
+import json
+import numpy as np
+import secrets
+
+DEFAULT_STRATEGIES = ('simple', 'basic', 'conservative')
+
+
+def equivalent_win_rate(ev: float) -> float:
+    """
+        Win probability of an even-money bet with the same EV per hand
+    """
+    return (1.0 + ev) / 2.0
+
+
+class PairedComparison:
+    """
+        Running statistics of per-round return differences between two strategies
+        playing the same shoes (first minus second)
+    """
+    def __init__(self, first: Strategy, second: Strategy):
+        self.first = first
+        self.second = second
+        self.rounds = 0
+        self.total_diff = 0.0
+        self.total_squared = 0.0
+        self.decided = False
+
+    def add(self, first_returns: np.ndarray, second_returns: np.ndarray):
+        """
+            Accumulate paired returns from the same rounds
+        """
+        diff = first_returns - second_returns
+        self.rounds += int(diff.size)
+        self.total_diff += float(diff.sum())
+        self.total_squared += float(np.square(diff).sum())
+
+    @property
+    def mean(self) -> float:
+        if self.rounds > 0:
+            return self.total_diff / self.rounds
+        return 0.0
+
+    @property
+    def standard_error(self) -> float:
+        if self.rounds > 1:
+            variance = max(self.total_squared / self.rounds - self.mean ** 2, 0.0)
+            return (variance / self.rounds) ** 0.5
+        return float('inf')
+
+    def confidence_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        margin = z * self.standard_error
+        return self.mean - margin, self.mean + margin
+
+    def check(self, z: float, min_rounds: int) -> bool:
+        """
+            Mark the comparison decided once the EV difference is z standard errors away from zero
+        """
+        if not self.decided and self.rounds >= min_rounds:
+            self.decided = abs(self.mean) > z * self.standard_error
+        return self.decided
+
+    @property
+    def leader(self) -> Strategy:
+        return self.first if self.mean >= 0 else self.second
+
+    def to_dict(self):
+        return {
+            'first': self.first,
+            'second': self.second,
+            'rounds': self.rounds,
+            'ev_difference': self.mean,
+            'confidence_interval': list(self.confidence_interval()),
+            'decided': self.decided,
+            'leader': self.leader if self.decided else None,
+        }
+
+
+class StrategyTournament:
+    """
+        Benchmarks strategies against each other with common random numbers.
+        - Every strategy plays the same shoes: each lane gets a fresh shoe every round,
+          drawn from identically seeded generators, so card usage never desynchronises them
+        - Each pairwise comparison stops once its paired EV difference is decided
+          (z standard errors from zero after min_rounds), or at max_rounds
+        - Strategies drop out once all of their comparisons are decided
+        Strategies are played through their compiled policy tables; 'optimal' is compiled
+        against a full shoe, so it plays as a composition-independent strategy here.
+    """
+    def __init__(self,
+                 strategies: Sequence[Strategy] = DEFAULT_STRATEGIES,
+                 num_decks: int = 6,
+                 batch_size: int = 10000,
+                 min_rounds: int = 50000,
+                 max_rounds: int = 2000000,
+                 z: float = 3.0,
+                 seed: Optional[int] = None,
+                 rules: Optional[str] = None):
+        self.strategies = list(strategies)
+        self.num_decks = num_decks
+        self.rules = get_rules(rules).with_decks(num_decks)
+        self.batch_size = batch_size
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.z = z
+        self.seed = seed if seed is not None else secrets.randbits(64)
+        self.results: Dict[Strategy, SimulationResult] = {}
+        self.comparisons: List[PairedComparison] = []
+
+    def active_strategies(self) -> List[Strategy]:
+        """
+            Strategies still needed by an undecided comparison
+        """
+        needed = set()
+        for comparison in self.comparisons:
+            if not comparison.decided:
+                needed.update((comparison.first, comparison.second))
+        return [strategy for strategy in self.strategies if strategy in needed]
+
+    def progress(self) -> Iterator[Dict]:
+        """
+            Run the tournament, yielding the standings after every batch of rounds
+        """
+        shoe_size = 52 * self.num_decks
+        simulators = {
+            strategy: BatchSimulator(BlackJackAI(strategy=strategy, rules=self.rules),
+                                     num_shoes=self.batch_size,
+                                     reshuffle_at=shoe_size,
+                                     seed=self.seed)
+            for strategy in self.strategies
+        }
+        self.results = {strategy: SimulationResult(unit_bet=self.rules.unit_bet) for strategy in self.strategies}
+        self.comparisons = [PairedComparison(first, second) for first, second in combinations(self.strategies, 2)]
+        rounds = 0
+        while rounds < self.max_rounds:
+            active = self.active_strategies()
+            if not active:
+                break
+            batch = min(self.batch_size, self.max_rounds - rounds)
+            returns = {strategy: simulators[strategy].play_round()[:batch] for strategy in active}
+            for strategy in active:
+                self.results[strategy].add(returns[strategy])
+            for comparison in self.comparisons:
+                if not comparison.decided:
+                    comparison.add(returns[comparison.first], returns[comparison.second])
+                    comparison.check(self.z, self.min_rounds)
+            rounds += batch
+            yield self.to_dict()
+
+    def run(self) -> Dict:
+        """
+            Run the tournament to completion
+        """
+        report = self.to_dict()
+        for report in self.progress():
+            pass
+        return report
+
+    def to_dict(self):
+        """
+            Get dictionary with per strategy results and pairwise comparisons
+        """
+        return {
+            'seed': self.seed,
+            'num_decks': self.num_decks,
+            'rules': self.rules.name,
+            'strategies': {
+                strategy: {
+                    **result.to_dict(),
+                    'equivalent_win_rate': equivalent_win_rate(result.ev),
+                }
+                for strategy, result in self.results.items()
+            },
+            'comparisons': [comparison.to_dict() for comparison in self.comparisons],
+        }
+
+
+def write_win_rates(report: Dict, path: Union[str, Path] = WIN_RATES_FILE):
+    """
+        Save a tournament report as the win rate data file used by BlackJackAI
+    """
+    with open(path, 'w') as rates_file:
+        json.dump(report, rates_file, indent=2)
+        rates_file.write('\n')
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark blackjack AI strategies on common shoes')
+    parser.add_argument('strategies', nargs='*', default=list(DEFAULT_STRATEGIES))
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--min-rounds', type=int, default=50000)
+    parser.add_argument('--max-rounds', type=int, default=2000000)
+    parser.add_argument('--output', default=str(WIN_RATES_FILE))
+    args = parser.parse_args(argv)
+    tournament = StrategyTournament(args.strategies, min_rounds=args.min_rounds, max_rounds=args.max_rounds, seed=args.seed)
+    for report in tournament.progress():
+        print(' '.join(f"{name}={stats['ev']:+.4f}" for name, stats in report['strategies'].items()))
+    write_win_rates(tournament.to_dict(), args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+from .ai_agent import BlackJackAI
+from .game_engine import BlackJackGame
+from .runner import play_round
+from typing import Awaitable, Callable, Dict
+import asyncio
+import time
+
+MAX_TURBO_HANDS = 1000000
+# Longest stretch of play before other connections get the event loop back
+TURBO_TIME_SLICE = 0.005
+
+
+class TurboSession:
+    """
+        Plays the AI on a game back to back, with no delays, reporting aggregate
+        summaries instead of game states.
+        - Rounds are played synchronously in time slices of time_slice seconds; the
+          session yields to the event loop between slices, so other connections (and
+          the game's round listeners, e.g. hand history) keep running on the loop
+        - Bets follow the AI (its bet spread or bet_sizer); the session stops early
+          when the chips run out or stop() is called
+    """
+    def __init__(self,
+                 game: BlackJackGame,
+                 ai: BlackJackAI,
+                 num_rounds: int,
+                 base_bet: int = 25,
+                 summary_every: int = 100,
+                 time_slice: float = TURBO_TIME_SLICE):
+        if not 0 < num_rounds <= MAX_TURBO_HANDS:
+            raise ValueError(f"Turbo hands must be between 1 and {MAX_TURBO_HANDS}, got {num_rounds}")
+        if base_bet <= 0 or summary_every <= 0:
+            raise ValueError("Turbo base bet and summary interval must be positive")
+        self.game = game
+        self.ai = ai
+        self.num_rounds = num_rounds
+        self.base_bet = base_bet
+        self.summary_every = summary_every
+        self.time_slice = time_slice
+        self.starting_chips = game.player_chips
+        self.rounds = 0
+        self.hands = 0
+        self.wins = 0
+        self.losses = 0
+        self.pushes = 0
+        self.blackjacks = 0
+        self.stopped = False
+        self.started_at = None
+
+    def record_round(self, game: BlackJackGame):
+        """
+            Round listener tallying the outcome of every hand
+        """
+        for result in game.hand_results:
+            self.hands += 1
+            outcome = result['result']
+            if outcome in ('win', 'blackjack'):
+                self.wins += 1
+            elif outcome == 'push':
+                self.pushes += 1
+            else:
+                self.losses += 1
+            self.blackjacks += outcome == 'blackjack'
+
+    def stop(self):
+        self.stopped = True
+
+    def finished(self) -> bool:
+        return self.stopped or self.rounds >= self.num_rounds or self.game.player_chips <= 0
+
+    def play_slice(self):
+        """
+            Play rounds until the time slice is used up or a summary is due
+        """
+        game, ai = self.game, self.ai
+        deadline = time.perf_counter() + self.time_slice
+        while not self.finished():
+            if not play_round(game, ai, ai.get_bet_size(self.base_bet, game.player_chips)):
+                self.stopped = True
+                break
+            game.reset_round()
+            self.rounds += 1
+            if self.rounds % self.summary_every == 0 or time.perf_counter() >= deadline:
+                break
+
+    async def run(self, send_summary: Callable[[Dict], Awaitable[None]]):
+        """
+            Play the session, awaiting send_summary every summary_every rounds and once at the end
+        """
+        self.started_at = time.perf_counter()
+        self.game.add_round_listener(self.record_round)
+        try:
+            while not self.finished():
+                self.play_slice()
+                if self.rounds % self.summary_every == 0 and not self.finished():
+                    await send_summary(self.summary())
+                await asyncio.sleep(0)
+        finally:
+            self.game.round_listeners.remove(self.record_round)
+        await send_summary(self.summary())
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.started_at if self.started_at is not None else 0
+        return {
+            'rounds_played': self.rounds,
+            'rounds_total': self.num_rounds,
+            'hands': self.hands,
+            'wins': self.wins,
+            'losses': self.losses,
+            'pushes': self.pushes,
+            'blackjacks': self.blackjacks,
+            'win_rate': self.wins / self.hands if self.hands else 0.0,
+            'chips': self.game.player_chips,
+            'net': self.game.player_chips - self.starting_chips,
+            'rounds_per_second': self.rounds / elapsed if elapsed > 0 else 0.0,
+            'done': self.finished(),
+        }
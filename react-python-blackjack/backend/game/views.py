@@ -1,3 +1,86 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from .consumers import BlackJackConsumer
+from .jobs import SimulationJob, job_manager, parse_job_params
+from .metrics import PROMETHEUS_CONTENT_TYPE, metrics, render_registry
+from typing import AsyncIterator, Dict
+import json
 
-# Create your views here.
+# Longest wait for a job's next line before a stream is closed
+STREAM_TIMEOUT = 300
+
+
+async def json_lines(first_line: Dict, lines: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    yield json.dumps(first_line) + '\n'
+    async for line in lines:
+        yield json.dumps(line) + '\n'
+
+
+def stream_job(job: SimulationJob, first_line: Dict) -> StreamingHttpResponse:
+    """
+        Chunked JSON lines response: first_line, then the job's progress and result.
+        The body is an async iterator, so a stream waiting for a job never blocks the event loop.
+    """
+    response = StreamingHttpResponse(
+        json_lines(first_line, job.follow(timeout=STREAM_TIMEOUT)),
+        content_type='application/x-ndjson',
+    )
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@csrf_exempt
+async def jobs(request):
+    """
+        POST {strategy, rules, hands, seed}: start a batch AI session (or attach to the
+        cached one with the same parameters) and stream its progress as JSON lines
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        data = json.loads(request.body or b'{}')
+        params = parse_job_params(data)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    job, cached = job_manager.submit(params)
+    return stream_job(job, {'type': 'job', 'job_id': job.job_id, 'cached': cached, **job.params})
+
+
+@csrf_exempt
+async def job_detail(request, job_id: str):
+    """
+        GET: job status and latest line, DELETE: cancel the job
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return JsonResponse({'error': f"Unknown job: {job_id}"}, status=404)
+    if request.method == 'DELETE':
+        job.cancel()
+    elif request.method != 'GET':
+        return HttpResponseNotAllowed(['GET', 'DELETE'])
+    return JsonResponse(job.to_dict())
+
+
+async def job_stream(request, job_id: str):
+    """
+        GET: stream a job's lines from the start (e.g. to reattach after a dropped connection)
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return JsonResponse({'error': f"Unknown job: {job_id}"}, status=404)
+    return stream_job(job, {'type': 'job', 'job_id': job.job_id, 'cached': True, **job.params})
+
+
+def prometheus_metrics(request):
+    """
+        GET: consumer latency histograms and game registry stats in the Prometheus text
+        format, for the local addresses in settings.GAME_METRICS['ALLOWED_IPS']
+    """
+    if not metrics.enabled:
+        return JsonResponse({'error': "Metrics are disabled"}, status=404)
+    allowed_ips = getattr(settings, 'GAME_METRICS', {}).get('ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return JsonResponse({'error': "Metrics are only served locally"}, status=403)
+    text = metrics.render('blackjack') + render_registry('blackjack', BlackJackConsumer.games.stats())
+    return HttpResponse(text, content_type=PROMETHEUS_CONTENT_TYPE)
@@ -3,14 +3,30 @@ from time import sleep
 from channels.generic.websocket import AsyncWebsocketConsumer
 from .game_engine import SnakeGame, Direction
 from .ai_agent import SnakeAI
+from .metrics import metrics
+from .registry import GameRegistry, registry_from_settings
+from .store import VersionConflict, get_game_store
+from urllib.parse import parse_qs
 import json
 import asyncio
+import re
+import uuid
+
+# Close code sent when the session's game was saved by another connection
+SESSION_CONFLICT_CLOSE_CODE = 4009
+# Close code sent when the connection's game was evicted from the game registry
+GAME_EVICTED_CLOSE_CODE = 4008
+SESSION_ID_PATTERN = re.compile(r'\w{1,64}')
+# Game loop ticks between checkpoints of a running game
+CHECKPOINT_TICKS = 20
+# Action labels of the latency metrics (any other action is labelled 'unknown')
+METRIC_ACTIONS = frozenset({'start', 'direction', 'reset', 'pause', 'toggle_ai', 'set_ai_strategy'})
 
 class GameConsumer(AsyncWebsocketConsumer):
-    # Store game instances per connection
-    games = {}
-    # Store AI agents per connection
-    ai_agents = {}
+    # Store game instances per connection (bounded, idle games are evicted)
+    games = registry_from_settings(snapshot=SnakeGame.to_bytes)
+    # Store AI agents per connection (removed with their games)
+    ai_agents = GameRegistry(capacity=games.capacity)
 
     def __init__(self, *args, **kwargs):
         super().__init__(args, kwargs)
@@ -20,6 +36,10 @@ class GameConsumer(AsyncWebsocketConsumer):
         self.game_loop_task = None
         self.channel_name = None
         self.game_id = None
+        self.session_id = None
+        self.store = None
+        self.store_version = 0
+        self.eviction_task = None
 
     async def connect(self):
         """
@@ -29,7 +49,11 @@ class GameConsumer(AsyncWebsocketConsumer):
 
         # Create a new game instance for this connection
         self.game_id = self.scope['url_route']['kwargs'].get('game_id', 'default')
-        self.games[self.channel_name] = SnakeGame(grid_size=20)
+        # Resume the session's game from the game store (?session=<id>), or start a new one
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        game = await self.load_session(query.get('session', [None])[0])
+        self.games.add(self.channel_name, game or SnakeGame(grid_size=20), on_evict=self.game_evicted,
+                       restored=game is not None)
         self.ai_agents[self.channel_name] = SnakeAI(strategy='astar')
         self.game_loop_task = None
         self.is_running = False
@@ -48,15 +72,35 @@ class GameConsumer(AsyncWebsocketConsumer):
             self.is_running = False
             self.game_loop_task.cancel()
 
+        # Save the game for a reconnect
+        await self.save_session()
+
         # Clean up game instance and AI agents
-        if self.channel_name in self.games:
-            del self.games[self.channel_name]
-        if self.channel_name in self.ai_agents:
-            del self.ai_agents[self.channel_name]
+        self.games.pop(self.channel_name, None)
+        self.ai_agents.pop(self.channel_name, None)
+
+    def game_evicted(self, game, data):
+        """
+            Game registry callback: the game was evicted (idle, or the registry was full).
+            Save its snapshot and close the connection; the client can resume the session.
+        """
+        self.is_running = False
+        self.ai_agents.pop(self.channel_name, None)
+        self.eviction_task = asyncio.ensure_future(self.close_evicted(data))
+
+    async def close_evicted(self, data):
+        if data is not None:
+            await self.save_session(data)
+        try:
+            await self.close(code=GAME_EVICTED_CLOSE_CODE)
+        except Exception:
+            pass    # the connection was already gone (it never disconnected cleanly)
 
     async def receive(self, text_data):
-        data = json.loads(text_data)
-        action = data.get('action')
+        with metrics.span('decode'):
+            data = json.loads(text_data)
+            action = data.get('action')
+            metrics.set_action(action if action in METRIC_ACTIONS else 'unknown')
 
         game = self.games.get(self.channel_name)
         if not game:
@@ -74,18 +118,21 @@ class GameConsumer(AsyncWebsocketConsumer):
                 direction_str = data.get('direction')
                 try:
                     direction = Direction(direction_str)
-                    game.change_direction(direction)
+                    with metrics.span('engine'):
+                        game.change_direction(direction)
                 except ValueError:
                     pass
 
         elif action == 'reset':
             # Reset game
-            game.reset()
+            with metrics.span('engine'):
+                game.reset()
             self.ai_mode = False
             if self.game_loop_task:
                 self.is_running = False
                 self.game_loop_task.cancel()
             await self.send_game_state()
+            await self.save_session()
 
         elif action == 'pause':
             # Pause game
@@ -93,6 +140,7 @@ class GameConsumer(AsyncWebsocketConsumer):
                 self.is_running = False
                 if self.game_loop_task:
                     self.game_loop_task.cancel()
+                await self.save_session()
 
         elif action == 'toggle_ai':
             # Toggle AI mode
@@ -126,17 +174,27 @@ class GameConsumer(AsyncWebsocketConsumer):
             while self.is_running and game and not game.game_over:
                 # If AI mode is enabled, let AI decide direction
                 if self.ai_mode and ai_agent:
-                    game_state = game.get_state()
-                    next_direction = ai_agent.get_next_move(game_state)
-                    game.change_direction(next_direction)
-                game.update()
+                    metrics.set_action('ai_tick')
+                    with metrics.span('ai'):
+                        game_state = game.get_state()
+                        next_direction = ai_agent.get_next_move(game_state)
+                    with metrics.span('engine'):
+                        game.change_direction(next_direction)
+                        game.update()
+                else:
+                    metrics.set_action('tick')
+                    with metrics.span('engine'):
+                        game.update()
                 await self.send_game_state()
+                if game.moves % CHECKPOINT_TICKS == 0:
+                    await self.save_session()
                 await asyncio.sleep(0.15)     # wait for 150ms
 
             # Send final state if game is over
             if game and game.game_over:
                 await self.send_game_state()
                 self.is_running = False
+                await self.save_session()
 
         except asyncio.CancelledError:
             pass
@@ -147,10 +205,55 @@ class GameConsumer(AsyncWebsocketConsumer):
         """
         game = self.games.get(self.channel_name)
         if game:
-            await self.send(text_data=json.dumps({
-                'type': 'game_state',
-                'state': game.get_state(),
-                'ai_mode': self.ai_mode,
-                'ai_strategy': self.ai_strategy
-            }))
+            with metrics.span('serialize'):
+                text_data = json.dumps({
+                    'type': 'game_state',
+                    'state': game.get_state(),
+                    'ai_mode': self.ai_mode,
+                    'ai_strategy': self.ai_strategy,
+                    'session_id': self.session_id
+                })
+            with metrics.span('send'):
+                await self.send(text_data=text_data)
+
+    async def load_session(self, session_id):
+        """
+            Load a session's game from the game store (None for a new or unknown session)
+        """
+        self.store = get_game_store()
+        self.store_version = 0
+        if session_id is not None and not SESSION_ID_PATTERN.fullmatch(session_id):
+            session_id = None
+        self.session_id = session_id or uuid.uuid4().hex
+        stored = await self.store.load(self.store_key())
+        if stored is None:
+            return None
+        try:
+            game = SnakeGame.from_bytes(stored.data)
+        except ValueError:
+            await self.store.delete(self.store_key())
+            return None
+        self.store_version = stored.version
+        return game
+
+    def store_key(self):
+        return f"snake:{self.session_id}"
+
+    async def save_session(self, data=None):
+        """
+            Checkpoint the game (or the given snapshot of it) to the game store. If another
+            connection saved the game since, its version wins and this connection is closed.
+        """
+        if not self.store:
+            return
+        if data is None:
+            game = self.games.get(self.channel_name)
+            if not game:
+                return
+            data = game.to_bytes()
+        try:
+            self.store_version = await self.store.save(self.store_key(), data, self.store_version)
+        except VersionConflict:
+            self.store = None
+            await self.close(code=SESSION_CONFLICT_CLOSE_CODE)
 
@@ -1,4 +1,5 @@
 import random
+import struct
 from enum import Enum
 
 class Direction(Enum):
@@ -7,12 +8,20 @@ class Direction(Enum):
     LEFT = 'left'
     RIGHT = 'right'
 
+# Binary snapshot: magic, version, grid size, direction, game over, score, moves, food, length,
+# then two bytes (x, y) per snake segment from the head
+SNAPSHOT_MAGIC = b'SNKS'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sBBBBIIBBH')
+DIRECTIONS = list(Direction)
+
 class SnakeGame:
-    def __init__(self, grid_size=20):
+    def __init__(self, grid_size=20, seed=None):
         """
-            SnakeGame class constructor
+            SnakeGame class constructor (a seed makes the food positions reproducible)
         """
         self.grid_size = grid_size
+        self.rng = random.Random(seed)
         self.snake = None
         self.direction = None
         self.food = None
@@ -38,7 +47,7 @@ class SnakeGame:
             Generate food at a random position not occupied by the snake
         """
         while True:
-            food = (random.randint(0, self.grid_size - 1), random.randint(0, self.grid_size - 1))
+            food = (self.rng.randint(0, self.grid_size - 1), self.rng.randint(0, self.grid_size - 1))
             if food not in self.snake:
                 return food
 
@@ -96,6 +105,39 @@ class SnakeGame:
 
         self.moves += 1
 
+    def to_bytes(self):
+        """
+            Serialize the game to a compact binary snapshot (the food generator is not included)
+        """
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.grid_size,
+                                      DIRECTIONS.index(self.direction), self.game_over, self.score, self.moves,
+                                      *self.food, len(self.snake))
+        return header + bytes(coordinate for segment in self.snake for coordinate in segment)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+            Rebuild a game from a snapshot made by to_bytes
+            Raises: ValueError for data that is not a valid snapshot
+        """
+        try:
+            (magic, version, grid_size, direction, game_over, score, moves,
+             food_x, food_y, length) = SNAPSHOT_HEADER.unpack_from(data)
+            direction = DIRECTIONS[direction]
+        except (struct.error, IndexError):
+            raise ValueError("Invalid game snapshot") from None
+        body = bytes(data[SNAPSHOT_HEADER.size:])
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or len(body) != 2 * length or not length:
+            raise ValueError("Invalid game snapshot")
+        game = cls(grid_size=grid_size)
+        game.snake = [(body[i], body[i + 1]) for i in range(0, len(body), 2)]
+        game.direction = direction
+        game.food = (food_x, food_y)
+        game.score = score
+        game.game_over = bool(game_over)
+        game.moves = moves
+        return game
+
     def get_state(self):
         """
             Return current game state as a dictionary
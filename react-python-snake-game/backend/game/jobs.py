@@ -0,0 +1,236 @@
+from .runner import SessionResult, run_shard
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ('simple', 'astar', 'safe')
+MAX_JOB_GAMES = 100000
+MAX_GRID_SIZE = 50
+# Games per shard; fixed, so a job's seed alone determines its result
+JOB_SHARD_SIZE = 20
+# Finished jobs kept for cache hits, least recently requested dropped first
+MAX_CACHED_JOBS = 256
+# Jobs whose progress is being collected at once (the shards share one process pool)
+MAX_RUNNING_JOBS = 4
+
+
+def parse_job_params(data: Dict) -> Dict:
+    """
+        Validate job parameters: strategy, grid_size, games and seed (None if missing)
+        Raises: ValueError for invalid parameters
+    """
+    strategy = data.get('strategy', 'astar')
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    try:
+        grid_size = int(data.get('grid_size', 20))
+        games = int(data.get('games', 100))
+        seed = int(data['seed']) if data.get('seed') is not None else None
+    except (TypeError, ValueError):
+        raise ValueError("grid_size, games and seed must be integers") from None
+    if not 5 <= grid_size <= MAX_GRID_SIZE:
+        raise ValueError(f"grid_size must be between 5 and {MAX_GRID_SIZE}, got {grid_size}")
+    if not 0 < games <= MAX_JOB_GAMES:
+        raise ValueError(f"games must be between 1 and {MAX_JOB_GAMES}, got {games}")
+    return {'strategy': strategy, 'grid_size': grid_size, 'games': games, 'seed': seed}
+
+
+def job_key(params: Dict) -> str:
+    """
+        Hash of the parameters, the key results are cached by
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:32]
+
+
+class SimulationJob:
+    """
+        Batch AI session run in the background by a JobManager.
+        Every progress update is kept as a line, so any number of readers can follow the
+        job from the start, during the run or after it has finished.
+        Status: running, done, cancelled or failed
+    """
+    def __init__(self, params: Dict):
+        self.job_id = uuid.uuid4().hex
+        # Jobs without a seed are cached by their other parameters, and played with a random seed
+        self.key = job_key(params)
+        self.params = params if params['seed'] is not None else {**params, 'seed': secrets.randbits(64)}
+        self.status = 'running'
+        self.lines: List[Dict] = []
+        self.lock = threading.Lock()
+        # Event loops and events of the readers waiting for the next line
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self.cancel_requested = False
+        self.result = SessionResult()
+
+    @property
+    def finished(self) -> bool:
+        return self.status != 'running'
+
+    def publish(self, line: Dict, status: Optional[str] = None):
+        """
+            Add a line (from the job's thread) and wake the readers waiting for it
+        """
+        with self.lock:
+            self.lines.append(line)
+            if status is not None:
+                self.status = status
+            waiters, self.waiters = self.waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass    # the reader's event loop is closed
+
+    def shards(self) -> List[int]:
+        full, rest = divmod(self.params['games'], JOB_SHARD_SIZE)
+        return [JOB_SHARD_SIZE] * full + ([rest] if rest else [])
+
+    def run(self, executor: Executor):
+        """
+            Play the job's shards on the executor, publishing the merged aggregate as each finishes
+        """
+        params = self.params
+        shards = self.shards()
+        futures = [
+            executor.submit(run_shard, params['strategy'], params['grid_size'], games, params['seed'], index)
+            for index, games in enumerate(shards)
+        ]
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                if self.cancel_requested:
+                    break
+                self.result.merge(future.result())
+                self.publish({
+                    'type': 'progress',
+                    'job_id': self.job_id,
+                    'shards_done': done,
+                    'shards_total': len(shards),
+                    'result': self.result.to_dict(),
+                })
+        except Exception as error:
+            logger.exception("Snake job %s failed", self.job_id)
+            self.publish({'type': 'error', 'job_id': self.job_id, 'error': str(error)}, status='failed')
+            return
+        finally:
+            # Stopped early: drop the shards that have not started
+            for future in futures:
+                future.cancel()
+        if self.cancel_requested:
+            self.publish({'type': 'cancelled', 'job_id': self.job_id, 'games_done': self.result.games},
+                         status='cancelled')
+        else:
+            self.publish({'type': 'result', 'job_id': self.job_id, **params, 'result': self.result.to_dict()},
+                         status='done')
+
+    def cancel(self):
+        """
+            Stop after the shard being merged; shards not started are dropped
+        """
+        if not self.finished:
+            self.cancel_requested = True
+
+    async def follow(self, timeout: Optional[float] = None) -> AsyncIterator[Dict]:
+        """
+            Yield every line of the job, waiting for new ones until it finishes
+            (or until no line came for timeout seconds). Waits never block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        index = 0
+        while True:
+            event = asyncio.Event()
+            with self.lock:
+                lines = self.lines[index:]
+                finished = self.finished
+                if not lines and not finished:
+                    self.waiters.append((loop, event))
+            if lines:
+                for line in lines:
+                    yield line
+                index += len(lines)
+            elif finished:
+                return
+            else:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'params': self.params,
+            'latest': self.lines[-1] if self.lines else None,
+        }
+
+
+class JobManager:
+    """
+        Runs SimulationJobs in the background and caches them by parameter hash:
+        a request with the parameters of a running or finished job gets that job back.
+        Shards of all jobs share one process pool, created on first use.
+    """
+    def __init__(self, workers: Optional[int] = None, max_cached: int = MAX_CACHED_JOBS):
+        self.workers = workers
+        self.max_cached = max_cached
+        self.jobs: 'OrderedDict[str, SimulationJob]' = OrderedDict()    # by job id, least recently requested first
+        self.by_key: Dict[str, SimulationJob] = {}
+        self.lock = threading.Lock()
+        self.process_pool: Optional[ProcessPoolExecutor] = None
+        self.drivers = ThreadPoolExecutor(max_workers=MAX_RUNNING_JOBS, thread_name_prefix='snake-job')
+
+    def submit(self, params: Dict) -> Tuple[SimulationJob, bool]:
+        """
+            Start a job for validated parameters, or return the cached one
+            Returns: the job, and whether it was cached
+        """
+        key = job_key(params)
+        with self.lock:
+            job = self.by_key.get(key)
+            if job is not None and job.status in ('running', 'done'):
+                self.jobs.move_to_end(job.job_id)
+                return job, True
+            job = SimulationJob(params)
+            self.jobs[job.job_id] = job
+            self.by_key[key] = job
+            self.evict()
+            if self.process_pool is None:
+                self.process_pool = ProcessPoolExecutor(max_workers=self.workers)
+            process_pool = self.process_pool
+        self.drivers.submit(job.run, process_pool)
+        return job, False
+
+    def evict(self):
+        """
+            Drop the least recently requested finished jobs beyond max_cached
+        """
+        excess = len(self.jobs) - self.max_cached
+        for job in list(self.jobs.values()):
+            if excess <= 0:
+                break
+            if job.finished:
+                del self.jobs[job.job_id]
+                if self.by_key.get(job.key) is job:
+                    del self.by_key[job.key]
+                excess -= 1
+
+    def get(self, job_id: str) -> Optional[SimulationJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[SimulationJob]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+
+job_manager = JobManager()
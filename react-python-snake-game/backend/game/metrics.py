@@ -0,0 +1,138 @@
+from django.conf import settings
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets, from 10µs to 1s
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Action being handled by the current task (the label of the spans it records)
+current_action: ContextVar[str] = ContextVar('current_action', default='none')
+
+
+class Histogram:
+    """
+        Latency histogram: observation counts per bucket (the last one for slower than every
+        bucket), their sum and count
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[int]:
+        total, counts = 0, []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class Span:
+    """
+        Times a with block as one stage of the current action
+    """
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics: 'LatencyMetrics', stage: str):
+        self.metrics = metrics
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, current_action.get(), time.perf_counter() - self.start)
+
+
+class NullSpan:
+    """
+        Span of disabled metrics: times nothing
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class LatencyMetrics:
+    """
+        Latency histograms per (stage, action), e.g. ('engine', 'hit'). Stages are timed with
+        `with metrics.span(stage):` and labelled with the action set for the current task.
+        When disabled, spans are a shared no-op and nothing is recorded.
+    """
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+
+    def span(self, stage: str):
+        return Span(self, stage) if self.enabled else NULL_SPAN
+
+    def set_action(self, action: str):
+        """
+            Label the spans recorded from now on by this task (and the tasks it starts)
+        """
+        if self.enabled:
+            current_action.set(action)
+
+    def observe(self, stage: str, action: str, seconds: float):
+        histogram = self.histograms.get((stage, action))
+        if histogram is None:
+            histogram = self.histograms[(stage, action)] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def reset(self):
+        self.histograms = {}
+
+    def render(self, namespace: str) -> str:
+        """
+            Prometheus text exposition of the histograms, as <namespace>_action_seconds
+        """
+        name = f'{namespace}_action_seconds'
+        lines = [f'# HELP {name} Time spent per stage of handling a WebSocket action',
+                 f'# TYPE {name} histogram']
+        bounds = [repr(bound) for bound in self.buckets] + ['+Inf']
+        for (stage, action), histogram in sorted(self.histograms.items()):
+            labels = f'action="{action}",stage="{stage}"'
+            for bound, count in zip(bounds, histogram.cumulative_counts()):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum!r}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def render_registry(namespace: str, stats: Dict[str, int]) -> str:
+    """
+        Prometheus text exposition of game registry stats (GameRegistry.stats())
+    """
+    lines = []
+    for key, value in stats.items():
+        gauge = key in ('live', 'capacity')
+        name = f'{namespace}_games_{key}' if gauge else f'{namespace}_games_{key}_total'
+        lines.append(f'# TYPE {name} {"gauge" if gauge else "counter"}')
+        lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# Consumer latency metrics, enabled by settings.GAME_METRICS['ENABLED']
+metrics = LatencyMetrics(enabled=getattr(settings, 'GAME_METRICS', {}).get('ENABLED', False))
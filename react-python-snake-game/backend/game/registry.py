@@ -0,0 +1,144 @@
+from django.conf import settings
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 10000
+
+
+class RegistryEntry:
+    __slots__ = ('value', 'last_used', 'on_evict')
+
+    def __init__(self, value: Any, last_used: float, on_evict: Optional[Callable[[Any, Optional[bytes]], None]]):
+        self.value = value
+        self.last_used = last_used
+        self.on_evict = on_evict
+
+
+class GameRegistry(MutableMapping):
+    """
+        Bounded registry of live games (or other per-connection objects) by key, in least
+        recently used order. Reading an entry counts as a use.
+        - Holds at most capacity entries: adding one more evicts the least recently used
+        - Entries unused for idle_ttl seconds are evicted when read, and when entries are added
+        - An evicted entry's on_evict callback gets its value and, when the registry has a
+          snapshot function (snapshot-on-evict), the value's snapshot
+        Removing an entry (del, pop) is not an eviction and calls nothing.
+    """
+    def __init__(self,
+                 capacity: int = DEFAULT_CAPACITY,
+                 idle_ttl: Optional[float] = None,
+                 snapshot: Optional[Callable[[Any], bytes]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if capacity < 1:
+            raise ValueError(f"Registry capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.idle_ttl = idle_ttl
+        self.snapshot = snapshot
+        self.clock = clock
+        self.entries: 'OrderedDict[str, RegistryEntry]' = OrderedDict()
+        self.evicted = 0    # evictions, for capacity or idleness
+        self.expired = 0    # evictions for idleness
+        self.restored = 0   # entries added from a snapshot
+
+    def add(self,
+            key: str,
+            value: Any,
+            on_evict: Optional[Callable[[Any, Optional[bytes]], None]] = None,
+            restored: bool = False):
+        """
+            Add or replace an entry, evicting idle entries and then the least recently used
+            ones beyond capacity; restored marks a value rebuilt from a snapshot
+        """
+        self.entries.pop(key, None)
+        self.evict_idle()
+        while len(self.entries) >= self.capacity:
+            self.evict(next(iter(self.entries)))
+        self.entries[key] = RegistryEntry(value, self.clock(), on_evict)
+        self.restored += restored
+
+    def is_idle(self, entry: RegistryEntry, now: float) -> bool:
+        return self.idle_ttl is not None and now - entry.last_used > self.idle_ttl
+
+    def evict_idle(self):
+        """
+            Evict every entry unused for idle_ttl seconds
+        """
+        now = self.clock()
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if not self.is_idle(entry, now):
+                break
+            self.evict(key, expired=True)
+
+    def evict(self, key: str, expired: bool = False):
+        entry = self.entries.pop(key)
+        self.evicted += 1
+        self.expired += expired
+        if entry.on_evict is None:
+            return
+        try:
+            data = self.snapshot(entry.value) if self.snapshot else None
+            entry.on_evict(entry.value, data)
+        except Exception:
+            logger.exception("Eviction callback failed for %s", key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'live': len(self.entries),
+            'capacity': self.capacity,
+            'evicted': self.evicted,
+            'expired': self.expired,
+            'restored': self.restored,
+        }
+
+    def __getitem__(self, key: str) -> Any:
+        entry = self.entries[key]
+        now = self.clock()
+        if self.is_idle(entry, now):
+            self.evict(key, expired=True)
+            raise KeyError(key)
+        entry.last_used = now
+        self.entries.move_to_end(key)
+        return entry.value
+
+    def __setitem__(self, key: str, value: Any):
+        self.add(key, value)
+
+    def __delitem__(self, key: str):
+        del self.entries[key]
+
+    def pop(self, key: str, *default) -> Any:
+        """
+            Remove an entry without counting it as a use (or an eviction)
+        """
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return entry.value
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.entries))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def registry_from_settings(snapshot: Optional[Callable[[Any], bytes]] = None) -> GameRegistry:
+    """
+        Registry configured by settings.GAME_REGISTRY: CAPACITY, IDLE_TTL (seconds, None to never
+        expire) and SNAPSHOT_ON_EVICT (whether evicted values are snapshotted with snapshot)
+    """
+    config = getattr(settings, 'GAME_REGISTRY', {})
+    return GameRegistry(capacity=config.get('CAPACITY', DEFAULT_CAPACITY),
+                        idle_ttl=config.get('IDLE_TTL'),
+                        snapshot=snapshot if config.get('SNAPSHOT_ON_EVICT', True) else None)
@@ -0,0 +1,88 @@
+from .game_engine import SnakeGame
+from .ai_agent import SnakeAI
+
+
+def play_game(game: SnakeGame, ai: SnakeAI, max_idle_moves: int) -> bool:
+    """
+        Play one game to the end synchronously, with the same decisions as the consumer's AI mode
+        Returns: False if the snake starved (max_idle_moves moves without eating)
+    """
+    idle_moves = 0
+    while not game.game_over:
+        game.change_direction(ai.get_next_move(game.get_state()))
+        score = game.score
+        game.update()
+        idle_moves = 0 if game.score != score else idle_moves + 1
+        if idle_moves >= max_idle_moves:
+            return False
+    return True
+
+
+def shard_seed(seed: int, shard_index: int) -> str:
+    """
+        Independent, reproducible RNG seed for one shard of a run
+    """
+    return f"{seed}:{shard_index}"
+
+
+class SessionResult:
+    """
+        Aggregate outcome of AI games
+    """
+    def __init__(self):
+        self.games = 0
+        self.starved = 0
+        self.total_score = 0
+        self.total_squared = 0
+        self.max_score = 0
+        self.total_moves = 0
+
+    def add(self, game: SnakeGame, starved: bool):
+        self.games += 1
+        self.starved += starved
+        self.total_score += game.score
+        self.total_squared += game.score ** 2
+        self.max_score = max(self.max_score, game.score)
+        self.total_moves += game.moves
+
+    def merge(self, other: 'SessionResult'):
+        self.games += other.games
+        self.starved += other.starved
+        self.total_score += other.total_score
+        self.total_squared += other.total_squared
+        self.max_score = max(self.max_score, other.max_score)
+        self.total_moves += other.total_moves
+
+    @property
+    def mean_score(self) -> float:
+        return self.total_score / self.games if self.games else 0.0
+
+    @property
+    def std_dev(self) -> float:
+        if not self.games:
+            return 0.0
+        return max(self.total_squared / self.games - self.mean_score ** 2, 0.0) ** 0.5
+
+    def to_dict(self):
+        return {
+            'games': self.games,
+            'starved': self.starved,
+            'mean_score': self.mean_score,
+            'std_dev': self.std_dev,
+            'max_score': self.max_score,
+            'mean_moves': self.total_moves / self.games if self.games else 0.0,
+        }
+
+
+def run_shard(strategy: str, grid_size: int, num_games: int, seed: int, shard_index: int) -> SessionResult:
+    """
+        Play num_games games with a private game, AI and RNG stream
+    """
+    game = SnakeGame(grid_size=grid_size, seed=shard_seed(seed, shard_index))
+    ai = SnakeAI(strategy=strategy)
+    result = SessionResult()
+    for _ in range(num_games):
+        game.reset()
+        starved = not play_game(game, ai, max_idle_moves=grid_size * grid_size)
+        result.add(game, starved)
+    return result
@@ -1,4 +1,7 @@
 from channels.testing import WebsocketCommunicator
+from game.consumers import GameConsumer
+from game.game_engine import SnakeGame
+from game.registry import GameRegistry
 import pytest
 import json
 
@@ -269,4 +272,64 @@ class TestDisconnection:
         await communicator.connect()
         state = await communicator.receive_json_from()
         assert state['state']['score'] == 0
-        await communicator.disconnect()
\ No newline at end of file
+        await communicator.disconnect()
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+class TestSessions:
+    """
+        Test resuming games from the game store
+    """
+    async def test_resume_session(self, game_application):
+        communicator = WebsocketCommunicator(game_application, "/ws/game/test/")
+        await communicator.connect()
+        session_id = (await communicator.receive_json_from())['session_id']
+        await communicator.send_json_to({'action': 'direction', 'direction': 'left'})
+        await communicator.send_json_to({'action': 'start'})
+        state = (await communicator.receive_json_from())['state']
+        await communicator.send_json_to({'action': 'pause'})
+        await communicator.disconnect()
+        # Reconnect, e.g. to another worker
+        communicator = WebsocketCommunicator(game_application, f"/ws/game/test/?session={session_id}")
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        assert response['session_id'] == session_id
+        assert response['state']['moves'] >= state['moves'] > 0
+        assert response['state']['direction'] == 'left'
+        await communicator.disconnect()
+
+    async def test_session_taken_over(self, game_application):
+        first = WebsocketCommunicator(game_application, "/ws/game/test/")
+        await first.connect()
+        session_id = (await first.receive_json_from())['session_id']
+        await first.send_json_to({'action': 'reset'})
+        await first.receive_json_from()
+        second = WebsocketCommunicator(game_application, f"/ws/game/test/?session={session_id}")
+        await second.connect()
+        await second.receive_json_from()
+        await second.send_json_to({'action': 'reset'})
+        await second.receive_json_from()
+        # The first connection's game is outdated: its next save fails and it is closed
+        await first.send_json_to({'action': 'reset'})
+        await first.receive_json_from()
+        assert (await first.receive_output())['code'] == 4009
+        await second.disconnect()
+
+    async def test_evicted_game_resumed(self, game_application, monkeypatch):
+        monkeypatch.setattr(GameConsumer, 'games', GameRegistry(capacity=1, snapshot=SnakeGame.to_bytes))
+        monkeypatch.setattr(GameConsumer, 'ai_agents', GameRegistry(capacity=1))
+        first = WebsocketCommunicator(game_application, "/ws/game/test/")
+        await first.connect()
+        session_id = (await first.receive_json_from())['session_id']
+        await first.send_json_to({'action': 'direction', 'direction': 'left'})
+        # A second game doesn't fit: the first one is evicted and its connection closed
+        second = WebsocketCommunicator(game_application, "/ws/game/test/")
+        await second.connect()
+        await second.receive_json_from()
+        assert (await first.receive_output())['code'] == 4008
+        await second.disconnect()
+        first = WebsocketCommunicator(game_application, f"/ws/game/test/?session={session_id}")
+        await first.connect()
+        assert (await first.receive_json_from())['state']['direction'] == 'left'
+        assert GameConsumer.games.stats()['restored'] == 1
+        await first.disconnect()
@@ -279,6 +279,33 @@ class TestGameState:
         assert Direction.DOWN not in valid_dirs  # Opposite of UP
 
 
+class TestSnapshot:
+    """
+        Test binary game snapshots
+    """
+    def test_round_trip(self):
+        game = SnakeGame(grid_size=15, seed=3)
+        game.change_direction(Direction.LEFT)
+        for _ in range(4):
+            game.update()
+        restored = SnakeGame.from_bytes(game.to_bytes())
+        assert restored.get_state() == game.get_state()
+        restored.update()
+        game.update()
+        assert restored.snake == game.snake
+
+    def test_game_over_round_trip(self):
+        game = SnakeGame(grid_size=10)
+        for _ in range(10):
+            game.update()
+        assert SnakeGame.from_bytes(game.to_bytes()).game_over
+
+    @pytest.mark.parametrize("data", [b'', b'XXXX' + bytes(20), SnakeGame().to_bytes()[:-1]])
+    def test_invalid_data(self, data):
+        with pytest.raises(ValueError):
+            SnakeGame.from_bytes(data)
+
+
 class TestEdgeCases:
     """
         Test edge cases and boundary conditions
@@ -0,0 +1,143 @@
+from django.test import AsyncClient
+from game.ai_agent import SnakeAI
+from game.game_engine import SnakeGame
+from game.jobs import JobManager, SimulationJob, job_key, parse_job_params
+from game.runner import play_game, run_shard
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import pytest
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+async def collect(job, timeout=None):
+    return [line async for line in job.follow(timeout=timeout)]
+
+
+async def response_lines(response):
+    return [json.loads(line) for line in b''.join([chunk async for chunk in response.streaming_content]).splitlines()]
+
+
+class TestRunner:
+    """
+        Test headless AI games
+    """
+    def test_seeded_games_repeat(self):
+        first = run_shard('astar', 10, 3, seed=7, shard_index=0)
+        second = run_shard('astar', 10, 3, seed=7, shard_index=0)
+        assert first.to_dict() == second.to_dict()
+        assert first.games == 3 and first.max_score > 0
+
+    def test_play_game_ends(self):
+        game = SnakeGame(grid_size=10, seed=1)
+        starved = not play_game(game, SnakeAI('simple'), max_idle_moves=100)
+        assert game.game_over or starved
+
+    def test_starving_game_stopped(self):
+        game = SnakeGame(grid_size=10, seed=1)
+        assert not play_game(game, SnakeAI('safe'), max_idle_moves=1) or game.game_over
+
+
+class TestJobParams:
+    """
+        Test job parameter validation and hashing
+    """
+    def test_defaults(self):
+        params = parse_job_params({'seed': 1})
+        assert params == {'strategy': 'astar', 'grid_size': 20, 'games': 100, 'seed': 1}
+
+    @pytest.mark.parametrize('data', [{'strategy': 'psychic'}, {'grid_size': 2}, {'games': 0}, {'games': 'many'}])
+    def test_rejects_invalid(self, data):
+        with pytest.raises(ValueError):
+            parse_job_params(data)
+
+    def test_key(self):
+        assert job_key(parse_job_params({'seed': 1})) != job_key(parse_job_params({'seed': 2}))
+
+
+class TestSimulationJob:
+    """
+        Test running and following jobs
+    """
+    async def test_lines_and_result(self, executor):
+        job = SimulationJob(parse_job_params({'grid_size': 10, 'games': 45, 'seed': 5}))
+        job.run(executor)
+        lines = await collect(job)
+        assert [line['type'] for line in lines] == ['progress', 'progress', 'progress', 'result']
+        assert job.status == 'done'
+        expected = run_shard('astar', 10, 20, 5, 0)
+        expected.merge(run_shard('astar', 10, 20, 5, 1))
+        expected.merge(run_shard('astar', 10, 5, 5, 2))
+        assert lines[-1]['result'] == pytest.approx(expected.to_dict())
+
+    async def test_cancel(self, executor):
+        job = SimulationJob(parse_job_params({'grid_size': 10, 'games': 1000, 'seed': 5}))
+        job.cancel()
+        job.run(executor)
+        assert job.status == 'cancelled'
+        assert (await collect(job))[-1]['type'] == 'cancelled'
+
+    async def test_follow_does_not_block_event_loop(self):
+        job = SimulationJob(parse_job_params({'seed': 1}))
+        reader = asyncio.create_task(collect(job, timeout=10))
+        await asyncio.sleep(0.01)   # the loop runs while the reader waits
+        assert not reader.done()
+        await asyncio.to_thread(job.publish, {'type': 'progress'})
+        await asyncio.to_thread(job.publish, {'type': 'result'}, 'done')
+        assert [line['type'] for line in await reader] == ['progress', 'result']
+
+    async def test_follow_timeout(self):
+        job = SimulationJob(parse_job_params({'seed': 1}))
+        assert await collect(job, timeout=0.01) == []
+
+
+class TestJobManager:
+    """
+        Test the job cache
+    """
+    async def test_same_params_cached(self):
+        manager = JobManager(workers=1)
+        params = parse_job_params({'grid_size': 10, 'games': 5, 'seed': 3})
+        job, cached = manager.submit(params)
+        assert not cached
+        assert (await collect(job, timeout=60))[-1]['type'] == 'result'
+        again, cached = manager.submit(dict(params))
+        assert cached and again is job
+
+
+    async def test_unseeded_jobs_cached(self):
+        manager = JobManager(workers=1)
+        job, cached = manager.submit(parse_job_params({'grid_size': 10, 'games': 5}))
+        assert not cached and isinstance(job.params['seed'], int)
+        again, cached = manager.submit(parse_job_params({'grid_size': 10, 'games': 5}))
+        assert cached and again is job
+        await collect(job, timeout=60)
+
+class TestJobViews:
+    """
+        Test the HTTP job API
+    """
+    async def test_stream_job(self):
+        client = AsyncClient()
+        response = await client.post('/api/snake/jobs/', {'grid_size': 10, 'games': 5, 'seed': 11},
+                               content_type='application/json')
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = await response_lines(response)
+        assert lines[0]['type'] == 'job' and not lines[0]['cached']
+        assert lines[-1]['type'] == 'result' and lines[-1]['result']['games'] == 5
+        stream = await client.get(f"/api/snake/jobs/{lines[0]['job_id']}/stream/")
+        assert (await response_lines(stream))[-1] == lines[-1]
+
+    async def test_invalid_params(self):
+        response = await AsyncClient().post('/api/snake/jobs/', {'strategy': 'psychic'},
+                                            content_type='application/json')
+        assert response.status_code == 400
+
+    async def test_unknown_job(self):
+        assert (await AsyncClient().get('/api/snake/jobs/nope/')).status_code == 404
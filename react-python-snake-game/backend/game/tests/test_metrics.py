@@ -0,0 +1,102 @@
+from channels.testing import WebsocketCommunicator
+from django.test import Client, override_settings
+from game.metrics import NULL_SPAN, Histogram, LatencyMetrics, metrics, render_registry
+import pytest
+
+
+@pytest.fixture
+def enabled_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+
+class TestLatencyMetrics:
+    """
+        Test the latency histograms and their Prometheus text format
+    """
+    def test_histogram_buckets(self):
+        histogram = Histogram(buckets=(0.001, 0.01))
+        for value in (0.0005, 0.001, 0.005, 2.0):
+            histogram.observe(value)
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.cumulative_counts() == [2, 3, 4]
+        assert histogram.count == 4 and histogram.sum == pytest.approx(2.0065)
+
+    def test_disabled_records_nothing(self):
+        latency = LatencyMetrics(enabled=False)
+        assert latency.span('engine') is NULL_SPAN
+        with latency.span('engine'):
+            latency.set_action('tick')
+        assert latency.histograms == {}
+
+    def test_spans_labelled_with_action(self):
+        latency = LatencyMetrics(enabled=True)
+        with latency.span('decode'):
+            latency.set_action('tick')
+        with latency.span('engine'):
+            pass
+        assert set(latency.histograms) == {('decode', 'tick'), ('engine', 'tick')}
+
+    def test_render(self):
+        latency = LatencyMetrics(enabled=True, buckets=(0.001,))
+        latency.observe('engine', 'tick', 0.0005)
+        latency.observe('engine', 'tick', 0.5)
+        assert latency.render('snake').splitlines() == [
+            '# HELP snake_action_seconds Time spent per stage of handling a WebSocket action',
+            '# TYPE snake_action_seconds histogram',
+            'snake_action_seconds_bucket{action="tick",stage="engine",le="0.001"} 1',
+            'snake_action_seconds_bucket{action="tick",stage="engine",le="+Inf"} 2',
+            'snake_action_seconds_sum{action="tick",stage="engine"} 0.5005',
+            'snake_action_seconds_count{action="tick",stage="engine"} 2',
+        ]
+
+    def test_render_registry(self):
+        text = render_registry('snake', {'live': 2, 'evicted': 1})
+        assert text.splitlines() == [
+            '# TYPE snake_games_live gauge', 'snake_games_live 2',
+            '# TYPE snake_games_evicted_total counter', 'snake_games_evicted_total 1',
+        ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db
+class TestConsumerMetrics:
+    """
+        Test the stages timed while the consumer handles actions
+    """
+    async def test_action_stages(self, game_application, enabled_metrics):
+        communicator = WebsocketCommunicator(game_application, "/ws/game/test/")
+        await communicator.connect()
+        await communicator.receive_json_from()  # Initial state
+        await communicator.send_json_to({'action': 'reset'})
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'start'})
+        await communicator.receive_json_from()  # First tick
+        await communicator.disconnect()
+        for stage in ('decode', 'engine', 'serialize', 'send'):
+            assert enabled_metrics.histograms[(stage, 'reset')].count == 1
+        for stage in ('engine', 'serialize', 'send'):
+            assert enabled_metrics.histograms[(stage, 'tick')].count >= 1
+
+
+class TestMetricsEndpoint:
+    """
+        Test the Prometheus metrics endpoint
+    """
+    def test_serves_metrics(self, enabled_metrics):
+        enabled_metrics.observe('engine', 'tick', 0.0001)
+        response = Client().get('/api/snake/metrics/')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        text = response.content.decode()
+        assert 'snake_action_seconds_count{action="tick",stage="engine"} 1' in text
+        assert '# TYPE snake_games_live gauge' in text
+
+    def test_disabled(self):
+        assert Client().get('/api/snake/metrics/').status_code == 404
+
+    def test_local_only(self, enabled_metrics):
+        with override_settings(GAME_METRICS={'ALLOWED_IPS': ['10.0.0.1']}):
+            assert Client().get('/api/snake/metrics/').status_code == 403
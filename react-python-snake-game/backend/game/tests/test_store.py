@@ -0,0 +1,150 @@
+from django.test import override_settings
+from game.store import (CachedGameStore, MemoryGameStore, RedisGameStore, SQLiteGameStore, VersionConflict,
+                        get_game_store)
+import asyncio
+import time
+import uuid
+import pytest
+
+
+async def redis_store(**options) -> RedisGameStore:
+    store = RedisGameStore(prefix=f"test-{uuid.uuid4().hex}:", **options)
+    try:
+        await asyncio.wait_for(store.client.ping(), timeout=1)
+    except Exception:
+        pytest.skip("No Redis server")
+    return store
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'cached', 'redis'])
+async def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryGameStore()
+    if request.param == 'sqlite':
+        return SQLiteGameStore(tmp_path / 'games.sqlite3')
+    if request.param == 'cached':
+        return CachedGameStore(SQLiteGameStore(tmp_path / 'games.sqlite3'), max_entries=2)
+    return await redis_store()
+
+
+class TestGameStores:
+    """
+        Test the game store implementations
+    """
+    async def test_save_and_load(self, store):
+        assert await store.load('a') is None
+        assert await store.save('a', b'first', 0) == 1
+        assert await store.save('a', b'second', 1) == 2
+        stored = await store.load('a')
+        assert (stored.data, stored.version) == (b'second', 2)
+        assert await store.version('a') == 2
+        assert await store.version('b') == 0
+
+    async def test_version_conflict(self, store):
+        await store.save('a', b'first', 0)
+        with pytest.raises(VersionConflict) as conflict:
+            await store.save('a', b'stale', 0)
+        assert conflict.value.actual == 1
+        await store.save('a', b'second', 1)
+        with pytest.raises(VersionConflict):
+            await store.save('a', b'stale', 1)
+        assert (await store.load('a')).data == b'second'
+
+    async def test_delete(self, store):
+        await store.save('a', b'data', 0)
+        await store.delete('a')
+        assert await store.load('a') is None
+        assert await store.save('a', b'again', 0) == 1
+
+
+class TestExpiry:
+    """
+        Test games expiring after their ttl
+    """
+    async def test_memory(self):
+        store = MemoryGameStore(ttl=-1)
+        await store.save('a', b'data', 0)
+        assert await store.load('a') is None
+        assert await store.save('a', b'new', 0) == 1
+
+    async def test_memory_swept_on_save(self, monkeypatch):
+        store = MemoryGameStore(ttl=60)
+        await store.save('a', b'data', 0)
+        await store.save('b', b'data', 0)
+        later = time.monotonic() + 61
+        monkeypatch.setattr(time, 'monotonic', lambda: later)
+        await store.save('c', b'data', 0)
+        assert list(store.games) == ['c']
+        assert store.expired == 2
+
+    async def test_memory_bounded(self):
+        store = MemoryGameStore(max_entries=2)
+        await store.save('a', b'data', 0)
+        await store.save('b', b'data', 0)
+        await store.save('a', b'changed', 1)
+        await store.save('c', b'data', 0)
+        assert list(store.games) == ['a', 'c']
+        assert store.evicted == 1
+
+    async def test_sqlite(self, tmp_path):
+        store = SQLiteGameStore(tmp_path / 'games.sqlite3', ttl=-1)
+        await store.save('a', b'data', 0)
+        assert await store.load('a') is None
+        assert await store.save('a', b'new', 0) == 1
+
+
+class TestSharedStores:
+    """
+        Test stores shared by several workers
+    """
+    async def test_sqlite_shared_between_connections(self, tmp_path):
+        first = SQLiteGameStore(tmp_path / 'games.sqlite3')
+        second = SQLiteGameStore(tmp_path / 'games.sqlite3')
+        await first.save('a', b'data', 0)
+        assert (await second.load('a')).data == b'data'
+        await second.save('a', b'changed', 1)
+        with pytest.raises(VersionConflict):
+            await first.save('a', b'stale', 1)
+
+    async def test_cache_sees_other_workers(self, tmp_path):
+        shared = SQLiteGameStore(tmp_path / 'games.sqlite3')
+        cached = CachedGameStore(shared)
+        await cached.save('a', b'data', 0)
+        assert (await cached.load('a')).data == b'data' and cached.hits == 1
+        await shared.save('a', b'changed', 1)
+        assert (await cached.load('a')).data == b'changed' and cached.misses == 1
+        with pytest.raises(VersionConflict):
+            await cached.save('a', b'stale', 1)
+        assert 'a' not in cached.entries
+
+    async def test_cache_bounded(self):
+        cached = CachedGameStore(MemoryGameStore(), max_entries=2)
+        for key in 'abc':
+            await cached.save(key, b'data', 0)
+        assert list(cached.entries) == ['b', 'c']
+        assert (await cached.load('a')).data == b'data'
+
+
+class TestConfiguredStore:
+    """
+        Test the store built from settings.GAME_STORE
+    """
+    def teardown_method(self):
+        get_game_store.cache_clear()
+
+    def test_default(self):
+        get_game_store.cache_clear()
+        with override_settings(GAME_STORE={}):
+            assert isinstance(get_game_store(), MemoryGameStore)
+
+    def test_sqlite_with_cache(self, tmp_path):
+        get_game_store.cache_clear()
+        config = {
+            'BACKEND': 'game.store.SQLiteGameStore',
+            'OPTIONS': {'path': tmp_path / 'games.sqlite3', 'ttl': 60},
+            'LOCAL_CACHE': 10,
+        }
+        with override_settings(GAME_STORE=config):
+            store = get_game_store()
+        assert isinstance(store, CachedGameStore) and isinstance(store.backend, SQLiteGameStore)
+        assert store.ttl == 60 and store.max_entries == 10
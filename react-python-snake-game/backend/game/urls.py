@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # Batch AI sessions
+    path('jobs/', views.jobs, name='jobs'),
+    path('jobs/<str:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<str:job_id>/stream/', views.job_stream, name='job_stream'),
+    # Consumer latency metrics
+    path('metrics/', views.prometheus_metrics, name='metrics'),
+]